@@ -11,7 +11,7 @@ backend_path = Path(__file__).parent / 'src' / 'backend'
 sys.path.insert(0, str(backend_path))
 
 # Import and run the server
-from api.server import app
+from api.server import run_dev_server
 
 if __name__ == '__main__':
     print("=" * 60)
@@ -29,4 +29,4 @@ if __name__ == '__main__':
     print("=" * 60)
     print()
 
-    app.run(debug=True, port=8080, host='0.0.0.0')
+    run_dev_server()
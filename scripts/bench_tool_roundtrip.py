@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Tool Round-Trip Benchmark
+
+Compares the latency of answering a Realtime function call in the two tool
+execution modes, against the Realtime stand-in (scripts/realtime_standin.py):
+
+  client: model -> browser -> POST /execute-function -> browser -> model
+  server: model -> backend sideband -> model
+
+Both modes hold real WebSocket sessions with the stand-in, which times each
+call from sending response.function_call_arguments.done until the matching
+function_call_output arrives. In server mode the backend's
+SidebandToolExecutor answers the call; in client mode a browser stand-in
+answers it on its own WebSocket after a real HTTP request to a local
+/execute-function endpoint. Everything runs on loopback, so the links are
+given their latency with sleeps: each browser leg waits for the client RTT,
+the sideband for the server RTT.
+
+Usage:
+    python scripts/bench_tool_roundtrip.py [--iterations N] [--client-rtt-ms MS] [--server-rtt-ms MS]
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import websocket
+
+sys.path.insert(0, str(Path(__file__).parent))
+from realtime_standin import RealtimeStandInHandler, serve
+
+# Add src/backend to Python path
+backend_path = Path(__file__).parent.parent / 'src' / 'backend'
+sys.path.insert(0, str(backend_path))
+
+from services.pharmacy_service import execute_function
+from services.sideband_service import SidebandToolExecutor
+
+# User messages that make the stand-in call a tool
+USER_MESSAGES = [
+    "יש לכם נורופן?",
+    "מה המינון של אקמול?",
+    "אני צריך ונטולין",
+    "תעודת הזהות שלי 123456789",
+]
+
+
+class ExecuteFunctionStandIn(BaseHTTPRequestHandler):
+    """Minimal stand-in for the backend's /execute-function endpoint"""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length))
+        result = execute_function(data['function_name'], data.get('arguments', {}), data.get('session_id'))
+        body = json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def user_turn(text):
+    """Events that add a user message and ask for a response"""
+    return [
+        {
+            "type": "conversation.item.create",
+            "item": {"type": "message", "role": "user", "content": [{"type": "input_text", "text": text}]}
+        },
+        {"type": "response.create"}
+    ]
+
+
+class LinkDelaySidebandExecutor(SidebandToolExecutor):
+    """The backend's sideband executor, on a link with the server RTT"""
+
+    def __init__(self, call_id, api_key, sideband_url, server_rtt):
+        super().__init__(call_id, api_key, sideband_url)
+        self.server_rtt = server_rtt
+
+    def _handle_function_call(self, event):
+        # Half the RTT for the call to arrive, half for the output to return
+        time.sleep(self.server_rtt)
+        super()._handle_function_call(event)
+
+
+def wait_for_round_trip(count, timeout=30):
+    """Wait until the stand-in has timed `count` tool round trips"""
+    deadline = time.monotonic() + timeout
+    while len(RealtimeStandInHandler.tool_round_trips) < count:
+        if time.monotonic() > deadline:
+            raise TimeoutError("No function_call_output reached the stand-in")
+        time.sleep(0.001)
+
+
+def run_server_mode(sideband_url, iterations, server_rtt):
+    """Tool calls answered by the backend over a sideband connection"""
+    start = len(RealtimeStandInHandler.tool_round_trips)
+    for i in range(iterations):
+        executor = LinkDelaySidebandExecutor(f"bench_server_{i}", "test", sideband_url, server_rtt)
+        executor.start()
+        try:
+            # The user's turn, as the model would receive it from the call
+            for event in user_turn(USER_MESSAGES[i % len(USER_MESSAGES)]):
+                executor._send(event)
+            wait_for_round_trip(start + i + 1)
+        finally:
+            executor.close()
+    return RealtimeStandInHandler.tool_round_trips[start:]
+
+
+def run_client_mode(sideband_url, execute_url, iterations, client_rtt):
+    """Tool calls relayed by the browser to POST /execute-function"""
+    start = len(RealtimeStandInHandler.tool_round_trips)
+    ws = websocket.create_connection(sideband_url, timeout=30)
+    try:
+        for i in range(iterations):
+            for event in user_turn(USER_MESSAGES[i % len(USER_MESSAGES)]):
+                ws.send(json.dumps(event))
+
+            while True:
+                event = json.loads(ws.recv())
+                if event.get("type") == "response.function_call_arguments.done":
+                    break
+
+            # Data channel to the browser, browser to backend and back, and
+            # the function_call_output back over the data channel
+            time.sleep(client_rtt / 2)
+            request = urllib.request.Request(
+                execute_url,
+                data=json.dumps({
+                    "function_name": event["name"],
+                    "arguments": json.loads(event["arguments"]),
+                    "session_id": "bench_client"
+                }).encode('utf-8'),
+                headers={'Content-Type': 'application/json'}
+            )
+            time.sleep(client_rtt)
+            with urllib.request.urlopen(request) as response:
+                result = json.loads(response.read())
+            time.sleep(client_rtt / 2)
+
+            ws.send(json.dumps({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "function_call_output",
+                    "call_id": event["call_id"],
+                    "output": json.dumps(result, ensure_ascii=False)
+                }
+            }))
+            ws.send(json.dumps({"type": "response.create"}))
+
+            # Let the follow-up response finish before the next turn
+            while True:
+                event = json.loads(ws.recv())
+                if event.get("type") == "response.done":
+                    break
+    finally:
+        ws.close()
+    return RealtimeStandInHandler.tool_round_trips[start:]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, ms):
+    print(f"  {name:8s} p50={percentile(ms, 50):7.1f}ms  p95={percentile(ms, 95):7.1f}ms  "
+          f"mean={statistics.mean(ms):7.1f}ms")
+    return percentile(ms, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark client vs server tool execution')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--client-rtt-ms', type=float, default=80.0,
+                        help='Round trip between the user browser and the backend/upstream')
+    parser.add_argument('--server-rtt-ms', type=float, default=5.0,
+                        help='Round trip between the backend and the upstream')
+    args = parser.parse_args()
+
+    standin = serve(port=0)
+    sideband_url = f"ws://127.0.0.1:{standin.server_address[1]}/v1/realtime"
+
+    backend = ThreadingHTTPServer(('127.0.0.1', 0), ExecuteFunctionStandIn)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    execute_url = f"http://127.0.0.1:{backend.server_address[1]}/execute-function"
+
+    client_samples = run_client_mode(sideband_url, execute_url, args.iterations, args.client_rtt_ms / 1000)
+    server_samples = run_server_mode(sideband_url, args.iterations, args.server_rtt_ms / 1000)
+
+    backend.shutdown()
+    standin.shutdown()
+
+    print(f"Tool round trip ({args.iterations} calls, client RTT {args.client_rtt_ms:.0f}ms, "
+          f"server RTT {args.server_rtt_ms:.0f}ms)")
+    client_p50 = summarize("client", client_samples)
+    server_p50 = summarize("server", server_samples)
+    print(f"  Server-side execution saves {client_p50 - server_p50:.1f}ms per tool call at p50")
+
+
+if __name__ == '__main__':
+    main()
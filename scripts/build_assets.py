@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Frontend Asset Build
+
+Fingerprints and precompresses the frontend so the server can hand out
+long-lived, immutable responses without compressing anything per request.
+
+For every file under src/frontend/assets this writes, into src/frontend/dist:
+  assets/<dir>/<name>.<hash>.<ext>         content-addressed copy
+  assets/<dir>/<name>.<hash>.<ext>.gz      gzip variant (text assets)
+  assets/<dir>/<name>.<hash>.<ext>.br      brotli variant (if `brotli` is installed)
+plus the index page with asset URLs rewritten to the fingerprinted names,
+and manifest.json describing all of it.
+
+Usage:
+    python scripts/build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+project_root = Path(__file__).parent.parent
+frontend_path = project_root / 'src' / 'frontend'
+assets_path = frontend_path / 'assets'
+public_path = frontend_path / 'public'
+dist_path = frontend_path / 'dist'
+
+INDEX_PAGE = 'unified-realtime.html'
+
+# Only text formats benefit from compression (JPEG/PNG are already compressed)
+COMPRESSIBLE_SUFFIXES = {'.css', '.js', '.html', '.svg', '.json', '.txt'}
+
+# Compressed variants smaller than this fraction of the original are kept
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_variants(target, data):
+    """Write a file plus its gzip/brotli variants; returns available encodings"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+    encodings = []
+
+    if target.suffix not in COMPRESSIBLE_SUFFIXES:
+        return encodings
+
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+            target.with_name(target.name + '.br').write_bytes(compressed)
+            encodings.append('br')
+
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+        target.with_name(target.name + '.gz').write_bytes(compressed)
+        encodings.append('gzip')
+
+    return encodings
+
+
+def build():
+    if dist_path.exists():
+        shutil.rmtree(dist_path)
+
+    manifest = {"assets": {}, "pages": {}}
+    total_original = 0
+    total_best = 0
+
+    for source in sorted(p for p in assets_path.rglob('*') if p.is_file()):
+        logical = source.relative_to(assets_path).as_posix()
+        data = source.read_bytes()
+        digest = content_hash(data)
+        fingerprinted = f"{Path(logical).with_suffix('').as_posix()}.{digest}{source.suffix}"
+
+        encodings = write_variants(dist_path / 'assets' / fingerprinted, data)
+        manifest["assets"][logical] = {
+            "path": fingerprinted,
+            "hash": digest,
+            "size": len(data),
+            "encodings": encodings
+        }
+
+        best = min([len(data)] + [
+            (dist_path / 'assets' / f"{fingerprinted}.{'br' if e == 'br' else 'gz'}").stat().st_size
+            for e in encodings
+        ])
+        total_original += len(data)
+        total_best += best
+        print(f"  {logical:40s} -> {fingerprinted:45s} {len(data):7d}B -> {best:7d}B {encodings}")
+
+    # Rewrite asset references in the index page to the fingerprinted names
+    source_data = (public_path / INDEX_PAGE).read_bytes()
+    html = source_data.decode('utf-8')
+
+    def rewrite(match):
+        entry = manifest["assets"].get(match.group(2))
+        if entry is None:
+            return match.group(0)
+        return f'{match.group(1)}assets/{entry["path"]}'
+
+    html = re.sub(
+        r'(=")(?:\.\./)?assets/([^"]+)(?=")',
+        rewrite,
+        html
+    )
+    data = html.encode('utf-8')
+    encodings = write_variants(dist_path / INDEX_PAGE, data)
+    manifest["pages"][INDEX_PAGE] = {
+        "path": INDEX_PAGE,
+        "hash": content_hash(data),
+        # The server compares this with the source page to detect a stale build
+        "source_hash": content_hash(source_data),
+        "size": len(data),
+        "encodings": encodings
+    }
+
+    (dist_path / 'manifest.json').write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+    print()
+    print(f"Built {len(manifest['assets'])} assets into {dist_path}")
+    print(f"Asset bytes per cold page view: {total_original} -> {total_best} "
+          f"({100 * (1 - total_best / max(total_original, 1)):.0f}% smaller)")
+    if brotli is None:
+        print("Note: install `brotli` to also emit .br variants")
+
+
+if __name__ == '__main__':
+    build()
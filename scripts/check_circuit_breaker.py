@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker Check
+
+Drives the upstream circuit breaker through closed -> open -> half-open ->
+closed by injecting faults into the Realtime stand-in, calling the real
+POST /session endpoint of the backend (Flask test client) at each step.
+Checks the breaker states and that an open circuit answers 503 with a
+Retry-After header without reaching the upstream.
+
+Exits non-zero on the first failed check.
+
+Usage:
+    python scripts/check_circuit_breaker.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from realtime_standin import FaultSettings, serve
+
+OPEN_SECONDS = 1
+MIN_CALLS = 3
+PROBE_LATENCY_MS = 500
+
+faults = FaultSettings()
+standin = serve(port=0, faults=faults)
+base_url = f"http://127.0.0.1:{standin.server_address[1]}"
+
+# Configuration is read at import, so point the backend at the stand-in first
+os.environ.update({
+    "OPENAI_API_KEY": "test",
+    "OPENAI_REALTIME_URL": f"{base_url}/v1/realtime",
+    "TOOL_EXECUTION_MODE": "client",
+    "REALTIME_EPHEMERAL_POOL_SIZE": "0",
+    "UPSTREAM_BREAKER_MIN_CALLS": str(MIN_CALLS),
+    "UPSTREAM_BREAKER_OPEN_SECONDS": str(OPEN_SECONDS),
+    "LOG_LEVEL": "CRITICAL"
+})
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'backend'))
+
+from api.server import app
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from services.realtime_service import upstream_breaker
+
+client = app.test_client()
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}")
+        print(f"      breaker: {upstream_breaker.snapshot()}")
+        sys.exit(1)
+    print(f"ok    {message}")
+
+
+def upstream_calls():
+    """SDP offers that reached the stand-in"""
+    with urllib.request.urlopen(f"{base_url}/_requests") as response:
+        return json.loads(response.read()).get('/v1/realtime', 0)
+
+
+def post_session():
+    return client.post('/session', data="v=0\r\n", content_type='application/sdp')
+
+
+def wait_until_half_open():
+    time.sleep(OPEN_SECONDS + 0.1)
+
+
+def main():
+    # Closed: calls go through
+    faults.update({"error_rate": 0.0, "latency_ms": 0.0})
+    response = post_session()
+    check(response.status_code == 200, "healthy upstream: POST /session answers 200")
+    check(upstream_breaker.state == CLOSED, "healthy upstream: circuit is closed")
+
+    # Closed -> open once the failure rate over min_calls reaches the threshold
+    faults.update({"error_rate": 1.0})
+    for _ in range(MIN_CALLS):
+        post_session()
+    check(upstream_breaker.state == OPEN, f"{MIN_CALLS} upstream errors: circuit opens")
+
+    # Open: fail fast with 503 + Retry-After, without calling the upstream
+    before = upstream_calls()
+    response = post_session()
+    retry_after = response.headers.get('Retry-After')
+    check(response.status_code == 503, "open circuit: POST /session answers 503")
+    check(retry_after is not None and 1 <= int(retry_after) <= OPEN_SECONDS,
+          f"open circuit: Retry-After header is set ({retry_after})")
+    check(response.get_json().get("retry_after") == int(retry_after),
+          "open circuit: body carries the same retry_after")
+    check(upstream_calls() == before, "open circuit: upstream is not called")
+
+    # Open -> half-open -> open: a failed probe opens the circuit again
+    wait_until_half_open()
+    opened = upstream_breaker.times_opened
+    post_session()
+    check(upstream_breaker.state == OPEN and upstream_breaker.times_opened == opened + 1,
+          "failed half-open probe: circuit opens again")
+
+    # Open -> half-open: one probe is admitted, concurrent calls are rejected
+    wait_until_half_open()
+    faults.update({"error_rate": 0.0, "latency_ms": PROBE_LATENCY_MS})
+    probe = {}
+    thread = threading.Thread(target=lambda: probe.update(response=post_session()))
+    thread.start()
+    time.sleep(PROBE_LATENCY_MS / 1000 / 2)
+    check(upstream_breaker.state == HALF_OPEN, "after open_seconds: circuit is half-open")
+    response = post_session()
+    check(response.status_code == 503 and response.headers.get('Retry-After') == "1",
+          "half-open with a probe in flight: other calls get 503, Retry-After: 1")
+    thread.join()
+
+    # Half-open -> closed: the successful probe closes the circuit
+    check(probe["response"].status_code == 200, "half-open probe: POST /session answers 200")
+    check(upstream_breaker.state == CLOSED, "successful probe: circuit closes")
+
+    faults.update({"latency_ms": 0.0})
+    response = post_session()
+    check(response.status_code == 200, "closed again: POST /session answers 200")
+
+    standin.shutdown()
+    print("All circuit breaker checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Prompt Compaction
+
+Every Realtime session ships the system prompt as `instructions` and the tool
+definitions as `tools`, so every token in them is paid on every turn. This
+build step writes a compacted copy that the backend serves instead:
+
+  - markdown the model does not need (bold markers, heading hashes, code
+    fences, checkmark/bullet glyphs) is reduced to plain text
+  - redundant whitespace and blank lines are removed
+  - tool list lines in the prompt that only restate the tool's own
+    description are reduced to the tool name
+  - sentences in tool descriptions that already appear in the prompt are dropped
+    (none do in the current definitions, so today only the prompt shrinks)
+
+Output goes to src/backend/config/prompts/compact/ together with a manifest
+holding the source hashes (a stale build is ignored by the backend) and a
+token report. Token counts use tiktoken when installed, otherwise an estimate.
+
+Usage:
+    python scripts/compact_prompts.py
+"""
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# Token counts come from the same helper the judge prompts are budgeted with
+sys.path.insert(0, str(project_root / 'tests'))
+from judges.prompt_serializer import count_tokens, token_counter_name
+
+prompts_path = project_root / 'src' / 'backend' / 'config' / 'prompts'
+compact_path = prompts_path / 'compact'
+
+PROMPT_FILE = 'system-prompt.txt'
+FUNCTIONS_FILE = 'function-definitions.json'
+
+# Share of a tool list line's words that must already be in the tool's own
+# description for the line to be reduced to the bare tool name
+TOOL_LINE_OVERLAP = 0.6
+
+# Hebrew one-letter prefixes (ל-, ב-, ה-, ...) stripped before comparing words
+HEBREW_PREFIXES = 'להבומש'
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _words(text):
+    words = set()
+    for word in re.findall(r'\w+', text.lower()):
+        if len(word) > 3 and word[0] in HEBREW_PREFIXES:
+            word = word[1:]
+        if len(word) > 1:
+            words.add(word)
+    return words
+
+
+def _normalize_sentence(sentence):
+    return ' '.join(re.findall(r'\w+', sentence.lower()))
+
+
+def _sentences(text):
+    return [s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s]
+
+
+def compact_prompt(prompt, tool_descriptions):
+    """
+    Compact the system prompt
+
+    Returns:
+        (compacted prompt, number of tool list lines reduced)
+    """
+    tool_line = re.compile(r'^(\d+\.|-)\s*(\w+)\s+-\s+(.+)$')
+    lines = []
+    reduced = 0
+
+    for line in prompt.splitlines():
+        line = line.strip()
+
+        if line.startswith('```'):
+            continue
+
+        line = re.sub(r'\*\*(.+?)\*\*', r'\1', line)
+        heading = re.match(r'^#+\s*(.+)$', line)
+        if heading:
+            line = heading.group(1)
+            if not line.endswith(':'):
+                line += ':'
+        line = re.sub(r'^[✅❌•]\s*', '- ', line)
+        line = re.sub(r'\s{2,}', ' ', line)
+
+        match = tool_line.match(line)
+        if match and match.group(2) in tool_descriptions:
+            marker, name, text = match.groups()
+            line_words = _words(text)
+            covered = line_words & _words(tool_descriptions[name])
+            # Keep lines that add guidance the schema does not carry
+            if line_words and len(covered) / len(line_words) >= TOOL_LINE_OVERLAP and '(' not in text:
+                line = f"{marker} {name}"
+                reduced += 1
+
+        if not line and (not lines or not lines[-1]):
+            continue
+        lines.append(line)
+
+    return '\n'.join(lines).strip() + '\n', reduced
+
+
+def compact_functions(functions, prompt):
+    """
+    Compact tool descriptions
+
+    Returns:
+        (compacted definitions, number of sentences dropped)
+    """
+    prompt_sentences = {_normalize_sentence(s) for line in prompt.splitlines() for s in _sentences(line)}
+    dropped = 0
+
+    def compact_text(text):
+        nonlocal dropped
+        kept = []
+        for sentence in _sentences(re.sub(r'\s+', ' ', text)):
+            if _normalize_sentence(sentence) in prompt_sentences:
+                dropped += 1
+                continue
+            kept.append(sentence)
+        # Never leave a description empty
+        return ' '.join(kept) if kept else re.sub(r'\s+', ' ', text).strip()
+
+    def compact_schema(schema):
+        schema = dict(schema)
+        if 'description' in schema:
+            schema['description'] = compact_text(schema['description'])
+        if 'properties' in schema:
+            schema['properties'] = {name: compact_schema(prop) for name, prop in schema['properties'].items()}
+        if 'items' in schema:
+            schema['items'] = compact_schema(schema['items'])
+        return schema
+
+    compacted = [
+        {**func, "description": compact_text(func["description"]), "parameters": compact_schema(func["parameters"])}
+        for func in functions
+    ]
+    return compacted, dropped
+
+
+def build():
+    prompt_bytes = (prompts_path / PROMPT_FILE).read_bytes()
+    functions_bytes = (prompts_path / FUNCTIONS_FILE).read_bytes()
+    prompt = prompt_bytes.decode('utf-8')
+    functions = json.loads(functions_bytes)
+
+    tool_descriptions = {func["name"]: func["description"] for func in functions}
+    compact_prompt_text, reduced_lines = compact_prompt(prompt, tool_descriptions)
+    compact_function_defs, dropped_sentences = compact_functions(functions, compact_prompt_text)
+
+    # Tools are sent as JSON inside the session config, so count them that way
+    tools_before = json.dumps(functions, ensure_ascii=False, separators=(',', ':'))
+    tools_after = json.dumps(compact_function_defs, ensure_ascii=False, separators=(',', ':'))
+
+    report = {
+        "token_counter": token_counter_name(),
+        "system_prompt": {"before": count_tokens(prompt), "after": count_tokens(compact_prompt_text)},
+        "tools": {"before": count_tokens(tools_before), "after": count_tokens(tools_after)},
+        "tool_lines_reduced": reduced_lines,
+        "tool_sentences_deduplicated": dropped_sentences
+    }
+    before = report["system_prompt"]["before"] + report["tools"]["before"]
+    after = report["system_prompt"]["after"] + report["tools"]["after"]
+    report["total"] = {"before": before, "after": after, "saved": before - after}
+
+    compact_path.mkdir(parents=True, exist_ok=True)
+    (compact_path / PROMPT_FILE).write_text(compact_prompt_text, encoding='utf-8')
+    (compact_path / FUNCTIONS_FILE).write_text(
+        json.dumps(compact_function_defs, ensure_ascii=False, indent=2) + '\n',
+        encoding='utf-8'
+    )
+    manifest = {
+        "sources": {
+            PROMPT_FILE: sha256(prompt_bytes),
+            FUNCTIONS_FILE: sha256(functions_bytes)
+        },
+        "report": report
+    }
+    (compact_path / 'manifest.json').write_text(json.dumps(manifest, indent=2) + '\n', encoding='utf-8')
+
+    print(f"Token counter: {report['token_counter']}")
+    for name in ("system_prompt", "tools", "total"):
+        entry = report[name]
+        saved = entry["before"] - entry["after"]
+        print(f"  {name:15s} {entry['before']:6d} -> {entry['after']:6d} tokens "
+              f"({saved} saved, {100 * saved / max(entry['before'], 1):.0f}%)")
+    print(f"  tool list lines reduced to names: {reduced_lines}")
+    print(f"  tool description sentences deduplicated: {dropped_sentences}")
+    print(f"Wrote {compact_path}")
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Realtime API Stand-in
+
+A local, fault-injecting stand-in for the OpenAI Realtime endpoints, used
+to exercise session creation, the ephemeral key pool, the upstream circuit
+breaker and the voice-mode test runner without calling OpenAI.
+
+Endpoints:
+    POST /v1/realtime            SDP offer -> fake SDP answer (+ Location call id)
+    POST /v1/realtime/sessions   session config -> ephemeral client secret
+    GET  /v1/realtime            WebSocket with a scripted Realtime event flow
+    GET  /_faults                current fault settings
+    POST /_faults                update fault settings (JSON body, same keys)
+    GET  /_requests              upstream requests received, by path
+    GET  /_tool_round_trips      ms from each function call sent on a WebSocket
+                                 to its function_call_output arriving
+
+The WebSocket endpoint answers each response.create with a tool call when
+the last user message contains a 9-digit id (verify_user_id) or a known
+medication name (get_medication_by_name), and with streamed text otherwise.
+Injected latency delays the first event of each response.
+
+Usage:
+    python scripts/realtime_standin.py --port 9090 --error-rate 0.5 --latency-ms 200
+
+    # point the backend at it
+    OPENAI_REALTIME_URL=http://127.0.0.1:9090/v1/realtime OPENAI_API_KEY=test python run.py
+
+    # break the upstream while the server is running
+    curl -X POST localhost:9090/_faults -d '{"error_rate": 1.0}'
+"""
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import re
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_SDP_ANSWER = "v=0\r\no=- 0 0 IN IP4 127.0.0.1\r\ns=standin\r\nt=0 0\r\n"
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Names that make the scripted WebSocket flow call get_medication_by_name
+KNOWN_MEDICATIONS = ["נורופן", "אקמול", "ונטולין", "אופטלגין", "Nurofen", "Acamol", "Ventolin", "Optalgin"]
+
+
+class FaultSettings:
+    """Mutable fault-injection settings shared by all request handlers"""
+
+    def __init__(self, latency_ms=0.0, error_rate=0.0, error_status=503, hang_rate=0.0, hang_ms=60000.0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_ms = hang_ms
+        self.lock = threading.Lock()
+
+    def as_dict(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "error_rate": self.error_rate,
+            "error_status": self.error_status,
+            "hang_rate": self.hang_rate,
+            "hang_ms": self.hang_ms
+        }
+
+    def update(self, values):
+        with self.lock:
+            for key, value in values.items():
+                if key in self.as_dict():
+                    setattr(self, key, value)
+
+
+def read_frame(rfile):
+    """
+    Read one WebSocket message
+
+    Returns:
+        (opcode, payload bytes), or (None, b'') if the connection closed
+    """
+    message, message_opcode = b'', None
+    while True:
+        header = rfile.read(2)
+        if len(header) < 2:
+            return None, b''
+        fin, opcode = header[0] & 0x80, header[0] & 0x0F
+        masked, length = header[1] & 0x80, header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', rfile.read(8))[0]
+        mask = rfile.read(4) if masked else b''
+        payload = rfile.read(length)
+        if masked:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+        # Control frames may arrive between fragments and are returned directly
+        if opcode >= 0x8:
+            return opcode, payload
+        if opcode != 0x0:
+            message_opcode = opcode
+        message += payload
+        if fin:
+            return message_opcode, message
+
+
+def write_frame(wfile, payload, opcode=0x1):
+    """Write one unfragmented, unmasked WebSocket frame"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    wfile.write(header + payload)
+    wfile.flush()
+
+
+class ScriptedRealtimeSession:
+    """Event flow of one stand-in Realtime WebSocket connection"""
+
+    def __init__(self, send, faults, tool_round_trips=None):
+        self.send = send
+        self.faults = faults
+        self.tool_round_trips = tool_round_trips
+        self.session_id = f"sess_standin_{random.getrandbits(48):012x}"
+        self.items = []
+        self.ids = itertools.count(1)
+        self._calls_sent = {}
+
+    def _id(self, prefix):
+        return f"{prefix}_standin_{next(self.ids)}"
+
+    def start(self):
+        self.send({"type": "session.created", "session": {"id": self.session_id, "object": "realtime.session"}})
+
+    def handle(self, event):
+        kind = event.get("type")
+        if kind == "session.update":
+            self.send({"type": "session.updated", "session": dict(event.get("session", {}), id=self.session_id)})
+        elif kind == "conversation.item.create":
+            item = dict(event.get("item", {}), id=self._id("item"))
+            self.items.append(item)
+            sent = self._calls_sent.pop(item.get("call_id"), None)
+            if item.get("type") == "function_call_output" and sent is not None and self.tool_round_trips is not None:
+                self.tool_round_trips.append((time.perf_counter() - sent) * 1000)
+            self.send({"type": "conversation.item.created", "item": item})
+        elif kind == "response.create":
+            self._respond()
+        else:
+            self.send({"type": "error", "error": {"type": "invalid_request_error", "message": f"Unsupported event '{kind}'"}})
+
+    def _plan(self):
+        """Decide the next output: ('function', name, args) or ('text', text)"""
+        last = self.items[-1] if self.items else {}
+        if last.get("type") == "function_call_output":
+            calls = [i for i in self.items if i.get("type") == "function_call" and i.get("call_id") == last.get("call_id")]
+            name = calls[-1]["name"] if calls else "tool"
+            return "text", f"קיבלתי תשובה מ-{name}. זה המידע שמצאתי."
+
+        text = " ".join(
+            part.get("text", "") for part in last.get("content", []) if part.get("type") == "input_text"
+        )
+        user_id = re.search(r"\b\d{9}\b", text)
+        if user_id:
+            return "function", "verify_user_id", {"user_id": user_id.group()}
+        for name in KNOWN_MEDICATIONS:
+            if name.lower() in text.lower():
+                return "function", "get_medication_by_name", {"name": name}
+        return "text", "שלום, אני עוזר הפרמצבט. במה אוכל לעזור?"
+
+    def _respond(self):
+        faults = self.faults
+        if faults.latency_ms:
+            time.sleep(faults.latency_ms / 1000)
+
+        response_id = self._id("resp")
+        self.send({"type": "response.created", "response": {"id": response_id, "status": "in_progress"}})
+
+        plan = self._plan()
+        if plan[0] == "function":
+            _, name, arguments = plan
+            item = {
+                "id": self._id("item"),
+                "type": "function_call",
+                "call_id": self._id("call"),
+                "name": name,
+                "arguments": json.dumps(arguments, ensure_ascii=False)
+            }
+            self.items.append(item)
+            self.send({"type": "response.output_item.added", "response_id": response_id, "item": item})
+            self._calls_sent[item["call_id"]] = time.perf_counter()
+            self.send({
+                "type": "response.function_call_arguments.done",
+                "response_id": response_id,
+                "item_id": item["id"],
+                "call_id": item["call_id"],
+                "name": name,
+                "arguments": item["arguments"]
+            })
+            output = [item]
+        else:
+            text = plan[1]
+            item = {"id": self._id("item"), "type": "message", "role": "assistant",
+                    "content": [{"type": "text", "text": text}]}
+            self.items.append(item)
+            self.send({"type": "response.output_item.added", "response_id": response_id, "item": item})
+            for chunk in re.findall(r"\S+\s*", text):
+                self.send({"type": "response.text.delta", "response_id": response_id, "item_id": item["id"], "delta": chunk})
+            self.send({"type": "response.text.done", "response_id": response_id, "item_id": item["id"], "text": text})
+            output = [item]
+
+        self.send({
+            "type": "response.done",
+            "response": {
+                "id": response_id,
+                "status": "completed",
+                "output": output,
+                "usage": {"input_tokens": 40 * len(self.items), "output_tokens": 20, "total_tokens": 40 * len(self.items) + 20}
+            }
+        })
+
+
+class RequestCounter:
+    """Upstream requests received per path, faulted ones included"""
+
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, path):
+        with self.lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+    def as_dict(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+class RealtimeStandInHandler(BaseHTTPRequestHandler):
+    faults = FaultSettings()
+    requests = RequestCounter()
+    tool_round_trips = []
+    call_ids = itertools.count(1)
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_faults(self):
+        """Apply latency/hang/error faults; returns True if an error was sent"""
+        faults = self.faults
+        if faults.hang_rate and random.random() < faults.hang_rate:
+            time.sleep(faults.hang_ms / 1000)
+        elif faults.latency_ms:
+            time.sleep(faults.latency_ms / 1000)
+
+        if faults.error_rate and random.random() < faults.error_rate:
+            self._send(faults.error_status, json.dumps({"error": {"message": "Injected fault"}}))
+            return True
+        return False
+
+    def _serve_websocket(self):
+        """Upgrade to a WebSocket and run a scripted Realtime session"""
+        key = self.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        # Events are small and latency is what the voice runner measures
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        session = ScriptedRealtimeSession(
+            lambda event: write_frame(self.wfile, json.dumps(event, ensure_ascii=False)),
+            self.faults,
+            self.tool_round_trips
+        )
+        session.start()
+        while True:
+            opcode, payload = read_frame(self.rfile)
+            if opcode is None or opcode == 0x8:
+                if opcode == 0x8:
+                    write_frame(self.wfile, payload[:2], opcode=0x8)
+                return
+            if opcode == 0x9:
+                write_frame(self.wfile, payload, opcode=0xA)
+            elif opcode == 0x1:
+                session.handle(json.loads(payload.decode('utf-8')))
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/v1/realtime' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            try:
+                self._serve_websocket()
+            except (ConnectionError, OSError):
+                pass
+        elif self.path == '/_faults':
+            self._send(200, json.dumps(self.faults.as_dict()))
+        elif self.path == '/_requests':
+            self._send(200, json.dumps(self.requests.as_dict()))
+        elif self.path == '/_tool_round_trips':
+            self._send(200, json.dumps(list(self.tool_round_trips)))
+        else:
+            self._send(404, json.dumps({"error": "not found"}))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        path = self.path.split('?', 1)[0]
+
+        if path == '/_faults':
+            self.faults.update(json.loads(body or b'{}'))
+            self._send(200, json.dumps(self.faults.as_dict()))
+            return
+
+        if path in ('/v1/realtime/sessions', '/v1/realtime'):
+            self.requests.add(path)
+
+        if path == '/v1/realtime/sessions':
+            if self._inject_faults():
+                return
+            secret = {
+                "value": f"ek_standin_{random.getrandbits(64):016x}",
+                "expires_at": int(time.time()) + 60
+            }
+            self._send(200, json.dumps({"object": "realtime.session", "client_secret": secret}))
+            return
+
+        if path == '/v1/realtime':
+            if self._inject_faults():
+                return
+            call_id = f"rtc_standin_{next(self.call_ids)}"
+            self._send(
+                201,
+                FAKE_SDP_ANSWER,
+                content_type='application/sdp',
+                headers={'Location': f"/v1/realtime/calls/{call_id}"}
+            )
+            return
+
+        self._send(404, json.dumps({"error": "not found"}))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=9090, faults=None):
+    """
+    Start the stand-in in a background thread
+
+    Returns:
+        The running ThreadingHTTPServer (call shutdown() to stop it)
+    """
+    if faults is not None:
+        RealtimeStandInHandler.faults = faults
+    server = ThreadingHTTPServer((host, port), RealtimeStandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fault-injecting Realtime API stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--hang-ms', type=float, default=60000.0)
+    args = parser.parse_args()
+
+    faults = FaultSettings(args.latency_ms, args.error_rate, args.error_status, args.hang_rate, args.hang_ms)
+    server = serve(args.host, args.port, faults)
+    print(f"Realtime stand-in listening on http://{args.host}:{server.server_address[1]}")
+    print(f"Faults: {faults.as_dict()}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
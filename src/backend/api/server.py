@@ -2,27 +2,119 @@
 Realtime API Server for Pharmacy Assistant
 WebRTC-based voice assistant using OpenAI Realtime API
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g
 from flask_cors import CORS
+import hmac
+import json
 import sys
 import os
+import time
+import uuid
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from services.realtime_service import create_realtime_session
 from dotenv import load_dotenv
 
+# Load environment before importing services that read configuration
 load_dotenv()
 
+from services.realtime_service import (
+    EPHEMERAL_POOL_SIZE,
+    REALTIME_MODEL,
+    REALTIME_URL,
+    create_realtime_call,
+    get_ephemeral_key_pool
+)
+from services.pharmacy_service import execute_function
+from services.circuit_breaker import CircuitOpenError
+from services.metrics import collect_metrics
+from services.telemetry_service import MAX_BEACON_BYTES, get_telemetry_store
+from services.inventory_service import (
+    INVENTORY_API_TOKEN,
+    MAX_INVENTORY_BODY_BYTES,
+    apply_inventory_updates,
+    start_inventory_feed
+)
+from services.warmup_service import get_warmup, start_warmup
+from services.logging_service import (
+    configure_logging,
+    elapsed_ms,
+    get_logger,
+    request_id_var,
+    session_id_var
+)
+from api.static_assets import load_asset_build
+
+configure_logging()
+log = get_logger("api")
+
 # Get the absolute path to the project root
 project_root = Path(__file__).parent.parent.parent.parent
 frontend_path = project_root / 'src' / 'frontend'
 
 # Set the static folder to the frontend directory
 app = Flask(__name__, static_folder=str(frontend_path / 'public'), static_url_path='')
-CORS(app)
+CORS(app, expose_headers=['X-Tool-Execution', 'X-Request-ID'])
+
+# Fingerprinted, precompressed frontend (scripts/build_assets.py), if built
+asset_build = load_asset_build(frontend_path / 'dist')
+
+
+
+def start_background_services():
+    """
+    Load services, indexes and config and open upstream connections (and
+    start minting ephemeral keys and tailing the inventory feed) before the
+    first user arrives; see /ready.
+
+    Called by the process that serves requests (run_dev_server, wsgi.py),
+    not on import, so processes that only import the app do not warm up,
+    mint keys or tail the feed.
+    """
+    start_warmup()
+    start_inventory_feed()
+
+
+def run_dev_server():
+    """Run the Flask development server with the reloader"""
+    # The reloader runs the program twice: a parent that only watches files
+    # and restarts the serving child, which it marks with WERKZEUG_RUN_MAIN
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    app.run(debug=True, port=8080, host='0.0.0.0')
+
+
+@app.before_request
+def bind_request_context():
+    """Give every request a correlation id (honouring an incoming X-Request-ID)"""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.log_tokens = (request_id_var.set(g.request_id), session_id_var.set(None))
+
+
+@app.after_request
+def add_request_id_header(response):
+    """Echo the correlation id so clients can quote it"""
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    return response
+
+
+@app.teardown_request
+def reset_request_context(exc):
+    tokens = g.pop('log_tokens', None)
+    if tokens:
+        session_id_var.reset(tokens[1])
+        request_id_var.reset(tokens[0])
+
+
+def _circuit_open_response(error):
+    """Fail fast while the upstream circuit breaker is open"""
+    return jsonify({
+        "success": False,
+        "error": "Voice service is temporarily unavailable. Please try again shortly.",
+        "retry_after": error.retry_after
+    }), 503, {'Retry-After': str(error.retry_after)}
 
 
 @app.route('/session', methods=['POST'])
@@ -39,21 +131,57 @@ def create_session():
             }), 400
 
         # Create session with OpenAI
-        answer_sdp = create_realtime_session(sdp_offer)
+        call = create_realtime_call(sdp_offer)
+
+        # Return SDP answer, telling the browser who executes tool calls
+        return call["answer_sdp"], 200, {
+            'Content-Type': 'application/sdp',
+            'X-Tool-Execution': call["tool_execution"]
+        }
 
-        # Return SDP answer
-        return answer_sdp, 200, {'Content-Type': 'application/sdp'}
+    except CircuitOpenError as e:
+        return _circuit_open_response(e)
 
     except Exception as e:
-        print(f"Error creating session: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("session.failed", error=str(e))
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 
+@app.route('/session', methods=['GET'])
+def get_session_token():
+    """Hand out a pre-minted ephemeral key so the browser can connect directly"""
+    pool = get_ephemeral_key_pool()
+    if pool is None:
+        return jsonify({
+            "success": False,
+            "error": "Ephemeral sessions are disabled"
+        }), 404
+
+    try:
+        key = pool.acquire()
+        return jsonify({
+            "success": True,
+            "client_secret": key["value"],
+            "expires_at": key["expires_at"],
+            "model": REALTIME_MODEL,
+            "realtime_url": REALTIME_URL,
+            "tool_execution": "client"
+        }), 200, {'Cache-Control': 'no-store'}
+
+    except CircuitOpenError as e:
+        return _circuit_open_response(e)
+
+    except Exception as e:
+        log.exception("ephemeral_key.failed", error=str(e))
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 503
+
+
 @app.route('/execute-tool', methods=['POST'])
 @app.route('/execute-function', methods=['POST'])
 def execute_tool():
@@ -62,34 +190,89 @@ def execute_tool():
         data = request.json
         function_name = data.get('function_name')
         arguments = data.get('arguments', {})
-
-        # Import pharmacy service
-        from services.pharmacy_service import execute_function
+        session_id = data.get('session_id')
+        if session_id:
+            session_id_var.set(session_id)
 
         # Execute the function
-        result = execute_function(function_name, arguments)
+        start = time.perf_counter()
+        result = execute_function(function_name, arguments, session_id=session_id)
+        log.info(
+            "tool.executed",
+            function=function_name,
+            success=bool(result.get("success")),
+            via="browser",
+            duration_ms=elapsed_ms(start)
+        )
 
         return jsonify(result)
 
     except Exception as e:
-        print(f"Error executing tool: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("tool.failed", function=(request.get_json(silent=True) or {}).get('function_name'), error=str(e))
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 
+@app.route('/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """Batched client timing samples (sent with navigator.sendBeacon)"""
+    # Beacons arrive as text/plain to avoid a CORS preflight, so parse regardless of type
+    body = request.stream.read(MAX_BEACON_BYTES + 1)
+    if len(body) > MAX_BEACON_BYTES:
+        return jsonify({"success": False, "error": "Beacon too large"}), 413
+
+    try:
+        get_telemetry_store().ingest(json.loads(body))
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid beacon: {e}"}), 400
+    return '', 204
+
+
+@app.route('/inventory/updates', methods=['POST'])
+def inventory_updates():
+    """Bulk stock updates, applied as one new catalog snapshot"""
+    # The server listens on all interfaces with open CORS, so writes are
+    # refused outright until a token is configured
+    if not INVENTORY_API_TOKEN:
+        return jsonify({
+            "success": False,
+            "error": "Unauthorized: inventory updates are disabled (INVENTORY_API_TOKEN is not set)"
+        }), 401
+
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != 'Bearer':
+        token = ''
+    if not hmac.compare_digest(token.encode(), INVENTORY_API_TOKEN.encode()):
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+
+    if request.content_length is not None and request.content_length > MAX_INVENTORY_BODY_BYTES:
+        return jsonify({"success": False, "error": "Request too large"}), 413
+
+    data = request.get_json(silent=True)
+    updates = data.get('updates') if isinstance(data, dict) else data
+    try:
+        return jsonify(apply_inventory_updates(updates, source="http"))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+
 @app.route('/')
 def serve_index():
     """Serve the Realtime interface"""
+    if asset_build is not None:
+        return asset_build.serve_page('unified-realtime.html')
     return send_from_directory(app.static_folder, 'unified-realtime.html')
 
 
 @app.route('/assets/<path:path>')
 def serve_assets(path):
     """Serve static assets (JS, CSS, etc.)"""
+    if asset_build is not None:
+        response = asset_build.serve_asset(path)
+        if response is not None:
+            return response
     assets_folder = frontend_path / 'assets'
     return send_from_directory(str(assets_folder), path)
 
@@ -108,21 +291,42 @@ def api_info():
         "version": "2.0.0",
         "status": "running",
         "endpoints": {
-            "/session": "POST - Create WebRTC session with OpenAI Realtime API",
+            "/session": "POST - Create WebRTC session with OpenAI Realtime API; "
+                        "GET - Get a pre-minted ephemeral key to connect directly",
             "/execute-function": "POST - Execute pharmacy functions",
-            "/health": "GET - Health check"
+            "/telemetry": "POST - Batched client latency samples",
+            "/inventory/updates": "POST - Bulk stock updates",
+            "/metrics": "GET - Runtime metrics",
+            "/health": "GET - Health check (process is up)",
+            "/ready": "GET - Readiness check (warmup finished, safe to route traffic)"
         }
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics (circuit breaker state, key pool, ...)"""
+    return jsonify(collect_metrics())
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({"status": "ok"})
 
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check: 503 until warmup has finished"""
+    warmup = get_warmup()
+    status = warmup.snapshot()
+    # Lets the page skip GET /session when no ephemeral keys are handed out
+    status["direct_sessions"] = EPHEMERAL_POOL_SIZE > 0
+    return jsonify(status), 200 if warmup.is_ready() else 503
+
+
 if __name__ == '__main__':
     print("Starting Pharmacy Assistant Realtime Server...")
     print("Server running on http://localhost:8080")
     print("Realtime Interface: http://localhost:8080/")
-    app.run(debug=True, port=8080, host='0.0.0.0')
\ No newline at end of file
+    run_dev_server()
\ No newline at end of file
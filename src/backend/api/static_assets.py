@@ -0,0 +1,204 @@
+"""
+Static Assets - Serves the fingerprinted, precompressed frontend build
+Built by scripts/build_assets.py; when no build exists, or the sources have
+changed since it was built, the server falls back to serving the source
+files directly
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from flask import Response, request
+
+from services.logging_service import get_logger
+
+log = get_logger("assets")
+
+# Fingerprinted URLs never change content, so browsers may cache them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Pages keep a stable URL and must be revalidated on every load
+PAGE_CACHE_CONTROL = 'no-cache'
+
+# Preferred order when the client accepts several encodings
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+CONTENT_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json',
+    '.svg': 'image/svg+xml',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.ico': 'image/x-icon',
+    '.txt': 'text/plain; charset=utf-8'
+}
+
+
+class BuiltFile:
+    """A built file and its precompressed variants, held in memory"""
+
+    def __init__(self, path, digest, encodings):
+        self.content_type = CONTENT_TYPES.get(path.suffix, 'application/octet-stream')
+        self.digest = digest
+        self.variants = {None: path.read_bytes()}
+        for encoding, suffix in ENCODING_SUFFIXES:
+            if encoding in encodings:
+                self.variants[encoding] = path.with_name(path.name + suffix).read_bytes()
+
+    def respond(self, cache_control):
+        """Build the response for the current request (304, or the best encoding)"""
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), self.variants)
+        etag = f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+        headers = {
+            'Cache-Control': cache_control,
+            'ETag': etag,
+            'Vary': 'Accept-Encoding'
+        }
+
+        if etag in _parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=304, headers=headers)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(self.variants[encoding], status=200, headers=headers, content_type=self.content_type)
+
+
+def negotiate_encoding(accept_encoding, variants):
+    """Pick the best precompressed variant the client accepts (None = identity)"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    for encoding, _ in ENCODING_SUFFIXES:
+        if encoding in variants and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _parse_etags(header):
+    tags = {tag.strip() for tag in header.split(',') if tag.strip()}
+    return {tag[2:] if tag.startswith('W/') else tag for tag in tags}
+
+
+class AssetBuild:
+    """
+    Index of a frontend build.
+
+    Fingerprinted asset paths are served immutable; the logical (source)
+    paths are still accepted so stale pages and direct links keep working.
+    """
+
+    def __init__(self, dist_path, manifest=None):
+        if manifest is None:
+            manifest = json.loads((dist_path / 'manifest.json').read_text(encoding='utf-8'))
+
+        # URL path -> (file, Cache-Control)
+        self.assets = {}
+        for logical, entry in manifest["assets"].items():
+            built = BuiltFile(dist_path / 'assets' / entry["path"], entry["hash"], entry["encodings"])
+            self.assets[entry["path"]] = (built, IMMUTABLE_CACHE_CONTROL)
+            # Unversioned URL: same bytes, but must be revalidated
+            self.assets[logical] = (built, PAGE_CACHE_CONTROL)
+
+        self.pages = {
+            name: BuiltFile(dist_path / entry["path"], entry["hash"], entry["encodings"])
+            for name, entry in manifest["pages"].items()
+        }
+
+    def serve_asset(self, path):
+        """Response for an asset path, or None if it is not part of the build"""
+        found = self.assets.get(path)
+        if found is None:
+            return None
+        built, cache_control = found
+        return built.respond(cache_control)
+
+    def serve_page(self, name):
+        """Response for a page, or None if it is not part of the build"""
+        built = self.pages.get(name)
+        if built is None:
+            return None
+        return built.respond(PAGE_CACHE_CONTROL)
+
+
+def _source_hash(path):
+    # Same digest as scripts/build_assets.py content_hash()
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+
+def stale_sources(manifest, frontend_path):
+    """
+    Source files that differ from the build described by a manifest
+
+    Args:
+        manifest: Parsed dist/manifest.json
+        frontend_path: Frontend directory holding assets/ and public/
+
+    Returns:
+        Sorted paths (relative to frontend_path) edited, added or removed
+        since the build
+    """
+    assets_path = frontend_path / 'assets'
+    built = manifest["assets"]
+    stale = set()
+
+    for logical, entry in built.items():
+        source = assets_path / logical
+        if not source.is_file() or _source_hash(source) != entry["hash"]:
+            stale.add(f"assets/{logical}")
+    for source in assets_path.rglob('*'):
+        logical = source.relative_to(assets_path).as_posix()
+        if source.is_file() and logical not in built:
+            stale.add(f"assets/{logical}")
+
+    for name, entry in manifest["pages"].items():
+        source = frontend_path / 'public' / name
+        # Builds without a page source hash predate this check; rebuild them
+        if not source.is_file() or _source_hash(source) != entry.get("source_hash"):
+            stale.add(f"public/{name}")
+
+    return sorted(stale)
+
+
+def load_asset_build(dist_path):
+    """
+    Load the frontend build
+
+    Returns:
+        The AssetBuild, or None if scripts/build_assets.py has not been run or
+        the sources have changed since (the sources are served instead)
+    """
+    dist_path = Path(dist_path)
+    manifest_path = dist_path / 'manifest.json'
+    if not manifest_path.exists():
+        return None
+
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    frontend_path = dist_path.parent
+    # Deployments that ship only dist/ have nothing to compare against
+    if (frontend_path / 'assets').is_dir():
+        stale = stale_sources(manifest, frontend_path)
+        if stale:
+            log.warning(
+                "assets.build_stale",
+                dist=str(dist_path),
+                changed=stale,
+                hint="run scripts/build_assets.py; serving source files until then"
+            )
+            return None
+
+    return AssetBuild(dist_path, manifest)
@@ -0,0 +1,163 @@
+"""
+Circuit Breaker - Fail fast when an upstream dependency is degraded
+Tracks error rate and latency over a rolling window and stops sending
+traffic to the upstream while it is unhealthy
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"Upstream '{name}' is temporarily unavailable, retry in {retry_after} seconds"
+        )
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    The circuit opens when, over the last `window_seconds` and with at least
+    `min_calls` calls, either the failure rate or the slow-call rate reaches
+    its threshold. After `open_seconds` it lets `half_open_max_calls` probe
+    calls through: a successful probe closes the circuit, a failed or slow
+    one opens it again.
+    """
+
+    def __init__(
+        self,
+        name,
+        window_seconds=60,
+        min_calls=5,
+        failure_rate_threshold=0.5,
+        slow_call_seconds=10,
+        slow_call_rate_threshold=0.8,
+        open_seconds=30,
+        half_open_max_calls=1
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, failed, latency_seconds)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    def call(self, func, *args, **kwargs):
+        """Run func through the breaker; any exception counts as a failure"""
+        self.before_call()
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - start)
+            raise
+        self.record(True, time.monotonic() - start)
+        return result
+
+    def before_call(self):
+        """Admit a call, or raise CircuitOpenError to fail fast"""
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self.rejected_calls += 1
+                    raise CircuitOpenError(self.name, max(1, int(remaining + 0.999)))
+                self.state = HALF_OPEN
+                self._half_open_in_flight = 0
+
+            if self.state == HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self.rejected_calls += 1
+                    raise CircuitOpenError(self.name, 1)
+                self._half_open_in_flight += 1
+
+    def record(self, success, latency):
+        """Record the outcome of an admitted call"""
+        slow = latency >= self.slow_call_seconds
+
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if success and not slow:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._calls.append((now, not success, latency))
+            self._prune(now)
+
+            if self.state == CLOSED and self._should_open():
+                self._open(now)
+
+    def snapshot(self):
+        """Current state and window statistics, for metrics"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            total = len(self._calls)
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+            latencies = sorted(latency for _, _, latency in self._calls)
+
+            retry_after = 0
+            if self.state == OPEN:
+                retry_after = max(0, int(self._opened_at + self.open_seconds - now + 0.999))
+
+            return {
+                "state": self.state,
+                "window_calls": total,
+                "window_failure_rate": failures / total if total else 0.0,
+                "window_slow_call_rate": slow / total if total else 0.0,
+                "window_p50_latency_ms": latencies[total // 2] * 1000 if total else 0.0,
+                "window_p95_latency_ms": latencies[min(total - 1, int(total * 0.95))] * 1000 if total else 0.0,
+                "retry_after_seconds": retry_after,
+                "rejected_calls": self.rejected_calls,
+                "times_opened": self.times_opened
+            }
+
+    def _prune(self, now):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _should_open(self):
+        total = len(self._calls)
+        if total < self.min_calls:
+            return False
+
+        failures = sum(1 for _, failed, _ in self._calls if failed)
+        slow = sum(1 for _, _, latency in self._calls if latency >= self.slow_call_seconds)
+        return (failures / total >= self.failure_rate_threshold or
+                slow / total >= self.slow_call_rate_threshold)
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self.times_opened += 1
@@ -0,0 +1,339 @@
+"""
+Data Loader - Catalog and user data from files, reloaded while running
+When PHARMACY_DATA_DIR is set, medications, branches and users are read from
+files in that directory instead of the built-in mock data. A background
+watcher polls the files; when one changes, the new data is parsed and indexed
+on the watcher thread and the finished snapshot is swapped in, so requests
+never wait for a reload and never see half-loaded data.
+
+Files (each optional; missing ones keep the built-in data):
+    medications.json / medications.csv   records shaped like MEDICATIONS_DB,
+                                         plus optional "branches": branch ids
+                                         holding it (omitted: branch stock kept)
+    branches.json / branches.csv         branch_id, name, city, region
+                                         (and optional region_name)
+    users.json                           shaped like USERS_DB
+"""
+import csv
+import json
+import os
+import threading
+import time
+
+from services.logging_service import elapsed_ms, get_logger
+from services.metrics import register_metrics
+from services import pharmacy_service
+
+log = get_logger("data_loader")
+
+PHARMACY_DATA_DIR = os.getenv('PHARMACY_DATA_DIR', '')
+PHARMACY_DATA_POLL_SECONDS = float(os.getenv('PHARMACY_DATA_POLL_SECONDS', '2'))
+
+# Accepted file names per dataset, in order of preference
+DATA_FILES = {
+    "medications": ("medications.json", "medications.csv"),
+    "branches": ("branches.json", "branches.csv"),
+    "users": ("users.json",)
+}
+
+TRUE_STRINGS = {"true", "1", "yes", "כן"}
+FALSE_STRINGS = {"false", "0", "no", "לא", ""}
+
+
+class DataLoadError(ValueError):
+    """A data file is missing fields or malformed"""
+
+
+def _read_records(path):
+    """Records of a JSON (list or object) or CSV file"""
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _boolean(value, field, where):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_STRINGS:
+        return True
+    if text in FALSE_STRINGS:
+        return False
+    raise DataLoadError(f"{where}: '{field}' must be true or false (got {value!r})")
+
+
+def _list(value):
+    """A list, or a ';'-separated CSV cell"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(";") if item.strip()]
+
+
+def _number(value, field, where):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise DataLoadError(f"{where}: '{field}' must hold numbers (got {value!r})") from None
+    return int(number) if number.is_integer() else number
+
+
+def _required(record, fields, where):
+    for field in fields:
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise DataLoadError(f"{where}: missing '{field}'")
+
+
+def parse_medications(records):
+    """
+    Validate medication records
+
+    Returns:
+        (medications, {Hebrew name: [branch ids]})
+    """
+    if not isinstance(records, list):
+        raise DataLoadError("medications: expected a list of records")
+
+    medications = []
+    branch_stock = {}
+    for position, record in enumerate(records):
+        where = f"medications[{position}]"
+        if not isinstance(record, dict):
+            raise DataLoadError(f"{where}: expected an object")
+        _required(record, ("name_he", "name_en", "active_ingredient"), where)
+
+        medication = {
+            "name_he": record["name_he"].strip(),
+            "name_en": record["name_en"].strip(),
+            "active_ingredient": record["active_ingredient"].strip(),
+            "strength_mg": [_number(value, "strength_mg", where) for value in _list(record.get("strength_mg"))],
+            "instructions_dosage": record.get("instructions_dosage") or "",
+            "in_stock": _boolean(record.get("in_stock", False), "in_stock", where),
+            "requires_prescription": _boolean(record.get("requires_prescription", False), "requires_prescription", where),
+            "category": record.get("category") or "",
+            "warnings": record.get("warnings") or ""
+        }
+        medications.append(medication)
+        if record.get("branches") is not None:
+            branch_stock[medication["name_he"]] = _list(record["branches"])
+    return medications, branch_stock
+
+
+def parse_branches(records):
+    """
+    Validate branch records
+
+    Returns:
+        (branches, {region id: Hebrew name})
+    """
+    if not isinstance(records, list):
+        raise DataLoadError("branches: expected a list of records")
+
+    branches = []
+    regions = dict(pharmacy_service.REGIONS)
+    seen = set()
+    for position, record in enumerate(records):
+        where = f"branches[{position}]"
+        if not isinstance(record, dict):
+            raise DataLoadError(f"{where}: expected an object")
+        _required(record, ("branch_id", "name", "region"), where)
+        if record["branch_id"] in seen:
+            raise DataLoadError(f"{where}: duplicate branch_id '{record['branch_id']}'")
+        seen.add(record["branch_id"])
+
+        branch = {
+            "branch_id": record["branch_id"].strip(),
+            "name": record["name"].strip(),
+            "city": (record.get("city") or "").strip(),
+            "region": record["region"].strip()
+        }
+        branches.append(branch)
+        if record.get("region_name"):
+            regions[branch["region"]] = record["region_name"].strip()
+        regions.setdefault(branch["region"], branch["region"])
+    return branches, regions
+
+
+def parse_users(records):
+    """Validate user records (USERS_DB-shaped object keyed by user id)"""
+    if not isinstance(records, dict):
+        raise DataLoadError("users: expected an object keyed by user id")
+
+    users = {}
+    for user_id, record in records.items():
+        where = f"users[{user_id}]"
+        if not isinstance(record, dict):
+            raise DataLoadError(f"{where}: expected an object")
+        _required(record, ("name",), where)
+        users[str(user_id)] = {
+            "name": record["name"],
+            "prescriptions": list(record.get("prescriptions", [])),
+            "drug_history": list(record.get("drug_history", [])),
+            "allergies": list(record.get("allergies", []))
+        }
+    return users
+
+
+class DataWatcher:
+    """
+    Loads the data files and reloads them when they change.
+
+    A file that fails to parse leaves the current data in place; it is
+    retried on every poll until it loads (e.g. once a copy finishes).
+    """
+
+    def __init__(self, data_dir, poll_seconds=PHARMACY_DATA_POLL_SECONDS):
+        self.data_dir = data_dir
+        self.poll_seconds = poll_seconds
+        self.reloads = {}
+        self.failures = {}
+        self.last_reload = {}
+        self.last_error = None
+
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _path(self, dataset):
+        for name in DATA_FILES[dataset]:
+            path = os.path.join(self.data_dir, name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _signature(self, path):
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """
+        Reload every dataset whose file changed since the last load
+
+        Returns:
+            Names of the datasets reloaded
+        """
+        with self._lock:
+            changed = {}
+            for dataset in DATA_FILES:
+                path = self._path(dataset)
+                signature = self._signature(path)
+                if signature is not None and signature != self._signatures.get(dataset):
+                    changed[dataset] = signature
+
+            reloaded = []
+            if "medications" in changed or "branches" in changed:
+                reloaded += self._reload(changed, ["branches", "medications"], self._load_catalog)
+            if "users" in changed:
+                reloaded += self._reload(changed, ["users"], self._load_users)
+            return reloaded
+
+    def _reload(self, changed, datasets, loader):
+        """Run a loader for the changed datasets; their new data is swapped in together"""
+        datasets = [dataset for dataset in datasets if dataset in changed]
+        paths = {dataset: changed[dataset][0] for dataset in datasets}
+        start = time.perf_counter()
+        try:
+            counts = loader(paths)
+        except (OSError, ValueError) as e:
+            for dataset in datasets:
+                self.failures[dataset] = self.failures.get(dataset, 0) + 1
+            if str(e) != self.last_error:
+                log.warning("data.reload_failed", datasets=datasets, error=str(e))
+            self.last_error = str(e)
+            return []
+
+        duration_ms = elapsed_ms(start)
+        self.last_error = None
+        for dataset in datasets:
+            self._signatures[dataset] = changed[dataset]
+            self.reloads[dataset] = self.reloads.get(dataset, 0) + 1
+            self.last_reload[dataset] = {"path": paths[dataset], "at": time.time(), "duration_ms": duration_ms}
+        log.info("data.reloaded", datasets=datasets, duration_ms=duration_ms, **counts)
+        return datasets
+
+    def _load_catalog(self, paths):
+        # Files are parsed here; whatever did not change (and the branch stock
+        # of medications listed without "branches") is kept by replace_catalog
+        branches = regions = medications = branch_stock = None
+        if "branches" in paths:
+            branches, regions = parse_branches(_read_records(paths["branches"]))
+        if "medications" in paths:
+            medications, branch_stock = parse_medications(_read_records(paths["medications"]))
+
+        catalog = pharmacy_service.replace_catalog(medications, branches, regions, branch_stock)
+        return {"medications": len(catalog.medications), "branches": len(catalog.branches.branches)}
+
+    def _load_users(self, paths):
+        users = parse_users(_read_records(paths["users"]))
+        pharmacy_service.replace_users(users)
+        return {"users": len(users)}
+
+    def start(self):
+        """Start polling in a background thread (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.load()
+            except Exception as e:
+                log.exception("data.watch_failed", error=str(e))
+
+    def snapshot(self):
+        catalog = pharmacy_service.get_catalog()
+        users = pharmacy_service.get_users()
+        return {
+            "data_dir": self.data_dir,
+            "reloads": dict(self.reloads),
+            "failures": dict(self.failures),
+            "last_error": self.last_error,
+            "last_reload": {dataset: dict(info) for dataset, info in self.last_reload.items()},
+            "catalog_version": catalog.version if catalog else None,
+            "users_version": users.version,
+            "counts": {
+                "medications": len(catalog.medications) if catalog else 0,
+                "branches": len(catalog.branches.branches) if catalog else 0,
+                "users": len(users.records)
+            }
+        }
+
+
+_watcher = DataWatcher(PHARMACY_DATA_DIR) if PHARMACY_DATA_DIR else None
+if _watcher is not None:
+    register_metrics("pharmacy_data", _watcher.snapshot)
+
+
+def start_data_watcher():
+    """
+    Load PHARMACY_DATA_DIR once and keep watching it (no-op when unset)
+
+    Raises DataLoadError if a data file present at startup cannot be loaded.
+
+    Returns:
+        Datasets loaded from files, or None when no data directory is set
+    """
+    if _watcher is None:
+        return None
+    pharmacy_service.build_catalog_indexes()
+    loaded = _watcher.load()
+    # Serving the built-in mock data in place of a broken data file would be
+    # worse than staying unready
+    if _watcher.last_error is not None:
+        raise DataLoadError(_watcher.last_error)
+    _watcher.start()
+    return loaded
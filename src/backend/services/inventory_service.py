@@ -0,0 +1,217 @@
+"""
+Inventory Service - Live stock updates for the medication catalog
+Stock changes arrive in bulk over HTTP (POST /inventory/updates) or as JSON
+lines appended to a feed file that is tailed in the background. Each batch
+becomes one new catalog snapshot, swapped in without blocking readers.
+"""
+import json
+import os
+import threading
+import time
+
+from services.logging_service import get_logger
+from services.metrics import register_metrics
+from services.pharmacy_service import (
+    StockUpdateError,
+    apply_stock_updates,
+    get_catalog,
+    parse_stock_update
+)
+
+log = get_logger("inventory")
+
+# JSON-lines file of stock updates to tail (empty disables the feed)
+INVENTORY_FEED_PATH = os.getenv('INVENTORY_FEED_PATH', '')
+INVENTORY_FEED_POLL_SECONDS = float(os.getenv('INVENTORY_FEED_POLL_SECONDS', '1'))
+
+# Bearer token required by POST /inventory/updates (empty disables the endpoint)
+INVENTORY_API_TOKEN = os.getenv('INVENTORY_API_TOKEN', '')
+
+MAX_INVENTORY_BATCH = 5000
+MAX_INVENTORY_BODY_BYTES = 1024 * 1024
+
+
+class InventoryStats:
+    """Counters of applied stock updates, by source"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = {}
+        self.updates = {}
+        self.changed = 0
+        self.unknown = 0
+        self.last_applied_at = None
+
+    def record(self, source, updates, result):
+        with self._lock:
+            self.batches[source] = self.batches.get(source, 0) + 1
+            self.updates[source] = self.updates.get(source, 0) + updates
+            self.changed += result["changed"]
+            self.unknown += len(result["unknown"]) + len(result["unknown_branches"])
+            self.last_applied_at = time.time()
+
+    def snapshot(self):
+        catalog = get_catalog()
+        with self._lock:
+            stats = {
+                "catalog_version": catalog.version if catalog else None,
+                "catalog_built_at": catalog.built_at if catalog else None,
+                "batches": dict(self.batches),
+                "updates": dict(self.updates),
+                "changed": self.changed,
+                "unknown": self.unknown,
+                "last_applied_at": self.last_applied_at
+            }
+        stats["feed"] = _feed.snapshot() if _feed is not None else None
+        return stats
+
+
+_stats = InventoryStats()
+
+
+def apply_inventory_updates(updates, source="http"):
+    """
+    Validate and apply a batch of stock updates
+
+    Args:
+        updates: List of {"name": ..., "in_stock": bool} or
+            {"name": ..., "quantity": int}
+        source: Where the batch came from (for metrics)
+
+    Returns:
+        Dictionary with success, updates received, medications changed,
+        unknown names and the new catalog version
+    """
+    if not isinstance(updates, list):
+        raise StockUpdateError("Expected a list of stock updates")
+    if len(updates) > MAX_INVENTORY_BATCH:
+        raise StockUpdateError(f"Batch has more than {MAX_INVENTORY_BATCH} updates")
+
+    # A bad entry rejects the whole batch, so a partial upload is never applied
+    parsed = []
+    for position, update in enumerate(updates):
+        try:
+            parsed.append(parse_stock_update(update))
+        except StockUpdateError as e:
+            raise StockUpdateError(f"Update {position}: {e}") from None
+
+    result = apply_stock_updates(parsed)
+    _stats.record(source, len(parsed), result)
+    log.info("inventory.applied", source=source, updates=len(parsed), **result)
+    return {"success": True, "received": len(parsed), **result}
+
+
+class InventoryFeed:
+    """
+    Tails a JSON-lines file of stock updates.
+
+    New complete lines are read every poll interval and applied as one batch.
+    Malformed lines are skipped and counted. When the file is replaced or
+    truncated (log rotation) it is read again from the start.
+    """
+
+    def __init__(self, path, poll_seconds=INVENTORY_FEED_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.offset = 0
+        self.lines = 0
+        self.invalid = 0
+        self.last_poll_at = None
+        self.last_error = None
+
+        self._inode = None
+        self._pending = b""
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start tailing in a background thread (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="inventory-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        log.info("inventory.feed_started", path=self.path)
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                if str(e) != self.last_error:
+                    log.warning("inventory.feed_failed", path=self.path, error=str(e))
+                self.last_error = str(e)
+            self._stop.wait(self.poll_seconds)
+
+    def _read_new_lines(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            self._inode = stat.st_ino
+            self.offset = 0
+            self._pending = b""
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        self.offset += len(data)
+
+        # Keep a partially written last line for the next poll
+        data = self._pending + data
+        complete, _, self._pending = data.rpartition(b"\n")
+        return complete.splitlines() if complete else []
+
+    def poll(self):
+        """
+        Apply the lines appended since the last poll
+
+        Returns:
+            Number of updates applied
+        """
+        self.last_poll_at = time.time()
+        parsed = []
+        invalid = 0
+        for line in self._read_new_lines():
+            if not line.strip():
+                continue
+            self.lines += 1
+            try:
+                parsed.append(parse_stock_update(json.loads(line)))
+            except ValueError as e:
+                invalid += 1
+                log.warning("inventory.feed_invalid_line", path=self.path, error=str(e))
+
+        self.invalid += invalid
+        if parsed:
+            result = apply_stock_updates(parsed)
+            _stats.record("feed", len(parsed), result)
+            log.info("inventory.applied", source="feed", updates=len(parsed), **result)
+        return len(parsed)
+
+    def snapshot(self):
+        return {
+            "path": self.path,
+            "offset": self.offset,
+            "lines": self.lines,
+            "invalid": self.invalid,
+            "last_poll_at": self.last_poll_at,
+            "last_error": self.last_error
+        }
+
+
+_feed = InventoryFeed(INVENTORY_FEED_PATH) if INVENTORY_FEED_PATH else None
+register_metrics("inventory", _stats.snapshot)
+
+
+def start_inventory_feed():
+    """Start tailing INVENTORY_FEED_PATH, if configured"""
+    if _feed is not None:
+        _feed.start()
+    return _feed
@@ -0,0 +1,244 @@
+"""
+Logging Service - Non-blocking structured (JSON lines) logging
+Request threads only enqueue records; a background listener formats and
+writes them, so slow or contended stdout never blocks a request.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from services.metrics import register_metrics
+
+# Correlation ids for the request currently being handled
+request_id_var = contextvars.ContextVar("request_id", default=None)
+session_id_var = contextvars.ContextVar("session_id", default=None)
+
+LOGGER_NAMESPACE = "pharmacy"
+DEFAULT_QUEUE_SIZE = 10000
+
+# Fraction of INFO/DEBUG records kept for high-volume events
+# (override with LOG_SAMPLE_RATES="event=rate,event=rate")
+DEFAULT_SAMPLE_RATES = {
+    "tool.executed": 0.1
+}
+
+# Attributes every LogRecord has; anything else was passed as a field
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "fields"}
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger taking an event name plus keyword fields:
+
+        log.info("session.created", call_id=call_id, duration_ms=12.3)
+    """
+
+    def process(self, msg, kwargs):
+        passthrough = {"exc_info", "stack_info", "stacklevel", "extra"}
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in passthrough}
+        extra = kwargs.setdefault("extra", {})
+        extra["fields"] = fields
+        return msg, kwargs
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+
+        for key in ("request_id", "session_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+
+        entry.update(getattr(record, "fields", None) or {})
+
+        # Fields passed through a plain logging.Logger's extra=
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and key not in entry and key not in ("request_id", "session_id"):
+                entry[key] = value
+
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of INFO/DEBUG records for configured events"""
+
+    def __init__(self, sample_rates):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.sample_rates.get(record.msg)
+        if rate is None or rate >= 1.0:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+
+        self.sampled_out += 1
+        return False
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without ever blocking; drops them when the queue is full.
+
+    Correlation ids and exception text are captured here, on the calling
+    thread, because they are not available to the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+
+        # Resolve %-style args now so the record holds no live references
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+_sampling_filter = None
+_configure_lock = threading.Lock()
+
+
+def _parse_sample_rates(value):
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in (value or "").split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(stream=None):
+    """
+    Install the queue-based JSON logging pipeline (idempotent)
+
+    LOG_LEVEL: Minimum level (default INFO)
+    LOG_QUEUE_SIZE: Records buffered before new ones are dropped
+    LOG_SAMPLE_RATES: Per-event sampling, e.g. "tool.executed=0.1"
+    """
+    global _handler, _listener, _sampling_filter
+
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+
+        _handler = BoundedQueueHandler(log_queue)
+        _sampling_filter = SamplingFilter(_parse_sample_rates(os.getenv("LOG_SAMPLE_RATES")))
+        _handler.addFilter(_sampling_filter)
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter())
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+
+        logger = logging.getLogger(LOGGER_NAMESPACE)
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        logger.addHandler(_handler)
+        logger.propagate = False
+
+        register_metrics("logging", logging_stats)
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logging_stats():
+    """Pipeline counters, for metrics"""
+    if _handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "enqueued": _handler.enqueued,
+        "dropped": _handler.dropped,
+        "sampled_out": _sampling_filter.sampled_out,
+        "queue_depth": _handler.queue.qsize()
+    }
+
+
+def get_logger(name):
+    """Get a structured logger under the pharmacy namespace"""
+    return StructuredLogger(logging.getLogger(f"{LOGGER_NAMESPACE}.{name}"), {})
+
+
+class log_context:
+    """
+    Bind correlation ids for the duration of a block:
+
+        with log_context(session_id=session_id):
+            ...
+    """
+
+    def __init__(self, request_id=None, session_id=None):
+        self.request_id = request_id
+        self.session_id = session_id
+        self._tokens = []
+
+    def __enter__(self):
+        if self.request_id is not None:
+            self._tokens.append((request_id_var, request_id_var.set(self.request_id)))
+        if self.session_id is not None:
+            self._tokens.append((session_id_var, session_id_var.set(self.session_id)))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for var, token in reversed(self._tokens):
+            var.reset(token)
+        return False
+
+
+def elapsed_ms(start):
+    """Milliseconds since a time.perf_counter() start value"""
+    return round((time.perf_counter() - start) * 1000, 2)
@@ -0,0 +1,28 @@
+"""
+Metrics - Registry of runtime statistics exposed on /metrics
+Components register a provider that returns a JSON-serializable snapshot
+"""
+import threading
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def register_metrics(name, provider):
+    """Register a zero-argument callable returning a metrics dictionary"""
+    with _providers_lock:
+        _providers[name] = provider
+
+
+def collect_metrics():
+    """Collect a snapshot from every registered provider"""
+    with _providers_lock:
+        providers = list(_providers.items())
+
+    metrics = {}
+    for name, provider in providers:
+        try:
+            metrics[name] = provider()
+        except Exception as e:
+            metrics[name] = {"error": str(e)}
+    return metrics
@@ -2,6 +2,13 @@
 Pharmacy Service - Mock medication database and function execution
 Provides medication information for the Realtime API
 """
+import threading
+import time
+
+from services.metrics import register_metrics
+from services.singleflight import SingleFlight
+from services.tool_schemas import validate_arguments
+from services.verification_store import get_verification_store
 
 # Mock medication database
 MEDICATIONS_DB = [
@@ -51,11 +58,60 @@ MEDICATIONS_DB = [
     }
 ]
 
+# Mock branch network (region ids are used by find_branches_with_stock)
+REGIONS = {
+    "center": "מרכז",
+    "jerusalem": "ירושלים",
+    "north": "צפון",
+    "south": "דרום"
+}
+
+BRANCHES = [
+    {"branch_id": "TLV-01", "name": "בית מרקחת דיזנגוף", "city": "תל אביב", "region": "center"},
+    {"branch_id": "TLV-02", "name": "בית מרקחת רמת אביב", "city": "תל אביב", "region": "center"},
+    {"branch_id": "PTK-01", "name": "בית מרקחת פתח תקווה", "city": "פתח תקווה", "region": "center"},
+    {"branch_id": "JLM-01", "name": "בית מרקחת מלחה", "city": "ירושלים", "region": "jerusalem"},
+    {"branch_id": "JLM-02", "name": "בית מרקחת בן יהודה", "city": "ירושלים", "region": "jerusalem"},
+    {"branch_id": "HFA-01", "name": "בית מרקחת חורב", "city": "חיפה", "region": "north"},
+    {"branch_id": "BSV-01", "name": "בית מרקחת באר שבע", "city": "באר שבע", "region": "south"}
+]
+
+# Branches holding each medication (by Hebrew name)
+BRANCH_STOCK = {
+    "נורופן": ["TLV-01", "TLV-02", "PTK-01", "JLM-01", "JLM-02", "HFA-01", "BSV-01"],
+    "אקמול": ["TLV-01", "PTK-01", "JLM-02", "HFA-01", "BSV-01"],
+    "ונטולין": ["TLV-02", "JLM-01", "HFA-01"],
+    "אופטלגין": []
+}
+
+# Allergen classes, one bit each. An allergy to any substance of a class is
+# treated as a possible reaction to every other substance in it (e.g. an
+# aspirin allergy and other NSAIDs).
+ALLERGEN_CLASSES = {
+    "nsaid": "נוגדי דלקת שאינם סטרואידים (NSAIDs)",
+    "pyrazolone": "פירזולונים",
+    "paracetamol": "פרצטמול",
+    "penicillin": "פניצילינים",
+    "beta_agonist": "מרחיבי סימפונות (בטא-אגוניסטים)"
+}
+
+# Allergen classes of active ingredients and allergy names
+SUBSTANCE_ALLERGEN_CLASSES = {
+    "אספירין": ["nsaid"],
+    "איבופרופן": ["nsaid"],
+    "נפרוקסן": ["nsaid"],
+    "דיקלופנק": ["nsaid"],
+    "מטמיזול": ["pyrazolone", "nsaid"],
+    "פרצטמול": ["paracetamol"],
+    "פניצילין": ["penicillin"],
+    "אמוקסיצילין": ["penicillin"],
+    "סלבוטמול": ["beta_agonist"]
+}
+
 # Mock user database
 USERS_DB = {
     "123456789": {
         "name": "יוסי כהן",
-        "verified": False,
         "prescriptions": [
             {
                 "medication": "ונטולין",
@@ -83,24 +139,384 @@ USERS_DB = {
 }
 
 
+class BranchDirectory:
+    """
+    Branches with a bit position each, and per-region bitmasks.
+
+    Branch stock is kept as one integer bitset per medication, so "which
+    branches in this region have it" is a single AND of two integers no
+    matter how many branches there are.
+    """
+
+    __slots__ = ("branches", "bits", "regions", "region_masks", "region_keys")
+
+    def __init__(self, branches, regions):
+        self.branches = tuple(branches)
+        self.regions = dict(regions)
+        self.bits = {branch["branch_id"]: position for position, branch in enumerate(self.branches)}
+
+        region_masks = {key: 0 for key in regions}
+        for position, branch in enumerate(self.branches):
+            region_masks[branch["region"]] = region_masks.get(branch["region"], 0) | (1 << position)
+        self.region_masks = region_masks
+
+        # Regions can be given by id or by Hebrew name
+        self.region_keys = {key: key for key in regions}
+        self.region_keys.update({name.lower(): key for key, name in regions.items()})
+
+    def mask(self, branch_ids):
+        """Bitset of the given branch ids (unknown ids are ignored)"""
+        mask = 0
+        for branch_id in branch_ids:
+            if branch_id in self.bits:
+                mask |= 1 << self.bits[branch_id]
+        return mask
+
+    def region(self, region):
+        """Region id for an id or Hebrew name, or None"""
+        return self.region_keys.get(region.strip().lower())
+
+    def members(self, mask, limit):
+        """Up to `limit` branches of a bitset, in directory order"""
+        found = []
+        while mask and len(found) < limit:
+            lowest = mask & -mask
+            found.append(dict(self.branches[lowest.bit_length() - 1]))
+            mask ^= lowest
+        return found
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog with its lookup indexes.
+
+    Snapshots are never modified once built. Stock updates build a new
+    snapshot (sharing the unchanged medication records) and swap it in with a
+    single assignment, so readers take no lock: a request grabs the current
+    snapshot once and sees one consistent catalog for its whole duration.
+    """
+
+    __slots__ = ("version", "medications", "name_index", "ingredient_index",
+                 "branches", "branch_stock", "built_at")
+
+    def __init__(self, medications, branches, branch_stock, version=1):
+        name_index = {}
+        ingredient_index = {}
+        for med in medications:
+            name_index.setdefault(med["name_he"].lower(), med)
+            name_index.setdefault(med["name_en"].lower(), med)
+            ingredient_index.setdefault(med["active_ingredient"].lower(), []).append(med)
+
+        self.version = version
+        self.medications = tuple(medications)
+        self.name_index = name_index
+        self.ingredient_index = {key: tuple(meds) for key, meds in ingredient_index.items()}
+        self.branches = branches
+        self.branch_stock = branch_stock
+        self.built_at = time.time()
+
+    def find(self, name_lower):
+        """Medication by exact name, falling back to a partial-name scan"""
+        med = self.name_index.get(name_lower)
+        if med is not None:
+            return med
+
+        for med in self.medications:
+            if (name_lower in med["name_he"].lower() or
+                name_lower in med["name_en"].lower()):
+                return med
+        return None
+
+    def with_stock(self, stock, branch_stock):
+        """
+        New snapshot with updated stock
+
+        Args:
+            stock: {Hebrew name: in_stock} for changed chain-wide flags
+            branch_stock: {Hebrew name: branch bitset} for changed branch stock
+
+        Returns:
+            The next snapshot version
+        """
+        medications = [
+            {**med, "in_stock": stock[med["name_he"]]} if med["name_he"] in stock else med
+            for med in self.medications
+        ]
+        return CatalogSnapshot(
+            medications,
+            self.branches,
+            {**self.branch_stock, **branch_stock},
+            self.version + 1
+        )
+
+
+class StockUpdateError(ValueError):
+    """A stock update is malformed"""
+
+
+ALLERGEN_BITS = {key: 1 << position for position, key in enumerate(ALLERGEN_CLASSES)}
+
+SUBSTANCE_ALLERGEN_MASKS = {
+    substance.lower(): sum(ALLERGEN_BITS[key] for key in classes)
+    for substance, classes in SUBSTANCE_ALLERGEN_CLASSES.items()
+}
+
+
+def build_allergy_index(users):
+    """
+    Precompute every user's allergies as allergen-class bitmasks
+
+    Args:
+        users: USERS_DB-shaped dictionary
+
+    Returns:
+        {user_id: (combined mask, ((allergy, mask), ...))}; allergies with
+        no known class have mask 0 and only match their own name
+    """
+    index = {}
+    for user_id, user in users.items():
+        allergies = tuple(
+            (allergy, SUBSTANCE_ALLERGEN_MASKS.get(allergy.strip().lower(), 0))
+            for allergy in user.get("allergies", [])
+        )
+        combined = 0
+        for _, mask in allergies:
+            combined |= mask
+        index[user_id] = (combined, allergies)
+    return index
+
+
+class UserSnapshot:
+    """
+    Immutable view of the user records with their precomputed allergy masks.
+
+    Replaced as a whole when user data is reloaded, like CatalogSnapshot.
+    """
+
+    __slots__ = ("version", "records", "allergy_index", "built_at")
+
+    def __init__(self, records, version=1):
+        self.version = version
+        self.records = records
+        self.allergy_index = build_allergy_index(records)
+        self.built_at = time.time()
+
+
+# Current user records; replaced as a whole, never modified in place
+_users = UserSnapshot(USERS_DB)
+
+
+# Current catalog snapshot; replaced as a whole, never modified in place
+_catalog = None
+_catalog_write_lock = threading.Lock()
+
+
+def get_catalog():
+    """Current catalog snapshot (read it once per request)"""
+    return _catalog
+
+
+def get_users():
+    """Current user snapshot"""
+    return _users
+
+
+def _initial_catalog():
+    """Catalog snapshot of the built-in mock data"""
+    branches = BranchDirectory(BRANCHES, REGIONS)
+    branch_stock = {name: branches.mask(ids) for name, ids in BRANCH_STOCK.items()}
+    return CatalogSnapshot(MEDICATIONS_DB, branches, branch_stock)
+
+
+def replace_catalog(medications=None, branches=None, regions=None, branch_stock=None):
+    """
+    Swap in a catalog built from new data (e.g. a reloaded data file)
+
+    Whatever is not given is kept from the current catalog, including the
+    stock updates applied to it. Branch stock is replaced only for the
+    medications listed in branch_stock; the others keep their current
+    branch stock (carried over to the new branch list by branch id).
+
+    The new snapshot is built under the catalog write lock, so stock updates
+    cannot land between reading the current catalog and the swap and be lost.
+
+    Args:
+        medications: MEDICATIONS_DB-shaped records
+        branches: BRANCHES-shaped records
+        regions: {region id: Hebrew name}, required with branches
+        branch_stock: {Hebrew medication name: [branch ids]}
+
+    Returns:
+        The new catalog snapshot
+    """
+    global _catalog
+
+    with _catalog_write_lock:
+        current = _catalog or _initial_catalog()
+        old = current.branches
+        directory = BranchDirectory(branches, regions) if branches is not None else old
+        medications = medications if medications is not None else current.medications
+        branch_stock = branch_stock or {}
+
+        stock = {}
+        for med in medications:
+            name = med["name_he"]
+            if name in branch_stock:
+                stock[name] = directory.mask(branch_stock[name])
+            elif name in current.branch_stock:
+                mask = current.branch_stock[name]
+                stock[name] = mask if directory is old else directory.mask(
+                    branch["branch_id"] for position, branch in enumerate(old.branches) if mask >> position & 1
+                )
+
+        snapshot = CatalogSnapshot(medications, directory, stock, current.version + 1 if _catalog else 1)
+        _catalog = snapshot
+    return snapshot
+
+
+def replace_users(records):
+    """
+    Swap in new user records
+
+    Args:
+        records: USERS_DB-shaped dictionary
+
+    Returns:
+        The new user snapshot
+    """
+    global _users
+
+    snapshot = UserSnapshot(records, _users.version + 1)
+    _users = snapshot
+    return snapshot
+
+
+def build_catalog_indexes():
+    """
+    Build the catalog snapshot from MEDICATIONS_DB, unless it already exists.
+
+    Exact matches are answered from the snapshot's indexes; partial names
+    still fall back to a scan of the medications.
+
+    Returns:
+        Number of medications in the catalog
+    """
+    global _catalog
+
+    with _catalog_write_lock:
+        if _catalog is None:
+            _catalog = _initial_catalog()
+        return len(_catalog.medications)
+
+
+def parse_stock_update(update):
+    """
+    Validate one stock update
+
+    Args:
+        update: {"name": Hebrew or English name, "in_stock": bool} or
+            {"name": ..., "quantity": units on hand}, with an optional
+            "branch" id to update a single branch
+
+    Returns:
+        (lowercase name, in_stock, branch id or None)
+    """
+    if not isinstance(update, dict):
+        raise StockUpdateError("Stock update must be an object")
+
+    name = update.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise StockUpdateError("Stock update needs a medication 'name'")
+
+    if isinstance(update.get("in_stock"), bool):
+        in_stock = update["in_stock"]
+    elif isinstance(update.get("quantity"), int) and not isinstance(update["quantity"], bool):
+        in_stock = update["quantity"] > 0
+    else:
+        raise StockUpdateError(f"Stock update for '{name}' needs a boolean 'in_stock' or an integer 'quantity'")
+
+    branch = update.get("branch")
+    if branch is not None and (not isinstance(branch, str) or not branch.strip()):
+        raise StockUpdateError(f"Stock update for '{name}' has an invalid 'branch'")
+
+    return name.strip().lower(), in_stock, branch.strip() if branch else None
+
+
+def apply_stock_updates(updates):
+    """
+    Apply a batch of stock updates as one new catalog snapshot
+
+    Updates are matched by exact Hebrew or English name and applied in
+    order, so the last update of a medication wins. A branch update sets
+    that branch's stock and makes the chain-wide flag "in stock at any
+    branch"; an update without a branch sets only the chain-wide flag.
+    Readers keep using the previous snapshot until the new one is swapped in.
+
+    Args:
+        updates: Parsed updates, (lowercase name, in_stock, branch) tuples
+
+    Returns:
+        Dictionary with the number of changed medications, unknown names and
+        branches, and the catalog version
+    """
+    global _catalog
+
+    with _catalog_write_lock:
+        current = _catalog
+        records = {}
+        stock = {}
+        branch_stock = {}
+        unknown = []
+        unknown_branches = []
+        for name, in_stock, branch in updates:
+            med = current.name_index.get(name)
+            if med is None:
+                unknown.append(name)
+                continue
+            key = med["name_he"]
+            records[key] = med
+
+            if branch is not None:
+                bit = current.branches.bits.get(branch)
+                if bit is None:
+                    unknown_branches.append(branch)
+                    continue
+                mask = branch_stock.get(key, current.branch_stock.get(key, 0))
+                mask = mask | (1 << bit) if in_stock else mask & ~(1 << bit)
+                branch_stock[key] = mask
+                in_stock = mask != 0
+            stock[key] = in_stock
+
+        # Only records whose stock actually changes get copied
+        stock = {key: value for key, value in stock.items() if records[key]["in_stock"] != value}
+        branch_stock = {key: mask for key, mask in branch_stock.items()
+                        if current.branch_stock.get(key, 0) != mask}
+        if stock or branch_stock:
+            _catalog = current.with_stock(stock, branch_stock)
+
+        return {
+            "changed": len(stock.keys() | branch_stock.keys()),
+            "unknown": unknown,
+            "unknown_branches": unknown_branches,
+            "version": _catalog.version
+        }
+
+
 def get_medication_by_name(name, strength_mg=None):
     """Get medication information by name"""
-    name_lower = name.lower()
-    
-    for med in MEDICATIONS_DB:
-        if (name_lower in med["name_he"].lower() or 
-            name_lower in med["name_en"].lower()):
-            
-            result = med.copy()
-            
-            # Filter by strength if specified
-            if strength_mg and strength_mg in med["strength_mg"]:
-                result["strength_mg"] = [strength_mg]
-            
-            return {
-                "success": True,
-                "medication": result
-            }
+    med = _catalog.find(name.lower())
+
+    if med is not None:
+        result = med.copy()
+        
+        # Filter by strength if specified
+        if strength_mg and strength_mg in med["strength_mg"]:
+            result["strength_mg"] = [strength_mg]
+        
+        return {
+            "success": True,
+            "medication": result
+        }
     
     return {
         "success": False,
@@ -112,16 +528,20 @@ def search_medications_by_ingredient(ingredient):
     """Search medications by active ingredient"""
     ingredient_lower = ingredient.lower()
     results = []
-    
-    for med in MEDICATIONS_DB:
-        if ingredient_lower in med["active_ingredient"].lower():
-            results.append({
-                "name_he": med["name_he"],
-                "name_en": med["name_en"],
-                "strength_mg": med["strength_mg"],
-                "in_stock": med["in_stock"],
-                "requires_prescription": med["requires_prescription"]
-            })
+
+    catalog = _catalog
+    matches = catalog.ingredient_index.get(ingredient_lower)
+    if matches is None:
+        matches = [med for med in catalog.medications if ingredient_lower in med["active_ingredient"].lower()]
+
+    for med in matches:
+        results.append({
+            "name_he": med["name_he"],
+            "name_en": med["name_en"],
+            "strength_mg": med["strength_mg"],
+            "in_stock": med["in_stock"],
+            "requires_prescription": med["requires_prescription"]
+        })
     
     if results:
         return {
@@ -162,9 +582,8 @@ def get_alternative_medications(name):
     ingredient = original["medication"]["active_ingredient"]
     alternatives = []
     
-    for med in MEDICATIONS_DB:
-        if (med["active_ingredient"] == ingredient and 
-            med["name_he"] != original["medication"]["name_he"]):
+    for med in _catalog.ingredient_index.get(ingredient.lower(), ()):
+        if med["name_he"] != original["medication"]["name_he"]:
             alternatives.append({
                 "name_he": med["name_he"],
                 "name_en": med["name_en"],
@@ -182,14 +601,56 @@ def get_alternative_medications(name):
     }
 
 
-def verify_user_id(user_id):
-    """Verify user identity"""
-    if user_id in USERS_DB:
-        USERS_DB[user_id]["verified"] = True
+# Branches listed per find_branches_with_stock answer
+MAX_BRANCH_RESULTS = 10
+
+
+def find_branches_with_stock(name, region=None):
+    """Find branches that have a medication in stock, optionally within one region"""
+    catalog = _catalog
+    med = catalog.find(name.lower())
+    if med is None:
+        return {
+            "success": False,
+            "error": f"לא נמצאה תרופה בשם '{name}'"
+        }
+
+    branches = catalog.branches
+    stock = catalog.branch_stock.get(med["name_he"], 0)
+    region_key = None
+    matches = stock
+    if region:
+        region_key = branches.region(region)
+        if region_key is None:
+            return {
+                "success": False,
+                "error": f"אזור לא מוכר '{region}'. אזורים אפשריים: {', '.join(branches.regions.values())}"
+            }
+        matches = stock & branches.region_masks[region_key]
+
+    result = {
+        "success": True,
+        "medication_name": med["name_he"],
+        "region": branches.regions[region_key] if region_key else None,
+        "branches": branches.members(matches, MAX_BRANCH_RESULTS),
+        "count": bin(matches).count("1")
+    }
+    if region_key and not matches:
+        result["other_regions"] = [
+            branches.regions.get(key, key) for key, mask in branches.region_masks.items() if stock & mask
+        ]
+    return result
+
+
+def verify_user_id(user_id, session_id=None):
+    """Verify user identity for the current session"""
+    user = _users.records.get(user_id)
+    if user is not None:
+        get_verification_store().mark_verified(session_id, user_id)
         return {
             "success": True,
             "verified": True,
-            "user_name": USERS_DB[user_id]["name"],
+            "user_name": user["name"],
             "message": "זהות אומתה בהצלחה"
         }
     
@@ -200,15 +661,16 @@ def verify_user_id(user_id):
     }
 
 
-def get_user_prescriptions(user_id):
+def get_user_prescriptions(user_id, session_id=None):
     """Get user's active prescriptions"""
-    if user_id not in USERS_DB:
+    user = _users.records.get(user_id)
+    if user is None:
         return {
             "success": False,
             "error": "משתמש לא נמצא"
         }
     
-    if not USERS_DB[user_id]["verified"]:
+    if not get_verification_store().is_verified(session_id, user_id):
         return {
             "success": False,
             "error": "נדרש אימות זהות. אנא השתמש ב-verify_user_id תחילה"
@@ -216,20 +678,21 @@ def get_user_prescriptions(user_id):
     
     return {
         "success": True,
-        "user_name": USERS_DB[user_id]["name"],
-        "prescriptions": USERS_DB[user_id]["prescriptions"]
+        "user_name": user["name"],
+        "prescriptions": user["prescriptions"]
     }
 
 
-def get_user_drug_history(user_id):
+def get_user_drug_history(user_id, session_id=None):
     """Get user's drug usage history"""
-    if user_id not in USERS_DB:
+    user = _users.records.get(user_id)
+    if user is None:
         return {
             "success": False,
             "error": "משתמש לא נמצא"
         }
     
-    if not USERS_DB[user_id]["verified"]:
+    if not get_verification_store().is_verified(session_id, user_id):
         return {
             "success": False,
             "error": "נדרש אימות זהות. אנא השתמש ב-verify_user_id תחילה"
@@ -237,20 +700,21 @@ def get_user_drug_history(user_id):
     
     return {
         "success": True,
-        "user_name": USERS_DB[user_id]["name"],
-        "drug_history": USERS_DB[user_id]["drug_history"]
+        "user_name": user["name"],
+        "drug_history": user["drug_history"]
     }
 
 
-def get_user_allergies(user_id):
+def get_user_allergies(user_id, session_id=None):
     """Get user's known allergies"""
-    if user_id not in USERS_DB:
+    user = _users.records.get(user_id)
+    if user is None:
         return {
             "success": False,
             "error": "משתמש לא נמצא"
         }
     
-    if not USERS_DB[user_id]["verified"]:
+    if not get_verification_store().is_verified(session_id, user_id):
         return {
             "success": False,
             "error": "נדרש אימות זהות. אנא השתמש ב-verify_user_id תחילה"
@@ -258,25 +722,144 @@ def get_user_allergies(user_id):
     
     return {
         "success": True,
-        "user_name": USERS_DB[user_id]["name"],
-        "allergies": USERS_DB[user_id]["allergies"]
+        "user_name": user["name"],
+        "allergies": user["allergies"]
     }
 
 
+def check_allergy_conflict(user_id, medication_name, session_id=None):
+    """Check a medication's active ingredient against the user's known allergies"""
+    profile = _users.allergy_index.get(user_id)
+    if profile is None:
+        return {
+            "success": False,
+            "error": "משתמש לא נמצא"
+        }
+
+    if not get_verification_store().is_verified(session_id, user_id):
+        return {
+            "success": False,
+            "error": "נדרש אימות זהות. אנא השתמש ב-verify_user_id תחילה"
+        }
+
+    med = _catalog.find(medication_name.lower())
+    if med is None:
+        return {
+            "success": False,
+            "error": f"לא נמצאה תרופה בשם '{medication_name}'"
+        }
+
+    ingredient = med["active_ingredient"].lower()
+    ingredient_mask = SUBSTANCE_ALLERGEN_MASKS.get(ingredient, 0)
+    user_mask, allergies = profile
+    overlap = user_mask & ingredient_mask
+
+    matching = [allergy for allergy, mask in allergies
+                if mask & ingredient_mask or allergy.strip().lower() == ingredient]
+    return {
+        "success": True,
+        "medication_name": med["name_he"],
+        "active_ingredient": med["active_ingredient"],
+        "conflict": bool(matching),
+        "matching_allergies": matching,
+        "allergen_classes": [ALLERGEN_CLASSES[key] for key, bit in ALLERGEN_BITS.items() if overlap & bit],
+        "unclassified_allergies": [allergy for allergy, mask in allergies if not mask]
+    }
+
+
+# Sections returned by get_user_profile
+PROFILE_FIELDS = ("prescriptions", "drug_history", "allergies")
+
+
+def get_user_profile(user_id, fields=None, session_id=None):
+    """Get several sections of the user's medical profile in one call"""
+    user = _users.records.get(user_id)
+    if user is None:
+        return {
+            "success": False,
+            "error": "משתמש לא נמצא"
+        }
+
+    if not get_verification_store().is_verified(session_id, user_id):
+        return {
+            "success": False,
+            "error": "נדרש אימות זהות. אנא השתמש ב-verify_user_id תחילה"
+        }
+
+    if not fields:
+        fields = PROFILE_FIELDS
+
+    unknown = [field for field in fields if field not in PROFILE_FIELDS]
+    if unknown:
+        return {
+            "success": False,
+            "error": f"שדות לא מוכרים: {', '.join(unknown)}. שדות אפשריים: {', '.join(PROFILE_FIELDS)}"
+        }
+
+    result = {
+        "success": True,
+        "user_name": user["name"]
+    }
+    for field in fields:
+        result[field] = user[field]
+
+    return result
+
+
+build_catalog_indexes()
+
+
 # Function registry
 FUNCTIONS = {
     "get_medication_by_name": get_medication_by_name,
     "search_medications_by_ingredient": search_medications_by_ingredient,
     "check_prescription_requirement": check_prescription_requirement,
     "get_alternative_medications": get_alternative_medications,
+    "find_branches_with_stock": find_branches_with_stock,
     "verify_user_id": verify_user_id,
     "get_user_prescriptions": get_user_prescriptions,
     "get_user_drug_history": get_user_drug_history,
-    "get_user_allergies": get_user_allergies
+    "get_user_allergies": get_user_allergies,
+    "get_user_profile": get_user_profile,
+    "check_allergy_conflict": check_allergy_conflict
+}
+
+# Functions that need the caller's Realtime session id
+SESSION_SCOPED_FUNCTIONS = {
+    "verify_user_id",
+    "get_user_prescriptions",
+    "get_user_drug_history",
+    "get_user_allergies",
+    "get_user_profile",
+    "check_allergy_conflict"
+}
+
+
+# Read-only catalog lookups; identical concurrent calls share one execution
+COALESCED_FUNCTIONS = {
+    "get_medication_by_name",
+    "search_medications_by_ingredient",
+    "check_prescription_requirement",
+    "get_alternative_medications",
+    "find_branches_with_stock"
 }
 
+_tool_calls = SingleFlight()
+register_metrics("tool_coalescing", _tool_calls.snapshot)
 
-def execute_function(function_name, arguments):
+
+def _coalescing_key(function_name, arguments):
+    """
+    Function name plus the exact arguments
+
+    Calls that differ only in case or spacing are not shared: the lookups
+    echo the name they were given (e.g. in "not found" errors), so only
+    identical arguments are guaranteed an identical result.
+    """
+    return function_name, tuple(sorted((name, repr(value)) for name, value in arguments.items()))
+
+
+def execute_function(function_name, arguments, session_id=None):
     """Execute a pharmacy function by name"""
     if function_name not in FUNCTIONS:
         return {
@@ -286,6 +869,37 @@ def execute_function(function_name, arguments):
     
     try:
         func = FUNCTIONS[function_name]
+
+        # The session id comes from the server, never from model arguments
+        if isinstance(arguments, dict):
+            arguments = {name: value for name, value in arguments.items() if name != "session_id"}
+
+        arguments, error = validate_arguments(function_name, arguments)
+        if error:
+            return {
+                "success": False,
+                "error": error
+            }
+
+        if function_name in SESSION_SCOPED_FUNCTIONS:
+            # Verification is per session; without one there is nothing to
+            # record it against or check it in
+            if not session_id:
+                return {
+                    "success": False,
+                    "error": (f"{function_name} requires a session id; identity verification "
+                              "is only available within a Realtime session")
+                }
+            arguments["session_id"] = session_id
+
+        if function_name in COALESCED_FUNCTIONS:
+            result, shared = _tool_calls.do(
+                _coalescing_key(function_name, arguments),
+                lambda: func(**arguments)
+            )
+            # Every caller gets its own top-level dictionary
+            return dict(result) if shared else result
+
         result = func(**arguments)
         return result
     except Exception as e:
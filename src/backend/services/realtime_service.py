@@ -3,23 +3,144 @@ Realtime Service - Handles WebRTC session creation with OpenAI Realtime API
 """
 import os
 import json
+import functools
+import hashlib
+import threading
+import time
 import requests
 from pathlib import Path
 
+from services.circuit_breaker import CircuitBreaker
+from services.logging_service import elapsed_ms, get_logger
+from services.metrics import register_metrics
 
+log = get_logger("realtime")
+
+# Upstream endpoints (overridable to point at a local stand-in)
+REALTIME_URL = os.getenv('OPENAI_REALTIME_URL', 'https://api.openai.com/v1/realtime')
+SIDEBAND_URL = os.getenv(
+    'OPENAI_REALTIME_SIDEBAND_URL',
+    REALTIME_URL.replace('https://', 'wss://', 1).replace('http://', 'ws://', 1)
+)
+
+# "client": the browser executes tool calls via /execute-function
+# "server": the backend answers tool calls over a sideband connection
+TOOL_EXECUTION_MODE = os.getenv('TOOL_EXECUTION_MODE', 'client')
+
+# Ephemeral client secrets minted ahead of time (0 disables the pool)
+REALTIME_SESSIONS_URL = os.getenv('OPENAI_REALTIME_SESSIONS_URL', f"{REALTIME_URL}/sessions")
+EPHEMERAL_POOL_SIZE = int(os.getenv('REALTIME_EPHEMERAL_POOL_SIZE', '0'))
+
+# Hand out a secret only if it stays valid long enough for the browser handshake
+EPHEMERAL_MIN_REMAINING_SECONDS = 20
+
+REALTIME_MODEL = "gpt-4o-realtime-preview-2024-12-17"
+
+# (connect, read) timeouts for upstream calls
+UPSTREAM_TIMEOUT = (
+    float(os.getenv('UPSTREAM_CONNECT_TIMEOUT_SECONDS', '5')),
+    float(os.getenv('UPSTREAM_READ_TIMEOUT_SECONDS', '30'))
+)
+
+# Shared by every call to the Realtime upstream so a degraded upstream
+# makes /session fail fast instead of tying up workers until the timeout
+upstream_breaker = CircuitBreaker(
+    "openai_realtime",
+    window_seconds=float(os.getenv('UPSTREAM_BREAKER_WINDOW_SECONDS', '60')),
+    min_calls=int(os.getenv('UPSTREAM_BREAKER_MIN_CALLS', '5')),
+    failure_rate_threshold=float(os.getenv('UPSTREAM_BREAKER_FAILURE_RATE', '0.5')),
+    slow_call_seconds=float(os.getenv('UPSTREAM_BREAKER_SLOW_CALL_SECONDS', '10')),
+    slow_call_rate_threshold=float(os.getenv('UPSTREAM_BREAKER_SLOW_CALL_RATE', '0.8')),
+    open_seconds=float(os.getenv('UPSTREAM_BREAKER_OPEN_SECONDS', '30'))
+)
+register_metrics("upstream_circuit_breaker", upstream_breaker.snapshot)
+
+
+# Keep-alive connection pool, so sessions after the first skip the TCP/TLS handshake
+_http = requests.Session()
+
+
+class UpstreamUnavailableError(Exception):
+    """The upstream answered with a server error or rate limit"""
+
+
+def _post_upstream(url, **kwargs):
+    """POST to the upstream through the circuit breaker"""
+    def post():
+        response = _http.post(url, timeout=UPSTREAM_TIMEOUT, **kwargs)
+        # Only upstream-side failures count against the breaker
+        if response.status_code >= 500 or response.status_code == 429:
+            raise UpstreamUnavailableError(
+                f"OpenAI API error: {response.status_code} - {response.text}"
+            )
+        return response
+
+    return upstream_breaker.call(post)
+
+
+def warm_upstream_connection():
+    """
+    Open a pooled connection to the Realtime upstream ahead of the first session
+
+    Any HTTP answer means the connection is established; the response itself
+    is ignored and does not count against the circuit breaker.
+
+    Returns:
+        Status code of the warming request
+    """
+    response = _http.head(REALTIME_URL, timeout=UPSTREAM_TIMEOUT)
+    return response.status_code
+
+
+# Prompt config, and its compacted build from scripts/compact_prompts.py
+PROMPTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'prompts')
+COMPACT_PROMPTS_PATH = os.path.join(PROMPTS_PATH, 'compact')
+USE_COMPACT_PROMPTS = os.getenv('USE_COMPACT_PROMPTS', 'true').lower() == 'true'
+
+
+@functools.lru_cache(maxsize=None)
+def _use_compact_prompts():
+    """
+    Whether to serve the compacted prompt build
+
+    The build is used only if it was generated from the current source
+    files; a stale build is ignored rather than served.
+    """
+    manifest_path = os.path.join(COMPACT_PROMPTS_PATH, 'manifest.json')
+    if not USE_COMPACT_PROMPTS or not os.path.exists(manifest_path):
+        return False
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    for name, digest in manifest["sources"].items():
+        with open(os.path.join(PROMPTS_PATH, name), 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() != digest:
+                log.warning("prompts.compact_stale", file=name)
+                return False
+
+    log.info("prompts.compact_loaded", **manifest.get("report", {}).get("total", {}))
+    return True
+
+
+def _prompt_config_path(name):
+    """Path of a prompt config file, preferring the compacted build"""
+    if _use_compact_prompts():
+        return os.path.join(COMPACT_PROMPTS_PATH, name)
+    return os.path.join(PROMPTS_PATH, name)
+
+
+@functools.lru_cache(maxsize=None)
 def load_system_prompt():
-    """Load system prompt from file"""
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    prompt_path = os.path.join(current_dir, '..', 'config', 'prompts', 'system-prompt.txt')
-    with open(prompt_path, 'r', encoding='utf-8') as f:
+    """Load system prompt from file (read once per process)"""
+    with open(_prompt_config_path('system-prompt.txt'), 'r', encoding='utf-8') as f:
         return f.read()
 
 
+@functools.lru_cache(maxsize=None)
 def load_function_definitions():
-    """Load function definitions from file"""
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    functions_path = os.path.join(current_dir, '..', 'config', 'prompts', 'function-definitions.json')
-    with open(functions_path, 'r', encoding='utf-8') as f:
+    """Load function definitions from file (read once per process)"""
+    with open(_prompt_config_path('function-definitions.json'), 'r', encoding='utf-8') as f:
         functions = json.load(f)
 
     # Convert to Realtime API format (add "type": "function" wrapper)
@@ -35,28 +156,23 @@ def load_function_definitions():
     return tools
 
 
-def create_realtime_session(sdp_offer, language='he'):
+def build_session_config(language='he'):
     """
-    Create a WebRTC session with OpenAI Realtime API
+    Build the Realtime session configuration shared by every connection flow
 
     Args:
-        sdp_offer: SDP offer from client
         language: Language code (he for Hebrew, en for English)
 
     Returns:
-        SDP answer from OpenAI
+        Session configuration dictionary
     """
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable is not set")
-
     # Load system prompt and tools
     system_prompt = load_system_prompt()
     tools = load_function_definitions()
 
     # Create session configuration
     session_config = {
-        "model": "gpt-4o-realtime-preview-2024-12-17",
+        "model": REALTIME_MODEL,
         "modalities": ["text", "audio"],
         "instructions": system_prompt,
         "voice": "alloy",  # Hebrew-compatible voice
@@ -78,8 +194,54 @@ def create_realtime_session(sdp_offer, language='he'):
         "max_response_output_tokens": 4096
     }
 
+    return session_config
+
+
+def create_realtime_session(sdp_offer, language='he'):
+    """
+    Create a WebRTC session with OpenAI Realtime API
+
+    Args:
+        sdp_offer: SDP offer from client
+        language: Language code (he for Hebrew, en for English)
+
+    Returns:
+        SDP answer from OpenAI
+    """
+    return create_realtime_call(sdp_offer, language)["answer_sdp"]
+
+
+def _parse_call_id(location):
+    """Extract the call id from the upstream Location header"""
+    if not location:
+        return None
+    return location.rstrip('/').rsplit('/', 1)[-1] or None
+
+
+def create_realtime_call(sdp_offer, language='he'):
+    """
+    Create a WebRTC call with OpenAI Realtime API
+
+    When TOOL_EXECUTION_MODE is "server", a sideband connection is attached
+    to the call and tool calls are answered by the backend.
+
+    Args:
+        sdp_offer: SDP offer from client
+        language: Language code (he for Hebrew, en for English)
+
+    Returns:
+        Dictionary with the SDP answer, the upstream call id and the
+        tool execution mode the browser should use
+    """
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set")
+
+    session_config = build_session_config(language)
+    tools = session_config["tools"]
+
     # OpenAI Realtime API uses multipart form data with SDP + session config
-    url = "https://api.openai.com/v1/realtime"
+    url = REALTIME_URL
 
     headers = {
         "Authorization": f"Bearer {api_key}"
@@ -93,30 +255,210 @@ def create_realtime_session(sdp_offer, language='he'):
         'session': (None, json.dumps(session_config), 'application/json')
     }
 
-    print("[Realtime Service] Creating session with OpenAI Realtime API...")
-    print(f"[Realtime Service] Language: {language}")
-    print(f"[Realtime Service] Tools count: {len(tools)}")
+    start = time.perf_counter()
 
     try:
-        response = requests.post(
+        response = _post_upstream(
             url,
             headers=headers,
-            files=files,
-            timeout=30
+            files=files
         )
 
         # Accept both 200 (OK) and 201 (Created) as success
         if response.status_code not in [200, 201]:
             error_msg = f"OpenAI API error: {response.status_code} - {response.text}"
-            print(f"[Realtime Service] Error: {error_msg}")
+            log.error("session.upstream_error", status=response.status_code, duration_ms=elapsed_ms(start))
             raise Exception(error_msg)
 
         # Response should be the SDP answer
         answer_sdp = response.text
-        print(f"[Realtime Service] Successfully created session (status: {response.status_code})")
-        print("[Realtime Service] Received SDP answer from OpenAI")
-        return answer_sdp
 
     except requests.exceptions.RequestException as e:
-        print(f"[Realtime Service] Request failed: {e}")
+        log.error("session.request_failed", error=str(e), duration_ms=elapsed_ms(start))
         raise Exception(f"Failed to create session: {str(e)}")
+
+    call_id = _parse_call_id(response.headers.get('Location'))
+    tool_execution = 'client'
+
+    if TOOL_EXECUTION_MODE == 'server' and call_id:
+        try:
+            from services.sideband_service import start_sideband
+            start_sideband(call_id, api_key, SIDEBAND_URL)
+            tool_execution = 'server'
+        except Exception as e:
+            # The browser can still execute tools itself
+            log.warning("sideband.unavailable", call_id=call_id, error=str(e))
+
+    log.info(
+        "session.created",
+        call_id=call_id,
+        language=language,
+        tools=len(tools),
+        tool_execution=tool_execution,
+        status=response.status_code,
+        duration_ms=elapsed_ms(start)
+    )
+
+    return {
+        "answer_sdp": answer_sdp,
+        "call_id": call_id,
+        "tool_execution": tool_execution
+    }
+
+
+def mint_ephemeral_key(language='he'):
+    """
+    Mint a short-lived client secret the browser can use to connect directly
+
+    Returns:
+        Dictionary with the secret value and its expiry (unix seconds)
+    """
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set")
+
+    try:
+        response = _post_upstream(
+            REALTIME_SESSIONS_URL,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            },
+            json=build_session_config(language)
+        )
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Failed to mint ephemeral key: {str(e)}")
+
+    if response.status_code not in [200, 201]:
+        raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
+
+    client_secret = response.json()["client_secret"]
+    return {
+        "value": client_secret["value"],
+        "expires_at": client_secret["expires_at"]
+    }
+
+
+class EphemeralKeyPool:
+    """
+    Pool of pre-minted ephemeral client secrets.
+
+    A background thread keeps `size` secrets ready and replaces them before
+    they expire, so handing one out never waits on the upstream.
+    """
+
+    def __init__(self, size, language='he', min_remaining=EPHEMERAL_MIN_REMAINING_SECONDS):
+        self.size = size
+        self.language = language
+        self.min_remaining = min_remaining
+        self._keys = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.minted = 0
+        self.misses = 0
+        self.mint_errors = 0
+
+    def start(self):
+        """Start the background refill thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ephemeral-key-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refill thread"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def acquire(self):
+        """
+        Take a fresh ephemeral key, minting one inline if the pool is empty
+
+        Returns:
+            Dictionary with the secret value and its expiry
+        """
+        with self._lock:
+            self._prune()
+            key = self._keys.pop(0) if self._keys else None
+            if key is None:
+                self.misses += 1
+
+        self._wakeup.set()
+        if key is not None:
+            return key
+
+        return mint_ephemeral_key(self.language)
+
+    def available(self):
+        """Number of usable keys currently in the pool"""
+        with self._lock:
+            self._prune()
+            return len(self._keys)
+
+    def stats(self):
+        """Pool statistics, for metrics"""
+        return {
+            "target_size": self.size,
+            "available": self.available(),
+            "minted": self.minted,
+            "misses": self.misses,
+            "mint_errors": self.mint_errors
+        }
+
+    def _prune(self):
+        cutoff = time.time() + self.min_remaining
+        self._keys = [key for key in self._keys if key["expires_at"] > cutoff]
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                self._prune()
+                missing = self.size - len(self._keys)
+
+            for _ in range(missing):
+                try:
+                    key = mint_ephemeral_key(self.language)
+                except Exception as e:
+                    self.mint_errors += 1
+                    log.warning("ephemeral_pool.refill_failed", error=str(e))
+                    break
+                with self._lock:
+                    self._keys.append(key)
+                    self._keys.sort(key=lambda k: k["expires_at"])
+                self.minted += 1
+
+            # Sleep until the oldest key is about to become unusable
+            with self._lock:
+                if len(self._keys) < self.size:
+                    delay = 1.0
+                else:
+                    delay = max(0.5, self._keys[0]["expires_at"] - self.min_remaining - time.time())
+
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+
+_ephemeral_pool = None
+_ephemeral_pool_lock = threading.Lock()
+
+
+def get_ephemeral_key_pool():
+    """
+    Get the process-wide ephemeral key pool, starting it on first use
+
+    Returns:
+        EphemeralKeyPool, or None when REALTIME_EPHEMERAL_POOL_SIZE is 0
+    """
+    global _ephemeral_pool
+    if EPHEMERAL_POOL_SIZE <= 0:
+        return None
+
+    if _ephemeral_pool is None:
+        with _ephemeral_pool_lock:
+            if _ephemeral_pool is None:
+                pool = EphemeralKeyPool(EPHEMERAL_POOL_SIZE)
+                pool.start()
+                register_metrics("ephemeral_key_pool", pool.stats)
+                _ephemeral_pool = pool
+    return _ephemeral_pool
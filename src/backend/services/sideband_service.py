@@ -0,0 +1,146 @@
+"""
+Sideband Service - Server-side tool execution for Realtime calls
+Holds a control WebSocket next to the browser's WebRTC connection and answers
+function calls directly from pharmacy_service, so tool results never travel
+through the browser.
+"""
+import json
+import threading
+import time
+
+import websocket
+
+from services.logging_service import elapsed_ms, get_logger, log_context
+from services.pharmacy_service import execute_function
+
+log = get_logger("sideband")
+
+# Active sideband connections by call id
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+class SidebandToolExecutor:
+    """
+    Control connection for a single Realtime call.
+
+    The same call id is used as the session id for pharmacy functions, so
+    identity verification is scoped to this call.
+    """
+
+    def __init__(self, call_id, api_key, sideband_url):
+        self.call_id = call_id
+        self.api_key = api_key
+        self.url = f"{sideband_url}?call_id={call_id}"
+        self.ws = None
+        self._send_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Open the control connection and start answering tool calls"""
+        self.ws = websocket.create_connection(
+            self.url,
+            header=[f"Authorization: Bearer {self.api_key}"],
+            timeout=10
+        )
+        # Blocking reads for the lifetime of the call
+        self.ws.settimeout(None)
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"sideband-{self.call_id}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        """Close the control connection"""
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+    def _send(self, event):
+        with self._send_lock:
+            self.ws.send(json.dumps(event))
+
+    def _run(self):
+        try:
+            while True:
+                message = self.ws.recv()
+                if not message:
+                    break
+
+                event = json.loads(message)
+                if event.get("type") == "response.function_call_arguments.done":
+                    self._handle_function_call(event)
+        except (websocket.WebSocketConnectionClosedException, OSError):
+            pass
+        except Exception as e:
+            log.exception("sideband.failed", call_id=self.call_id, error=str(e))
+        finally:
+            with _executors_lock:
+                if _executors.get(self.call_id) is self:
+                    del _executors[self.call_id]
+            self.close()
+
+    def _handle_function_call(self, event):
+        start = time.perf_counter()
+        with log_context(session_id=self.call_id):
+            try:
+                arguments = json.loads(event.get("arguments") or "{}")
+                result = execute_function(event["name"], arguments, session_id=self.call_id)
+            except json.JSONDecodeError as e:
+                result = {
+                    "success": False,
+                    "error": f"Invalid function arguments: {e}"
+                }
+
+            log.info(
+                "tool.executed",
+                function=event["name"],
+                success=bool(result.get("success")),
+                via="sideband",
+                duration_ms=elapsed_ms(start)
+            )
+
+        self._send({
+            "type": "conversation.item.create",
+            "item": {
+                "type": "function_call_output",
+                "call_id": event["call_id"],
+                "output": json.dumps(result, ensure_ascii=False)
+            }
+        })
+        self._send({"type": "response.create"})
+
+
+def start_sideband(call_id, api_key, sideband_url):
+    """
+    Attach a server-side tool executor to a Realtime call
+
+    Returns:
+        The running SidebandToolExecutor
+    """
+    executor = SidebandToolExecutor(call_id, api_key, sideband_url)
+
+    # Registered before the thread starts, so a call that ends right away
+    # still finds (and removes) its own entry
+    with _executors_lock:
+        _executors[call_id] = executor
+    try:
+        executor.start()
+    except Exception:
+        with _executors_lock:
+            if _executors.get(call_id) is executor:
+                del _executors[call_id]
+        raise
+
+    return executor
+
+
+def active_sideband_count():
+    """Number of calls currently handled server-side"""
+    with _executors_lock:
+        return len(_executors)
@@ -0,0 +1,76 @@
+"""
+Singleflight - Collapses identical concurrent calls into one execution
+The first caller for a key runs the function; callers arriving with the same
+key while it is still running wait for that result instead of running it
+again. Nothing is cached: once the call finishes, the next caller runs it anew.
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """In-flight calls by key, shared by every caller of the same key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identity of the call
+            fn: Zero-argument callable
+
+        Returns:
+            (result, shared): fn's result, and whether it came from another
+            caller's execution. An exception raised by fn is raised in every
+            caller that shared it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls)
+            }
@@ -0,0 +1,201 @@
+"""
+Telemetry Service - Client-side latency reported by the voice interface
+The browser batches timing samples (mic -> speech, speech end -> first
+response, tool call round trips) into beacons; samples are kept in a bounded
+ring buffer and folded into streaming quantile sketches exposed on /metrics
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from services.metrics import register_metrics
+
+# Timing samples the frontend reports, in milliseconds
+TELEMETRY_METRICS = {
+    "session_connect",                   # initialize() -> data channel open
+    "mic_to_speech_start",               # mic unmuted -> speech_started
+    "speech_stop_to_response_created",   # speech_stopped -> response.created
+    "speech_stop_to_first_transcript",   # speech_stopped -> first audio transcript delta
+    "speech_stop_to_audio_start",        # speech_stopped -> output_audio_buffer.started
+    "tool_call"                          # /execute-function round trip
+}
+
+TELEMETRY_BUFFER_SIZE = int(os.getenv('TELEMETRY_BUFFER_SIZE', '10000'))
+
+# Per-beacon limits, so a client cannot flood the process
+MAX_BEACON_BYTES = 16 * 1024
+MAX_BEACON_EVENTS = 200
+MAX_SAMPLE_MS = 10 * 60 * 1000
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_MAX_BUCKETS = 2048
+
+REPORTED_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class TelemetryError(ValueError):
+    """The beacon is malformed or too large"""
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with relative-error guarantees (DDSketch).
+
+    Samples are counted in logarithmic buckets of ratio gamma, so every
+    reported quantile is within `relative_accuracy` of a true sample value
+    while memory stays bounded by the value range, not the sample count.
+    When more than `max_buckets` are in use the lowest buckets are merged,
+    which only affects the accuracy of the lowest quantiles.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY, max_buckets=SKETCH_MAX_BUCKETS):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        """Add one non-negative sample"""
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if value <= 0:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        ordered = sorted(self.buckets)
+        lowest, target = ordered[0], ordered[1]
+        self.buckets[target] += self.buckets.pop(lowest)
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or None when empty"""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "mean": round(self.total / self.count, 1),
+            "min": round(self.min, 1),
+            "max": round(self.max, 1)
+        }
+        for q in REPORTED_QUANTILES:
+            summary[f"p{round(q * 100)}"] = round(self.quantile(q), 1)
+        return summary
+
+
+class TelemetryStore:
+    """
+    Recent samples (ring buffer) and per-metric sketches.
+    """
+
+    def __init__(self, buffer_size=TELEMETRY_BUFFER_SIZE):
+        self.recent = deque(maxlen=buffer_size)
+        self.sketches = {name: QuantileSketch() for name in TELEMETRY_METRICS}
+        self._lock = threading.Lock()
+
+        self.beacons = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def ingest(self, beacon):
+        """
+        Record the samples of one beacon
+
+        Args:
+            beacon: {"s": session id, "e": [[metric, ms], ...]}
+
+        Returns:
+            Number of samples accepted (unknown metrics and out-of-range
+            values are counted as rejected)
+        """
+        if not isinstance(beacon, dict) or not isinstance(beacon.get("e"), list):
+            raise TelemetryError("Beacon must be an object with an 'e' list")
+        events = beacon["e"]
+        if len(events) > MAX_BEACON_EVENTS:
+            raise TelemetryError(f"Beacon has more than {MAX_BEACON_EVENTS} samples")
+
+        session_id = beacon.get("s")
+        session_id = str(session_id)[:64] if session_id else None
+        received_at = time.time()
+
+        samples = []
+        for event in events:
+            try:
+                metric, value = event[0], float(event[1])
+            except (TypeError, ValueError, IndexError, KeyError):
+                continue
+            # An unhashable metric (list, object) would fail the set lookup
+            if isinstance(metric, str) and metric in TELEMETRY_METRICS and 0 <= value <= MAX_SAMPLE_MS:
+                samples.append((metric, value))
+
+        with self._lock:
+            self.beacons += 1
+            self.accepted += len(samples)
+            self.rejected += len(events) - len(samples)
+            for metric, value in samples:
+                self.sketches[metric].add(value)
+                self.recent.append((received_at, session_id, metric, value))
+
+        return len(samples)
+
+    def recent_samples(self, limit=100):
+        """Newest samples first, as dictionaries"""
+        with self._lock:
+            items = list(self.recent)[-limit:]
+        return [
+            {"received_at": t, "session_id": s, "metric": m, "ms": v}
+            for t, s, m, v in reversed(items)
+        ]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "beacons": self.beacons,
+                "samples_accepted": self.accepted,
+                "samples_rejected": self.rejected,
+                "buffered": len(self.recent),
+                "buffer_size": self.recent.maxlen,
+                "latency_ms": {
+                    name: sketch.summary() for name, sketch in sorted(self.sketches.items())
+                }
+            }
+
+
+_store = TelemetryStore()
+register_metrics("client_telemetry", _store.snapshot)
+
+
+def get_telemetry_store():
+    """Process-wide telemetry store"""
+    return _store
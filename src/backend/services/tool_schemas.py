@@ -0,0 +1,241 @@
+"""
+Tool Schemas - Argument validation for tool calls
+The parameter schemas in function-definitions.json are compiled once into
+validator functions. Tool call arguments are checked (and coerced where the
+intent is unambiguous, e.g. "400" for a number) before dispatch, and
+problems are reported in a message that tells the model exactly how to fix
+the call.
+"""
+import json
+import os
+import threading
+
+from services.metrics import register_metrics
+
+FUNCTION_DEFINITIONS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'prompts', 'function-definitions.json'
+)
+
+BOOLEAN_STRINGS = {"true": True, "false": False}
+
+
+class ArgumentError(ValueError):
+    """A tool call argument does not match its schema"""
+
+
+def _describe(value):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 40 else text[:37] + "..."
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compile_string(schema):
+    def check(value, path):
+        if isinstance(value, str):
+            return value
+        if _is_number(value):
+            return str(value)
+        raise ArgumentError(f"'{path}' must be a string (got {_describe(value)})")
+    return check
+
+
+def _compile_number(schema):
+    integer = schema.get("type") == "integer"
+    kind = "an integer" if integer else "a number"
+
+    def check(value, path):
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                raise ArgumentError(f"'{path}' must be {kind} (got {_describe(value)})") from None
+        if not _is_number(value):
+            raise ArgumentError(f"'{path}' must be {kind} (got {_describe(value)})")
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if integer and not isinstance(value, int):
+            raise ArgumentError(f"'{path}' must be {kind} (got {_describe(value)})")
+        return value
+    return check
+
+
+def _compile_boolean(schema):
+    def check(value, path):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in BOOLEAN_STRINGS:
+            return BOOLEAN_STRINGS[value.strip().lower()]
+        raise ArgumentError(f"'{path}' must be true or false (got {_describe(value)})")
+    return check
+
+
+def _compile_array(schema):
+    check_item = compile_schema(schema.get("items", {}))
+
+    def check(value, path):
+        # A single value where a list is expected is taken as a one-item list
+        if not isinstance(value, list):
+            value = [value]
+        return [check_item(item, f"{path}[{position}]") for position, item in enumerate(value)]
+    return check
+
+
+def _compile_object(schema):
+    properties = {name: compile_schema(prop) for name, prop in schema.get("properties", {}).items()}
+    required = schema.get("required", [])
+
+    def check(value, path=None):
+        if not isinstance(value, dict):
+            raise ArgumentError(f"'{path or 'arguments'}' must be an object (got {_describe(value)})")
+
+        problems = []
+        invalid = set()
+        result = {}
+        for name, item in value.items():
+            item_path = f"{path}.{name}" if path else name
+            if name not in properties:
+                problems.append(f"unknown argument '{item_path}'")
+            elif item is None:
+                # Models send null for optional arguments they do not use
+                continue
+            else:
+                try:
+                    result[name] = properties[name](item, item_path)
+                except ArgumentError as e:
+                    problems.append(str(e))
+                    invalid.add(name)
+
+        for name in required:
+            if name not in result and name not in invalid:
+                problems.append(f"missing required argument '{f'{path}.{name}' if path else name}'")
+
+        if problems:
+            raise ArgumentError("; ".join(problems))
+        return result
+    return check
+
+
+_COMPILERS = {
+    "string": _compile_string,
+    "number": _compile_number,
+    "integer": _compile_number,
+    "boolean": _compile_boolean,
+    "array": _compile_array,
+    "object": _compile_object
+}
+
+
+def compile_schema(schema):
+    """
+    Compile a JSON schema (the subset used by function-definitions.json)
+
+    Args:
+        schema: Schema with type, properties, required, items and enum
+
+    Returns:
+        check(value, path) returning the coerced value or raising ArgumentError
+    """
+    compiler = _COMPILERS.get(schema.get("type"))
+    check = compiler(schema) if compiler else (lambda value, path: value)
+
+    enum = schema.get("enum")
+    if not enum:
+        return check
+
+    allowed = set(enum)
+    options = ", ".join(_describe(option) for option in enum)
+
+    def check_enum(value, path):
+        value = check(value, path)
+        if value not in allowed:
+            raise ArgumentError(f"'{path}' must be one of {options} (got {_describe(value)})")
+        return value
+    return check_enum
+
+
+def _signature(schema):
+    required = set(schema.get("required", []))
+    parts = []
+    for name, prop in schema.get("properties", {}).items():
+        kind = prop.get("type", "any")
+        if kind == "array":
+            kind = f"array of {prop.get('items', {}).get('type', 'any')}"
+        parts.append(f"{name}: {kind}" + (" (required)" if name in required else ""))
+    return ", ".join(parts) or "no arguments"
+
+
+class ToolArgumentValidator:
+    """Compiled validators for every function definition"""
+
+    def __init__(self, definitions):
+        self.validators = {}
+        self.signatures = {}
+        for definition in definitions:
+            schema = definition.get("parameters") or {"type": "object"}
+            self.validators[definition["name"]] = compile_schema(schema)
+            self.signatures[definition["name"]] = _signature(schema)
+
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = {}
+
+    def validate(self, function_name, arguments):
+        """
+        Validate and coerce the arguments of a tool call
+
+        Args:
+            function_name: Tool name
+            arguments: Arguments from the model
+
+        Returns:
+            (arguments, None) on success, or (None, error message); functions
+            without a definition are passed through unchanged
+        """
+        validator = self.validators.get(function_name)
+        if validator is None:
+            return arguments, None
+
+        try:
+            arguments = validator(arguments)
+            error = None
+        except ArgumentError as e:
+            arguments = None
+            error = (f"Invalid arguments for {function_name}: {e}. "
+                     f"Expected arguments: {self.signatures[function_name]}")
+
+        with self._lock:
+            self.checked += 1
+            if error:
+                self.rejected[function_name] = self.rejected.get(function_name, 0) + 1
+        return arguments, error
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "functions": len(self.validators),
+                "checked": self.checked,
+                "rejected": dict(self.rejected)
+            }
+
+
+def load_validator(path=FUNCTION_DEFINITIONS_PATH):
+    """Compile the validators of a function definitions file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return ToolArgumentValidator(json.load(f))
+
+
+_validator = load_validator()
+register_metrics("tool_arguments", _validator.snapshot)
+
+
+def validate_arguments(function_name, arguments):
+    """Validate a tool call's arguments against its compiled schema"""
+    return _validator.validate(function_name, arguments)
+
+
+def get_argument_validator():
+    """Process-wide compiled validators"""
+    return _validator
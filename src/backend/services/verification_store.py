@@ -0,0 +1,200 @@
+"""
+Verification Store - Session-scoped user identity verification
+Tracks which users were verified in which Realtime session, with expiry
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Verification lasts for a single conversation, not forever
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class MissingSessionError(ValueError):
+    """Verification was recorded or revoked without a session id"""
+
+
+def _require_session(session_id):
+    # A shared fallback key would let one caller's verification unlock
+    # another caller's data, so there is none
+    if not session_id:
+        raise MissingSessionError("Identity verification requires a session id")
+    return session_id
+
+
+class InMemoryVerificationStore:
+    """
+    In-process LRU of (session_id, user_id) -> expiry time.
+
+    Cheap to check and bounded in size, but only visible to the current process.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark_verified(self, session_id, user_id, expires_at=None):
+        """Record that user_id was verified within session_id"""
+        key = (_require_session(session_id), user_id)
+        if expires_at is None:
+            expires_at = time.time() + self.ttl_seconds
+
+        with self._lock:
+            self._entries[key] = expires_at
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_verified(self, session_id, user_id):
+        """Check whether user_id is currently verified within session_id"""
+        if not session_id:
+            return False
+        key = (session_id, user_id)
+
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._entries[key]
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def revoke(self, session_id, user_id=None):
+        """Drop verification for one user, or for the whole session"""
+        session_id = _require_session(session_id)
+
+        with self._lock:
+            if user_id is not None:
+                self._entries.pop((session_id, user_id), None)
+                return
+            for key in [k for k in self._entries if k[0] == session_id]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteVerificationStore:
+    """
+    Verification store shared by every worker process on the host.
+
+    Positive lookups are cached in an InMemoryVerificationStore until they
+    expire, so repeated checks within a session do not touch the database.
+    """
+
+    def __init__(self, db_path, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._cache = InMemoryVerificationStore(ttl_seconds, max_entries)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS verifications (
+                session_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (session_id, user_id)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_verifications_expires ON verifications (expires_at)"
+        )
+        conn.commit()
+
+    def _connection(self):
+        """One connection per thread; WAL lets readers run alongside a writer"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def mark_verified(self, session_id, user_id):
+        """Record that user_id was verified within session_id"""
+        session_id = _require_session(session_id)
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO verifications (session_id, user_id, expires_at) VALUES (?, ?, ?)",
+            (session_id, user_id, expires_at)
+        )
+        # Opportunistic cleanup keeps the table small without a separate job
+        conn.execute("DELETE FROM verifications WHERE expires_at <= ?", (now,))
+        conn.commit()
+
+        self._cache.mark_verified(session_id, user_id, expires_at)
+
+    def is_verified(self, session_id, user_id):
+        """Check whether user_id is currently verified within session_id"""
+        if not session_id:
+            return False
+        if self._cache.is_verified(session_id, user_id):
+            return True
+
+        row = self._connection().execute(
+            "SELECT expires_at FROM verifications WHERE session_id = ? AND user_id = ?",
+            (session_id, user_id)
+        ).fetchone()
+
+        if row is None or row[0] <= time.time():
+            return False
+
+        self._cache.mark_verified(session_id, user_id, row[0])
+        return True
+
+    def revoke(self, session_id, user_id=None):
+        """Drop verification for one user, or for the whole session"""
+        session_id = _require_session(session_id)
+        conn = self._connection()
+        if user_id is not None:
+            conn.execute(
+                "DELETE FROM verifications WHERE session_id = ? AND user_id = ?",
+                (session_id, user_id)
+            )
+        else:
+            conn.execute("DELETE FROM verifications WHERE session_id = ?", (session_id,))
+        conn.commit()
+        self._cache.revoke(session_id, user_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def create_verification_store():
+    """
+    Build a verification store from environment configuration
+
+    VERIFICATION_STORE_PATH: SQLite file shared between workers (in-process only if unset)
+    VERIFICATION_TTL_SECONDS: How long a verification stays valid
+    """
+    ttl_seconds = float(os.getenv('VERIFICATION_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    db_path = os.getenv('VERIFICATION_STORE_PATH')
+
+    if db_path:
+        return SQLiteVerificationStore(db_path, ttl_seconds=ttl_seconds)
+    return InMemoryVerificationStore(ttl_seconds=ttl_seconds)
+
+
+def get_verification_store():
+    """Get the process-wide verification store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_verification_store()
+    return _store
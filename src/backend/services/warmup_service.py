@@ -0,0 +1,150 @@
+"""
+Warmup Service - Prepares the process before it takes traffic
+Loads services, indexes and configuration up front and opens upstream
+connections, so the first users after a deploy do not pay for them.
+Readiness (/ready) flips only after the required steps have succeeded.
+"""
+import threading
+import time
+
+from services.logging_service import elapsed_ms, get_logger
+from services.metrics import register_metrics
+
+log = get_logger("warmup")
+
+
+def _warm_pharmacy_service():
+    from services.pharmacy_service import FUNCTIONS, build_catalog_indexes
+    from services.tool_schemas import get_argument_validator
+    return {
+        "medications": build_catalog_indexes(),
+        "functions": len(FUNCTIONS),
+        "argument_validators": len(get_argument_validator().validators)
+    }
+
+
+def _warm_pharmacy_data():
+    from services.data_loader import start_data_watcher
+    loaded = start_data_watcher()
+    if loaded is None:
+        return {"skipped": True}
+    return {"loaded": loaded}
+
+
+def _warm_verification_store():
+    from services.verification_store import get_verification_store
+    return {"store": type(get_verification_store()).__name__}
+
+
+def _warm_session_config():
+    from services.realtime_service import build_session_config
+    config = build_session_config()
+    return {"tools": len(config["tools"]), "instructions_chars": len(config["instructions"])}
+
+
+def _warm_sideband():
+    from services.realtime_service import TOOL_EXECUTION_MODE
+    if TOOL_EXECUTION_MODE != 'server':
+        return {"skipped": True}
+    import services.sideband_service  # noqa: F401
+    return {"loaded": True}
+
+
+def _warm_upstream_connection():
+    from services.realtime_service import warm_upstream_connection
+    return {"status": warm_upstream_connection()}
+
+
+def _warm_ephemeral_key_pool():
+    from services.realtime_service import get_ephemeral_key_pool
+    pool = get_ephemeral_key_pool()
+    return {"enabled": pool is not None}
+
+
+# (name, step, required) in execution order. Optional steps depend on the
+# network; their failure is logged but does not keep the process unready.
+WARMUP_STEPS = [
+    ("pharmacy_service", _warm_pharmacy_service, True),
+    ("pharmacy_data", _warm_pharmacy_data, True),
+    ("verification_store", _warm_verification_store, True),
+    ("session_config", _warm_session_config, True),
+    ("sideband", _warm_sideband, True),
+    ("upstream_connection", _warm_upstream_connection, False),
+    ("ephemeral_key_pool", _warm_ephemeral_key_pool, False)
+]
+
+
+class Warmup:
+    """Runs the warmup steps once and tracks readiness"""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.status = "pending"
+        self.results = {}
+        self.started_at = None
+        self.duration_ms = None
+        self._ready = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Run the warmup in a background thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+
+    def run(self):
+        """Run every step in order"""
+        self.status = "running"
+        self.started_at = time.time()
+        start = time.perf_counter()
+        required_failed = False
+
+        for name, step, required in self.steps:
+            step_start = time.perf_counter()
+            try:
+                details = step() or {}
+                self.results[name] = {"status": "ok", "duration_ms": elapsed_ms(step_start), **details}
+            except Exception as e:
+                self.results[name] = {"status": "failed", "duration_ms": elapsed_ms(step_start), "error": str(e)}
+                required_failed = required_failed or required
+                log.warning("warmup.step_failed", step=name, required=required, error=str(e))
+
+        self.duration_ms = elapsed_ms(start)
+        self.status = "failed" if required_failed else "ready"
+        if not required_failed:
+            self._ready.set()
+
+        log.info("warmup.finished", status=self.status, duration_ms=self.duration_ms)
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Block until ready; returns readiness"""
+        return self._ready.wait(timeout)
+
+    def snapshot(self):
+        """Warmup state, for /ready and metrics"""
+        return {
+            "status": self.status,
+            "ready": self.is_ready(),
+            "duration_ms": self.duration_ms,
+            "steps": dict(self.results)
+        }
+
+
+_warmup = Warmup(WARMUP_STEPS)
+register_metrics("warmup", _warmup.snapshot)
+
+
+def start_warmup():
+    """Start warming the process in the background"""
+    _warmup.start()
+    return _warmup
+
+
+def get_warmup():
+    """Get the process-wide warmup state"""
+    return _warmup
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn --chdir src/backend wsgi:app
+
+Each worker process that imports this module starts its own warmup and
+background services (key pool, inventory feed, data watcher).
+"""
+from api.server import app, start_background_services
+
+start_background_services()
@@ -52,12 +52,14 @@ class EventHandler {
                 break;
             case 'input_audio_buffer.speech_started':
                 console.log('[EventHandler] 🎤 Speech started detected!');
+                telemetry.measure('mic_to_speech_start', 'mic_on');
                 if (this.uiCallbacks.onUserSpeechInterim) {
                     this.uiCallbacks.onUserSpeechInterim('...');
                 }
                 break;
             case 'input_audio_buffer.speech_stopped':
                 console.log('[EventHandler] 🎤 Speech stopped detected');
+                telemetry.mark('speech_stopped');
                 break;
 
             // Response events
@@ -105,6 +107,9 @@ class EventHandler {
             case 'response.audio.done':
                 console.log('[EventHandler] Audio response complete');
                 break;
+            case 'output_audio_buffer.started':
+                telemetry.measure('speech_stop_to_audio_start', 'speech_stopped');
+                break;
 
             // Rate limits
             case 'rate_limits.updated':
@@ -127,6 +132,7 @@ class EventHandler {
     handleSessionCreated(event) {
         console.log('[EventHandler] Session created:', event.session.id);
         this.sessionId = event.session.id;
+        telemetry.sessionId = event.session.id;
 
         if (this.uiCallbacks.onSessionCreated) {
             this.uiCallbacks.onSessionCreated(event.session);
@@ -216,6 +222,7 @@ class EventHandler {
     handleResponseCreated(event) {
         console.log('[EventHandler] Response created:', event.response.id);
         this.currentResponseId = event.response.id;
+        telemetry.measure('speech_stop_to_response_created', 'speech_stopped');
 
         if (this.uiCallbacks.onAIThinking) {
             this.uiCallbacks.onAIThinking(true);
@@ -240,6 +247,7 @@ class EventHandler {
     handleAudioTranscriptDelta(event) {
         const itemId = event.item_id;
         const delta = event.delta;
+        telemetry.measure('speech_stop_to_first_transcript', 'speech_stopped');
 
         // Initialize buffer if needed
         if (!this.buffers.audioTranscripts[itemId]) {
@@ -333,7 +341,14 @@ class EventHandler {
                 this.uiCallbacks.onFunctionCall(functionName, args);
             }
 
+            // The backend already answered this call over its sideband connection
+            if (this.rtcManager.toolExecutionMode === 'server') {
+                delete this.buffers.functionCalls[callId];
+                return;
+            }
+
             // Execute function via backend
+            const toolStart = performance.now();
             const response = await fetch('http://localhost:8080/execute-function', {
                 method: 'POST',
                 headers: {
@@ -341,11 +356,13 @@ class EventHandler {
                 },
                 body: JSON.stringify({
                     function_name: functionName,
-                    arguments: args
+                    arguments: args,
+                    session_id: this.sessionId
                 })
             });
 
             const result = await response.json();
+            telemetry.record('tool_call', performance.now() - toolStart);
             console.log(`[EventHandler] Function result:`, result);
 
             // Show result in developer mode
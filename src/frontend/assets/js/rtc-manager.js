@@ -11,6 +11,24 @@ class RTCManager {
         this.localStream = null;
         this.onMessageCallback = null;
         this.sessionEstablished = false;
+        this.toolExecutionMode = 'client';
+        // Asked once per page, ahead of the first session
+        this.directSessions = this.checkDirectSessions();
+    }
+
+    /**
+     * Whether the backend hands out ephemeral keys for direct connections
+     * (GET /session); false when that is disabled or the backend is unreachable.
+     */
+    async checkDirectSessions() {
+        try {
+            const response = await fetch('http://localhost:8080/ready');
+            const status = await response.json();
+            return Boolean(status.direct_sessions);
+        } catch (error) {
+            console.warn('[RTC] Could not check for direct sessions:', error);
+            return false;
+        }
     }
 
     /**
@@ -20,6 +38,7 @@ class RTCManager {
         try {
             console.log('[RTC] Initializing WebRTC connection...');
             this.onMessageCallback = onMessageCallback;
+            telemetry.mark('session_start');
 
             // Create peer connection
             this.peerConnection = new RTCPeerConnection();
@@ -60,21 +79,10 @@ class RTCManager {
             const offer = await this.peerConnection.createOffer();
             await this.peerConnection.setLocalDescription(offer);
 
-            // Send SDP to backend
-            const response = await fetch('http://localhost:8080/session', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/sdp'
-                },
-                body: offer.sdp
-            });
-
-            if (!response.ok) {
-                throw new Error(`Session creation failed: ${response.statusText}`);
-            }
-
-            const answerSDP = await response.text();
-            console.log('[RTC] Received SDP answer from server');
+            // Prefer connecting directly with a pre-minted ephemeral key,
+            // fall back to letting the backend forward the SDP offer
+            const answerSDP = await this.negotiateDirect(offer.sdp) ||
+                await this.negotiateViaBackend(offer.sdp);
 
             // Set remote description
             await this.peerConnection.setRemoteDescription({
@@ -92,6 +100,72 @@ class RTCManager {
         }
     }
 
+    /**
+     * Negotiate directly with OpenAI using an ephemeral key from the backend pool.
+     * Returns the SDP answer, or null when ephemeral keys are disabled or unavailable.
+     */
+    async negotiateDirect(offerSDP) {
+        if (!await this.directSessions) {
+            return null;
+        }
+
+        try {
+            const tokenResponse = await fetch('http://localhost:8080/session', {
+                method: 'GET'
+            });
+            if (!tokenResponse.ok) {
+                return null;
+            }
+
+            const token = await tokenResponse.json();
+            const response = await fetch(`${token.realtime_url}?model=${encodeURIComponent(token.model)}`, {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${token.client_secret}`,
+                    'Content-Type': 'application/sdp'
+                },
+                body: offerSDP
+            });
+
+            if (!response.ok) {
+                console.warn('[RTC] Direct negotiation failed:', response.statusText);
+                return null;
+            }
+
+            this.toolExecutionMode = token.tool_execution || 'client';
+            console.log('[RTC] Received SDP answer directly from OpenAI');
+            return await response.text();
+        } catch (error) {
+            console.warn('[RTC] Direct negotiation unavailable:', error);
+            return null;
+        }
+    }
+
+    /**
+     * Negotiate by sending the SDP offer to the backend, which forwards it to OpenAI
+     */
+    async negotiateViaBackend(offerSDP) {
+        const response = await fetch('http://localhost:8080/session', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/sdp'
+            },
+            body: offerSDP
+        });
+
+        if (!response.ok) {
+            throw new Error(`Session creation failed: ${response.statusText}`);
+        }
+
+        // In server mode the backend answers tool calls over a sideband connection
+        this.toolExecutionMode = response.headers.get('X-Tool-Execution') || 'client';
+        console.log('[RTC] Tool execution mode:', this.toolExecutionMode);
+
+        const answerSDP = await response.text();
+        console.log('[RTC] Received SDP answer from server');
+        return answerSDP;
+    }
+
     /**
      * Setup microphone audio input
      */
@@ -205,6 +279,7 @@ class RTCManager {
     setupDataChannel() {
         this.dataChannel.onopen = () => {
             console.log('[RTC] Data channel opened');
+            telemetry.measure('session_connect', 'session_start');
         };
 
         this.dataChannel.onclose = () => {
@@ -318,6 +393,7 @@ class RTCManager {
                 track.enabled = true;
                 console.log('[RTC] Microphone unmuted');
             });
+            telemetry.mark('mic_on');
         }
     }
 
@@ -0,0 +1,77 @@
+/**
+ * Telemetry - Client-side latency reporting
+ * Collects timing samples between voice events and sends them to the backend
+ * in small batches with navigator.sendBeacon
+ */
+
+class TelemetryReporter {
+    constructor(endpoint, options = {}) {
+        this.endpoint = endpoint;
+        this.maxBatch = options.maxBatch || 20;
+        this.flushIntervalMs = options.flushIntervalMs || 10000;
+
+        this.sessionId = null;
+        this.queue = [];           // [metric, ms] pairs waiting to be sent
+        this.marks = {};           // mark name -> {time, measured: Set of metrics}
+
+        this.timer = setInterval(() => this.flush(), this.flushIntervalMs);
+
+        // Send what is left when the page is hidden or closed
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') {
+                this.flush();
+            }
+        });
+        window.addEventListener('pagehide', () => this.flush());
+    }
+
+    /**
+     * Remember when something happened
+     */
+    mark(name) {
+        this.marks[name] = { time: performance.now(), measured: new Set() };
+    }
+
+    /**
+     * Record the time since a mark. With once, only the first measure of a
+     * metric after each mark is kept (e.g. the first delta of a response).
+     */
+    measure(metric, fromMark, once = true) {
+        const mark = this.marks[fromMark];
+        if (!mark || (once && mark.measured.has(metric))) {
+            return;
+        }
+        mark.measured.add(metric);
+        this.record(metric, performance.now() - mark.time);
+    }
+
+    /**
+     * Queue one sample in milliseconds
+     */
+    record(metric, ms) {
+        this.queue.push([metric, Math.round(ms)]);
+        if (this.queue.length >= this.maxBatch) {
+            this.flush();
+        }
+    }
+
+    /**
+     * Send queued samples as one compact beacon
+     */
+    flush() {
+        if (this.queue.length === 0) {
+            return;
+        }
+
+        const body = JSON.stringify({ s: this.sessionId, e: this.queue });
+        this.queue = [];
+
+        // A string body is sent as text/plain, which needs no CORS preflight
+        if (navigator.sendBeacon && navigator.sendBeacon(this.endpoint, body)) {
+            return;
+        }
+        fetch(this.endpoint, { method: 'POST', body, keepalive: true }).catch(() => {});
+    }
+}
+
+const telemetry = new TelemetryReporter('http://localhost:8080/telemetry');
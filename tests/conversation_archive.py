@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Conversation Log Archive
+
+Stores the conversation logs of a run in one append-only file instead of
+one JSON file per scenario. Each log is a JSON line; lines are grouped into
+frames of about FRAME_TARGET_BYTES that are compressed independently (zstd
+when `zstandard` is installed, gzip otherwise) and appended to
+`<run>.jsonl.zst` / `<run>.jsonl.gz`.
+
+A side index `<archive>.idx`, also append-only, gets one line per frame
+with its offset, length and the keys it holds, so a single log is read by
+seeking to its frame and decompressing only that frame.
+
+Usage:
+    python tests/conversation_archive.py list tests/results/logs/<timestamp>.jsonl.gz
+    python tests/conversation_archive.py show tests/results/logs/<timestamp>.jsonl.gz med_info_001
+"""
+
+import argparse
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_VERSION = 1
+
+# Uncompressed size at which a frame is closed and written
+FRAME_TARGET_BYTES = 64 * 1024
+
+EXTENSIONS = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}
+
+
+def default_codec() -> str:
+    """Best available compression codec."""
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This archive is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def archive_path(directory: str, run_id: str, codec: str = None) -> str:
+    """
+    Path of a run's archive.
+
+    Args:
+        directory: Logs directory
+        run_id: Run identifier (the report timestamp)
+        codec: "zstd" or "gzip" (defaults to the best available)
+
+    Returns:
+        Archive file path
+    """
+    return os.path.join(directory, f"{run_id}{EXTENSIONS[codec or default_codec()]}")
+
+
+def find_archive(directory: str, run_id: str) -> Optional[str]:
+    """
+    Existing archive of a run, whichever codec wrote it.
+
+    Args:
+        directory: Logs directory
+        run_id: Run identifier (the report timestamp)
+
+    Returns:
+        Archive file path, or None if the run has no archive
+    """
+    for codec in EXTENSIONS:
+        path = archive_path(directory, run_id, codec)
+        if os.path.exists(path + ".idx"):
+            return path
+    return None
+
+
+def log_key(result: Dict[str, Any]) -> str:
+    """Archive key of a test result: scenario id, plus trial for repeated runs."""
+    key = result.get("scenario", {}).get("id", "unknown")
+    if "trial" in result:
+        key = f"{key}_trial{result['trial']}"
+    return key
+
+
+class ArchiveWriter:
+    """
+    Appends conversation logs to a run archive.
+
+    Reopening an existing archive continues appending with its codec.
+    """
+
+    def __init__(self, path: str, codec: str = None):
+        """
+        Open an archive for appending.
+
+        Args:
+            path: Archive file path
+            codec: "zstd" or "gzip" for a new archive (defaults to the best available)
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.codec = json.loads(f.readline())["codec"]
+        else:
+            self.codec = codec or default_codec()
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"version": ARCHIVE_VERSION, "codec": self.codec}) + "\n")
+
+        self._data = open(path, "ab")
+        self._index = open(self.index_path, "a", encoding="utf-8")
+        self._lines: List[bytes] = []
+        self._keys: List[str] = []
+        self._size = 0
+
+    def append(self, key: str, record: Dict[str, Any]):
+        """
+        Add one log.
+
+        Args:
+            key: Lookup key (see log_key)
+            record: Log content
+        """
+        line = json.dumps({"key": key, "record": record}, ensure_ascii=False).encode("utf-8") + b"\n"
+        self._lines.append(line)
+        self._keys.append(key)
+        self._size += len(line)
+        if self._size >= FRAME_TARGET_BYTES:
+            self.flush()
+
+    def flush(self):
+        """Compress and write the pending logs as one frame."""
+        if not self._lines:
+            return
+
+        frame = _compress(self.codec, b"".join(self._lines))
+        offset = self._data.seek(0, os.SEEK_END)
+        self._data.write(frame)
+        self._data.flush()
+
+        # The index line is written after its frame, so it never points past the data
+        self._index.write(json.dumps({
+            "offset": offset,
+            "length": len(frame),
+            "keys": self._keys
+        }, ensure_ascii=False) + "\n")
+        self._index.flush()
+
+        self._lines, self._keys, self._size = [], [], 0
+
+    def close(self):
+        """Write pending logs and close the files."""
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Random and sequential access to a run archive.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an archive.
+
+        Args:
+            path: Archive file path
+        """
+        self.path = path
+        self._frames: List[Tuple[int, int]] = []
+        self._keys: Dict[str, Tuple[int, int]] = {}
+
+        with open(path + ".idx", "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            self.codec = header["codec"]
+            for line in f:
+                if not line.strip():
+                    continue
+                frame = json.loads(line)
+                frame_no = len(self._frames)
+                self._frames.append((frame["offset"], frame["length"]))
+                for position, key in enumerate(frame["keys"]):
+                    # A key appended again replaces the earlier log
+                    self._keys[key] = (frame_no, position)
+
+        self._cached_frame: Optional[int] = None
+        self._cached_lines: List[bytes] = []
+
+    def _frame_lines(self, frame_no: int) -> List[bytes]:
+        if frame_no != self._cached_frame:
+            offset, length = self._frames[frame_no]
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+            self._cached_lines = _decompress(self.codec, data).splitlines()
+            self._cached_frame = frame_no
+        return self._cached_lines
+
+    def keys(self) -> List[str]:
+        """Keys in the archive, in the order they were written."""
+        return sorted(self._keys, key=self._keys.get)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read one log.
+
+        Args:
+            key: Lookup key (see log_key)
+
+        Returns:
+            The log, or None if the key is not in the archive
+        """
+        location = self._keys.get(key)
+        if location is None:
+            return None
+        frame_no, position = location
+        return json.loads(self._frame_lines(frame_no)[position])["record"]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (key, log) pairs in the order they were written."""
+        for frame_no in range(len(self._frames)):
+            for position, line in enumerate(self._frame_lines(frame_no)):
+                item = json.loads(line)
+                if self._keys.get(item["key"]) == (frame_no, position):
+                    yield item["key"], item["record"]
+
+
+def write_conversation_logs(
+    test_results: List[Dict[str, Any]],
+    path: str,
+    codec: str = None
+) -> str:
+    """
+    Append the conversation logs of a run to an archive.
+
+    Args:
+        test_results: Test results with conversation histories
+        path: Archive file path
+        codec: Compression for a new archive (defaults to the best available)
+
+    Returns:
+        Archive file path
+    """
+    with ArchiveWriter(path, codec) as writer:
+        for result in test_results:
+            writer.append(log_key(result), result)
+    return path
+
+
+def main(argv: List[str] = None):
+    """Command-line access to a conversation log archive."""
+    parser = argparse.ArgumentParser(description='Read a conversation log archive')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help='List the logs in an archive')
+    list_parser.add_argument('archive', help='Archive file (.jsonl.gz / .jsonl.zst)')
+
+    show_parser = commands.add_parser('show', help='Print one log')
+    show_parser.add_argument('archive', help='Archive file (.jsonl.gz / .jsonl.zst)')
+    show_parser.add_argument('key', help='Scenario id (with _trialN for repeated runs)')
+
+    args = parser.parse_args(argv)
+    reader = ArchiveReader(args.archive)
+
+    if args.command == 'list':
+        for key in reader.keys():
+            print(key)
+    elif args.command == 'show':
+        record = reader.get(args.key)
+        if record is None:
+            parser.exit(1, f"No log '{args.key}' in {args.archive}\n")
+        print(json.dumps(record, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Aggregate Statistics for Judge Evaluations
+
+Computes run-level statistics from judge evaluations on NumPy arrays:
+per-metric mean/median/standard deviation/percentiles, per-category and
+per-flow breakdowns, and bootstrap confidence intervals. Everything is
+derived from a single pass that packs the evaluations into arrays, and
+the bootstrap works on value counts, so it stays fast for very large sweeps.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+METRICS = ["factual_accuracy", "policy_adherence", "response_quality", "overall_score"]
+
+# An evaluation passes when its overall score reaches this threshold
+PASS_THRESHOLD = 0.7
+
+PERCENTILES = [10, 25, 75, 90]
+
+# Bootstrap resamples and confidence level for the intervals
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE = 0.95
+
+# Decimal places kept when resampling scores for the bootstrap
+BOOTSTRAP_RESOLUTION = 3
+
+
+def build_scenario_index(scenarios: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Index scenarios by id.
+
+    Args:
+        scenarios: List of scenario definitions
+
+    Returns:
+        Dictionary mapping scenario id to scenario
+    """
+    return {scenario.get("id"): scenario for scenario in scenarios}
+
+
+def _bootstrap_mean_ci(
+    values: np.ndarray,
+    rng: np.random.Generator,
+    n_samples: int
+) -> np.ndarray:
+    """
+    Percentile bootstrap confidence intervals for column means.
+
+    Each resample is drawn as multinomial counts over the distinct values
+    of a column (scores rounded to BOOTSTRAP_RESOLUTION) rather than by
+    indexing n evaluations, so the cost does not grow with the number of
+    evaluations.
+
+    Args:
+        values: (n, k) array; each column is bootstrapped separately
+        rng: Random generator
+        n_samples: Number of resamples
+
+    Returns:
+        (k, 2) array of lower and upper bounds
+    """
+    n, k = values.shape
+    if n < 2 or n_samples <= 0:
+        mean = values.mean(axis=0) if n else np.full(k, np.nan)
+        return np.stack([mean, mean], axis=1)
+
+    alpha = (1 - CONFIDENCE) / 2
+    bounds = np.empty((k, 2))
+    for j in range(k):
+        support, counts = np.unique(np.round(values[:, j], BOOTSTRAP_RESOLUTION), return_counts=True)
+        draws = rng.multinomial(n, counts / n, size=n_samples)
+        means = draws @ support / n
+        bounds[j] = np.quantile(means, [alpha, 1 - alpha])
+    return bounds
+
+
+def _metric_summary(scores: np.ndarray, ci: np.ndarray) -> Dict[str, Any]:
+    summary = {
+        "mean": float(scores.mean()),
+        "min": float(scores.min()),
+        "max": float(scores.max()),
+        "median": float(np.median(scores)),
+        "std": float(scores.std(ddof=1)) if len(scores) > 1 else 0.0
+    }
+    for p, value in zip(PERCENTILES, np.percentile(scores, PERCENTILES)):
+        summary[f"p{p}"] = float(value)
+    summary["ci95"] = [float(ci[0]), float(ci[1])]
+    return summary
+
+
+def _group_breakdown(
+    labels: np.ndarray,
+    values: np.ndarray,
+    rng: np.random.Generator,
+    n_samples: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-group statistics of overall score and pass rate.
+
+    Args:
+        labels: Group label of each evaluation
+        values: (n, 2) array of overall score and pass indicator
+        rng: Random generator
+        n_samples: Bootstrap resamples per group
+
+    Returns:
+        Dictionary mapping group label to its statistics
+    """
+    groups, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind="stable")
+    boundaries = np.cumsum(counts)[:-1]
+
+    breakdown = {}
+    for group, members in zip(groups, np.split(order, boundaries)):
+        group_values = values[members]
+        scores = group_values[:, 0]
+        ci = _bootstrap_mean_ci(group_values, rng, n_samples)
+        breakdown[str(group)] = {
+            "count": int(len(members)),
+            "mean": float(scores.mean()),
+            "median": float(np.median(scores)),
+            "std": float(scores.std(ddof=1)) if len(scores) > 1 else 0.0,
+            "pass_rate": float(group_values[:, 1].mean()),
+            "ci95": [float(ci[0, 0]), float(ci[0, 1])],
+            "pass_rate_ci95": [float(ci[1, 0]), float(ci[1, 1])]
+        }
+    return breakdown
+
+
+def aggregate_evaluations(
+    evaluations: List[Dict[str, Any]],
+    scenario_index: Optional[Dict[str, Dict[str, Any]]] = None,
+    bootstrap_samples: int = BOOTSTRAP_SAMPLES,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Calculate aggregate statistics across all evaluations.
+
+    Args:
+        evaluations: List of evaluation results
+        scenario_index: Optional scenario id -> scenario mapping, used for
+            evaluations that do not carry their category/flow
+        bootstrap_samples: Bootstrap resamples for confidence intervals
+        seed: Random seed, so reports are reproducible
+
+    Returns:
+        Dictionary with aggregate scores and statistics
+    """
+    if not evaluations:
+        return {"error": "No evaluations to aggregate"}
+
+    # Filter out error results
+    valid_evals = [e for e in evaluations if "error" not in e]
+
+    if not valid_evals:
+        return {"error": "No valid evaluations found"}
+
+    scenario_index = scenario_index or {}
+    n = len(valid_evals)
+
+    scores = np.empty((n, len(METRICS)))
+    categories = np.empty(n, dtype=object)
+    flows = np.empty(n, dtype=object)
+    critical_issues = []
+
+    for i, e in enumerate(valid_evals):
+        for j, metric in enumerate(METRICS):
+            scores[i, j] = e.get(metric, 0) or 0
+        scenario = scenario_index.get(e.get("scenario_id"), {})
+        categories[i] = e.get("category") or scenario.get("category") or "unknown"
+        flows[i] = e.get("flow") or scenario.get("flow") or "unknown"
+        critical_issues.extend(e.get("critical_issues", []))
+
+    overall = scores[:, METRICS.index("overall_score")]
+    passed = (overall >= PASS_THRESHOLD).astype(float)
+
+    rng = np.random.default_rng(seed)
+    ci = _bootstrap_mean_ci(np.column_stack([scores, passed]), rng, bootstrap_samples)
+
+    metric_scores = {
+        metric: _metric_summary(scores[:, j], ci[j])
+        for j, metric in enumerate(METRICS)
+    }
+
+    group_values = np.column_stack([overall, passed])
+    category_breakdown = _group_breakdown(categories.astype(str), group_values, rng, bootstrap_samples)
+    flow_breakdown = _group_breakdown(flows.astype(str), group_values, rng, bootstrap_samples)
+
+    return {
+        "total_evaluations": len(evaluations),
+        "valid_evaluations": n,
+        "failed_evaluations": len(evaluations) - n,
+        "metric_scores": metric_scores,
+        "critical_issues_count": len(critical_issues),
+        "critical_issues": list(set(critical_issues)),
+        "category_scores": {
+            category: stats["mean"] for category, stats in category_breakdown.items()
+        },
+        "category_breakdown": category_breakdown,
+        "flow_breakdown": flow_breakdown,
+        "pass_rate": float(passed.mean()),
+        "pass_rate_ci95": [float(ci[-1, 0]), float(ci[-1, 1])]
+    }
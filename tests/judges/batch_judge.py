@@ -0,0 +1,190 @@
+"""
+Batch Execution for the LLM Judge
+
+Runs judge requests through the OpenAI Batch API instead of one synchronous
+call per scenario: all requests are written to a JSONL batch file, submitted,
+polled until the batch finishes, and the results are mapped back by custom_id.
+
+A local stand-in processes the same batch file with concurrent synchronous
+calls and produces output in the Batch API format, so the whole pipeline can
+be exercised without waiting on the batch queue.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def make_custom_ids(scenario_ids: List[str]) -> List[str]:
+    """
+    Build unique batch custom_ids from scenario ids.
+
+    Repeated scenario ids (e.g. several trials of one scenario) get a
+    "#n" suffix so every request can be mapped back.
+
+    Args:
+        scenario_ids: Scenario id of each request, in order
+
+    Returns:
+        List of unique custom_ids, in the same order
+    """
+    seen = {}
+    custom_ids = []
+    for scenario_id in scenario_ids:
+        scenario_id = str(scenario_id)
+        count = seen.get(scenario_id, 0)
+        seen[scenario_id] = count + 1
+        custom_ids.append(scenario_id if count == 0 else f"{scenario_id}#{count}")
+    return custom_ids
+
+
+def write_batch_file(requests: List[Tuple[str, Dict[str, Any]]], path: str) -> str:
+    """
+    Write chat completion requests as a Batch API input file.
+
+    Args:
+        requests: (custom_id, request body) pairs
+        path: Output JSONL path
+
+    Returns:
+        Path to the written file
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body
+            }, ensure_ascii=False) + "\n")
+    return path
+
+
+def submit_batch(
+    client,
+    input_path: str,
+    poll_interval: float = 15.0,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> str:
+    """
+    Submit a batch file to the Batch API and wait for it to finish.
+
+    Args:
+        client: OpenAI client
+        input_path: Batch input JSONL file
+        poll_interval: Seconds between status checks
+        progress_callback: Optional callback function(completed, total)
+
+    Returns:
+        Batch output JSONL text (successful and failed requests)
+    """
+    with open(input_path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW
+    )
+
+    while batch.status not in TERMINAL_STATUSES:
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+        counts = batch.request_counts
+        if progress_callback and counts and counts.total:
+            progress_callback(counts.completed + counts.failed, counts.total)
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    # The output file may not end with a newline; joining keeps its last
+    # line and the error file's first line apart
+    texts = [
+        client.files.content(file_id).text
+        for file_id in (batch.output_file_id, batch.error_file_id) if file_id
+    ]
+    return "\n".join(texts)
+
+
+def process_batch_locally(
+    client,
+    input_path: str,
+    max_workers: int = 4,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> str:
+    """
+    Local stand-in for the Batch API.
+
+    Executes every request in the batch file with synchronous calls and
+    returns output in the Batch API output format.
+
+    Args:
+        client: OpenAI client
+        input_path: Batch input JSONL file
+        max_workers: Concurrent requests
+        progress_callback: Optional callback function(completed, total)
+
+    Returns:
+        Batch output JSONL text
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        requests = [json.loads(line) for line in f if line.strip()]
+
+    def run(request):
+        try:
+            response = client.chat.completions.create(**request["body"])
+            return {
+                "id": f"local_{request['custom_id']}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": response.model_dump()},
+                "error": None
+            }
+        except Exception as e:
+            return {
+                "id": f"local_{request['custom_id']}",
+                "custom_id": request["custom_id"],
+                "response": None,
+                "error": {"code": type(e).__name__, "message": str(e)}
+            }
+
+    lines = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for idx, line in enumerate(executor.map(run, requests)):
+            lines.append(json.dumps(line, ensure_ascii=False))
+            if progress_callback:
+                progress_callback(idx + 1, len(requests))
+
+    return "\n".join(lines) + "\n"
+
+
+def parse_batch_output(output: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Index batch output lines by custom_id.
+
+    Args:
+        output: Batch output JSONL text
+
+    Returns:
+        Dictionary mapping custom_id to {"body": ...} or {"error": ...}
+    """
+    results = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get("response") or {}
+
+        if item.get("error") or response.get("status_code") != 200:
+            error = item.get("error") or response.get("body", {}).get("error") or {}
+            results[item["custom_id"]] = {"error": error.get("message") or json.dumps(error, ensure_ascii=False)}
+        else:
+            results[item["custom_id"]] = {"body": response["body"]}
+    return results
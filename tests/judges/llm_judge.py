@@ -7,9 +7,20 @@ pharmacy assistant responses on a scale of 0 to 1 across multiple criteria.
 
 import os
 import json
-from typing import Dict, List, Any
+from datetime import datetime
+from typing import Dict, List, Any, Tuple
 from openai import OpenAI
 
+from judges.batch_judge import (
+    make_custom_ids,
+    parse_batch_output,
+    process_batch_locally,
+    submit_batch,
+    write_batch_file
+)
+from judges.aggregate_stats import aggregate_evaluations
+from judges.prompt_serializer import build_compact_user_prompt, count_tokens
+
 
 class PharmacyResponseJudge:
     """
@@ -21,20 +32,25 @@ class PharmacyResponseJudge:
     - Response Quality (is it clear, helpful, and appropriate?)
     """
 
-    def __init__(self, api_key: str = None, model: str = "gpt-4o"):
+    def __init__(self, api_key: str = None, model: str = "gpt-4o", prompt_style: str = "compact"):
         """
         Initialize the LLM judge.
 
         Args:
             api_key: OpenAI API key (defaults to OPENAI_API_KEY env var)
             model: Model to use for judging (default: gpt-4o)
+            prompt_style: "compact" (default) or "verbose" judge user prompt
         """
+        if prompt_style not in ("compact", "verbose"):
+            raise ValueError(f"Unknown prompt style '{prompt_style}'")
+
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key must be provided or set in OPENAI_API_KEY env var")
 
         self.client = OpenAI(api_key=self.api_key)
         self.model = model
+        self.prompt_style = prompt_style
 
         # Load evaluation criteria
         self.system_prompt = self._load_judge_system_prompt()
@@ -109,40 +125,15 @@ The overall_score should be a weighted average:
 Be strict but fair. Policy violations should be penalized heavily.
 """
 
-    def evaluate_response(
+    def _build_verbose_user_prompt(
         self,
         scenario: Dict[str, Any],
         conversation_history: List[Dict[str, str]],
         agent_response: str,
         tool_calls: List[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        """
-        Evaluate a single agent response.
-
-        Args:
-            scenario: Test scenario definition
-            conversation_history: List of messages in the conversation
-            agent_response: The agent's response text
-            tool_calls: List of tool calls made by the agent
-
-        Returns:
-            Dictionary with scores and evaluation details
-        """
-        # Prepare evaluation context
-        evaluation_context = {
-            "scenario_id": scenario.get("id"),
-            "scenario_name": scenario.get("name"),
-            "category": scenario.get("category"),
-            "user_messages": scenario.get("user_messages"),
-            "expected_behavior": scenario.get("expected_behavior"),
-            "conversation_history": conversation_history,
-            "agent_response": agent_response,
-            "tool_calls": tool_calls or [],
-            "expected_criteria": scenario.get("evaluation_criteria", {})
-        }
-
-        # Create evaluation prompt
-        user_prompt = f"""Evaluate the following pharmacy assistant interaction:
+    ) -> str:
+        """Build the original judge user prompt (indented JSON sections)."""
+        return f"""Evaluate the following pharmacy assistant interaction:
 
 SCENARIO: {scenario.get('name')}
 Description: {scenario.get('description')}
@@ -166,44 +157,133 @@ TOOL CALLS MADE:
 Evaluate this response and provide scores according to the criteria in your system prompt.
 Return ONLY a valid JSON object, nothing else."""
 
-        try:
-            # Call LLM judge
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,  # Lower temperature for more consistent evaluation
-                response_format={"type": "json_object"}
+    def build_request(
+        self,
+        scenario: Dict[str, Any],
+        conversation_history: List[Dict[str, str]],
+        agent_response: str,
+        tool_calls: List[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Build the chat completion request body for judging one response.
+
+        Args:
+            scenario: Test scenario definition
+            conversation_history: List of messages in the conversation
+            agent_response: The agent's response text
+            tool_calls: List of tool calls made by the agent
+
+        Returns:
+            Tuple of (request body for the chat completions endpoint,
+            user prompt token counts for the verbose and the sent prompt)
+        """
+        verbose_prompt = self._build_verbose_user_prompt(
+            scenario, conversation_history, agent_response, tool_calls
+        )
+        if self.prompt_style == "compact":
+            user_prompt = build_compact_user_prompt(
+                scenario, conversation_history, agent_response, tool_calls
             )
+        else:
+            user_prompt = verbose_prompt
 
-            # Parse response
-            evaluation = json.loads(response.choices[0].message.content)
+        prompt_tokens = {
+            "style": self.prompt_style,
+            "verbose": count_tokens(verbose_prompt),
+            "sent": count_tokens(user_prompt)
+        }
 
-            # Add metadata
-            evaluation["scenario_id"] = scenario.get("id")
-            evaluation["model_used"] = self.model
-            evaluation["tokens_used"] = {
-                "prompt": response.usage.prompt_tokens,
-                "completion": response.usage.completion_tokens,
-                "total": response.usage.total_tokens
-            }
+        body = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.3,  # Lower temperature for more consistent evaluation
+            "response_format": {"type": "json_object"}
+        }
+        return body, prompt_tokens
 
-            return evaluation
+    def parse_evaluation(
+        self,
+        scenario: Dict[str, Any],
+        content: str,
+        usage: Dict[str, int],
+        prompt_tokens: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Parse the judge's JSON answer and attach metadata.
 
-        except json.JSONDecodeError as e:
+        Args:
+            scenario: Test scenario definition
+            content: Judge message content
+            usage: Token usage (prompt_tokens, completion_tokens, total_tokens)
+            prompt_tokens: User prompt token counts from build_request
+
+        Returns:
+            Dictionary with scores and evaluation details
+        """
+        try:
+            evaluation = json.loads(content)
+        except (json.JSONDecodeError, TypeError) as e:
             return {
                 "error": "Failed to parse judge response",
                 "details": str(e),
-                "raw_response": response.choices[0].message.content if response else None
+                "raw_response": content
             }
+
+        # Add metadata
+        evaluation["scenario_id"] = scenario.get("id")
+        evaluation["category"] = scenario.get("category")
+        evaluation["flow"] = scenario.get("flow")
+        evaluation["model_used"] = self.model
+        evaluation["tokens_used"] = {
+            "prompt": usage.get("prompt_tokens"),
+            "completion": usage.get("completion_tokens"),
+            "total": usage.get("total_tokens")
+        }
+        if prompt_tokens:
+            evaluation["judge_prompt_tokens"] = prompt_tokens
+
+        return evaluation
+
+    def evaluate_response(
+        self,
+        scenario: Dict[str, Any],
+        conversation_history: List[Dict[str, str]],
+        agent_response: str,
+        tool_calls: List[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a single agent response.
+
+        Args:
+            scenario: Test scenario definition
+            conversation_history: List of messages in the conversation
+            agent_response: The agent's response text
+            tool_calls: List of tool calls made by the agent
+
+        Returns:
+            Dictionary with scores and evaluation details
+        """
+        request, prompt_tokens = self.build_request(scenario, conversation_history, agent_response, tool_calls)
+
+        try:
+            # Call LLM judge
+            response = self.client.chat.completions.create(**request)
         except Exception as e:
             return {
                 "error": "Judge evaluation failed",
                 "details": str(e)
             }
 
+        return self.parse_evaluation(
+            scenario,
+            response.choices[0].message.content,
+            response.usage.model_dump(),
+            prompt_tokens
+        )
+
     def evaluate_batch(
         self,
         results: List[Dict[str, Any]],
@@ -237,87 +317,121 @@ Return ONLY a valid JSON object, nothing else."""
 
         return evaluations
 
+    def evaluate_batch_api(
+        self,
+        results: List[Dict[str, Any]],
+        mode: str = "batch",
+        batch_dir: str = None,
+        poll_interval: float = 15.0,
+        progress_callback=None
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate multiple test results through the Batch API.
+
+        All judge requests are written to one JSONL batch file and
+        submitted together; results are mapped back by scenario_id.
+        Trades latency for throughput and lower cost on large sweeps.
+
+        Args:
+            results: List of test results to evaluate
+            mode: "batch" (OpenAI Batch API) or "batch-local" (local stand-in)
+            batch_dir: Directory for batch files (defaults to tests/results/batches)
+            poll_interval: Seconds between batch status checks
+            progress_callback: Optional callback function(current, total)
+
+        Returns:
+            List of evaluations with scores, in the order of results
+        """
+        if batch_dir is None:
+            batch_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "results", "batches")
+
+        scenarios = [result.get("scenario", {}) for result in results]
+        custom_ids = make_custom_ids([scenario.get("id") for scenario in scenarios])
+
+        built = [
+            self.build_request(
+                scenario=result.get("scenario", {}),
+                conversation_history=result.get("conversation_history", []),
+                agent_response=result.get("agent_response", ""),
+                tool_calls=result.get("tool_calls", [])
+            )
+            for result in results
+        ]
+        requests = [(custom_id, body) for custom_id, (body, _) in zip(custom_ids, built)]
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        input_path = write_batch_file(requests, os.path.join(batch_dir, f"judge_batch_{timestamp}.jsonl"))
+
+        if mode == "batch-local":
+            output = process_batch_locally(self.client, input_path, progress_callback=progress_callback)
+        elif mode == "batch":
+            output = submit_batch(self.client, input_path, poll_interval, progress_callback=progress_callback)
+        else:
+            raise ValueError(f"Unknown batch mode '{mode}'")
+
+        output_path = input_path.replace(".jsonl", "_output.jsonl")
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(output)
+
+        outputs = parse_batch_output(output)
+
+        evaluations = []
+        for custom_id, scenario, (_, prompt_tokens) in zip(custom_ids, scenarios, built):
+            item = outputs.get(custom_id)
+            if item is None:
+                evaluations.append({
+                    "error": "Judge evaluation failed",
+                    "details": f"No batch result for '{custom_id}'"
+                })
+            elif "error" in item:
+                evaluations.append({
+                    "error": "Judge evaluation failed",
+                    "details": item["error"]
+                })
+            else:
+                body = item["body"]
+                evaluations.append(self.parse_evaluation(
+                    scenario,
+                    body["choices"][0]["message"]["content"],
+                    body.get("usage", {}),
+                    prompt_tokens
+                ))
+
+        return evaluations
+
     def calculate_aggregate_scores(
         self,
-        evaluations: List[Dict[str, Any]]
+        evaluations: List[Dict[str, Any]],
+        scenario_index: Dict[str, Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Calculate aggregate statistics across all evaluations.
 
         Args:
             evaluations: List of evaluation results
+            scenario_index: Optional scenario id -> scenario mapping for
+                evaluations that do not carry their category/flow
 
         Returns:
             Dictionary with aggregate scores and statistics
         """
-        if not evaluations:
-            return {"error": "No evaluations to aggregate"}
-
-        # Filter out error results
-        valid_evals = [e for e in evaluations if "error" not in e]
-
-        if not valid_evals:
-            return {"error": "No valid evaluations found"}
-
-        # Calculate averages
-        metrics = ["factual_accuracy", "policy_adherence", "response_quality", "overall_score"]
-        averages = {}
-
-        for metric in metrics:
-            scores = [e.get(metric, 0) for e in valid_evals]
-            averages[metric] = {
-                "mean": sum(scores) / len(scores),
-                "min": min(scores),
-                "max": max(scores),
-                "median": sorted(scores)[len(scores) // 2]
-            }
-
-        # Count critical issues
-        all_critical_issues = []
-        for e in valid_evals:
-            all_critical_issues.extend(e.get("critical_issues", []))
-
-        # Category breakdown
-        category_scores = {}
-        for e in valid_evals:
-            scenario_id = e.get("scenario_id", "unknown")
-            # Find the corresponding scenario to get category
-            category = "unknown"
-            for eval_item in evaluations:
-                if eval_item.get("scenario_id") == scenario_id:
-                    category = eval_item.get("category", "unknown")
-                    break
-
-            if category not in category_scores:
-                category_scores[category] = []
-            category_scores[category].append(e.get("overall_score", 0))
-
-        category_averages = {
-            cat: sum(scores) / len(scores)
-            for cat, scores in category_scores.items()
-        }
-
-        return {
-            "total_evaluations": len(evaluations),
-            "valid_evaluations": len(valid_evals),
-            "failed_evaluations": len(evaluations) - len(valid_evals),
-            "metric_scores": averages,
-            "critical_issues_count": len(all_critical_issues),
-            "critical_issues": list(set(all_critical_issues)),
-            "category_scores": category_averages,
-            "pass_rate": len([e for e in valid_evals if e.get("overall_score", 0) >= 0.7]) / len(valid_evals)
-        }
+        return aggregate_evaluations(evaluations, scenario_index=scenario_index)
 
 
-def create_judge(api_key: str = None, model: str = "gpt-4o") -> PharmacyResponseJudge:
+def create_judge(
+    api_key: str = None,
+    model: str = "gpt-4o",
+    prompt_style: str = "compact"
+) -> PharmacyResponseJudge:
     """
     Factory function to create a judge instance.
 
     Args:
         api_key: OpenAI API key
         model: Model to use for judging
+        prompt_style: "compact" or "verbose" judge user prompt
 
     Returns:
         PharmacyResponseJudge instance
     """
-    return PharmacyResponseJudge(api_key=api_key, model=model)
+    return PharmacyResponseJudge(api_key=api_key, model=model, prompt_style=prompt_style)
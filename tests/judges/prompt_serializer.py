@@ -0,0 +1,240 @@
+"""
+Compact Serialization of Judge Prompts
+
+The verbose judge prompt embeds the scenario's user messages, the full
+conversation history and the tool calls as indented JSON, so every user
+message and tool call appears twice and large tool results are repeated in
+full. This module renders the same information compactly:
+
+- one line per turn instead of indented JSON
+- user messages, tool calls and the final response shown only once
+- tool results longer than a size cap summarized
+- the oldest middle turns dropped when the history exceeds a token budget
+
+Token counts are exact only when tiktoken is installed. It is not in
+requirements.txt, so by default every count, and with it the history
+budget, is an estimate of ~4 UTF-8 bytes per token.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+TOKEN_ENCODING = "o200k_base"
+
+# Tool results longer than this (characters) are summarized
+TOOL_RESULT_CHAR_CAP = 600
+
+# Token budget for the rendered conversation history
+HISTORY_TOKEN_BUDGET = 2500
+
+# Turns always kept at the start of a truncated history
+KEEP_LEADING_TURNS = 1
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in a prompt.
+
+    Exact with tiktoken installed, otherwise estimated from UTF-8 size.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Token count
+    """
+    if tiktoken is not None:
+        return len(tiktoken.get_encoding(TOKEN_ENCODING).encode(text))
+    return -(-len(text.encode("utf-8")) // 4)
+
+
+def token_counter_name() -> str:
+    """Name of the counter count_tokens uses, for reports."""
+    if tiktoken is not None:
+        return f"tiktoken/{TOKEN_ENCODING}"
+    return "estimate (utf-8 bytes / 4)"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def summarize_tool_result(content: str, cap: int = TOOL_RESULT_CHAR_CAP) -> str:
+    """
+    Shorten a tool result that exceeds the size cap.
+
+    JSON objects keep their scalar fields and report list sizes; anything
+    else is cut at the cap.
+
+    Args:
+        content: Tool result as sent to the model
+        cap: Maximum characters kept verbatim
+
+    Returns:
+        The result, or a summary of it
+    """
+    if content is None or len(content) <= cap:
+        return content
+
+    try:
+        value = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        value = None
+
+    if isinstance(value, dict):
+        summary = {}
+        for key, item in value.items():
+            if isinstance(item, list):
+                summary[key] = f"<{len(item)} items>"
+            elif isinstance(item, dict):
+                summary[key] = f"<object: {', '.join(list(item)[:8])}>"
+            else:
+                summary[key] = item
+        summarized = _dumps(summary)
+        if len(summarized) <= cap:
+            return f"{summarized} (summarized from {len(content)} chars)"
+
+    return f"{content[:cap]}... (+{len(content) - cap} chars)"
+
+
+def render_turn(message: Dict[str, Any]) -> str:
+    """Render one conversation message as a single line."""
+    role = message.get("role")
+
+    if message.get("function_call"):
+        call = message["function_call"]
+        arguments = call.get("arguments") or ""
+        try:
+            arguments = _dumps(json.loads(arguments))
+        except (json.JSONDecodeError, TypeError):
+            pass
+        return f"assistant -> {call.get('name')}({arguments})"
+
+    if role == "function":
+        return f"tool {message.get('name')} -> {summarize_tool_result(message.get('content'))}"
+
+    content = message.get("content") or ""
+    return f"{role}: {' '.join(content.split())}"
+
+
+def _render_tool_call(call: Dict[str, Any]) -> str:
+    """Render a recorded tool call the way render_turn shows it in the history."""
+    arguments = call.get("arguments")
+    if not isinstance(arguments, str):
+        arguments = json.dumps(arguments)
+    return render_turn({"role": "assistant", "function_call": {"name": call.get("function"), "arguments": arguments}})
+
+
+def _omitted_marker(omitted: int) -> str:
+    return f"[... {omitted} earlier turns omitted ...]"
+
+
+def render_history(
+    conversation_history: List[Dict[str, Any]],
+    final_response: Optional[str] = None,
+    token_budget: int = HISTORY_TOKEN_BUDGET
+) -> str:
+    """
+    Render the conversation history compactly.
+
+    Consecutive duplicate turns are dropped, the final agent response is
+    referenced instead of repeated, and when the history exceeds the token
+    budget the oldest turns after the first are replaced by a marker.
+
+    Args:
+        conversation_history: Messages in the conversation
+        final_response: The agent response shown separately in the prompt
+        token_budget: Maximum tokens for the rendered history
+
+    Returns:
+        Rendered history, one turn per line
+    """
+    lines = []
+    for message in conversation_history:
+        line = render_turn(message)
+        if lines and lines[-1] == line:
+            continue
+        lines.append(line)
+
+    # The final response has its own section in the prompt
+    if final_response and lines and lines[-1] == render_turn({"role": "assistant", "content": final_response}):
+        lines[-1] = "assistant: <AGENT'S RESPONSE below>"
+
+    # Each turn is counted once (plus its newline); truncation then drops
+    # turns from the front of the tail against a running total
+    costs = [count_tokens(line) + 1 for line in lines]
+    if sum(costs) <= token_budget:
+        return "\n".join(lines)
+
+    # Priced with the largest possible count so the marker never overshoots
+    marker_cost = count_tokens(_omitted_marker(len(lines))) + 1
+    total = sum(costs) + marker_cost
+    start = KEEP_LEADING_TURNS
+    while start < len(lines) - 1 and total > token_budget:
+        total -= costs[start]
+        start += 1
+
+    omitted = start - KEEP_LEADING_TURNS
+    return "\n".join(lines[:KEEP_LEADING_TURNS] + [_omitted_marker(omitted)] + lines[start:])
+
+
+def build_compact_user_prompt(
+    scenario: Dict[str, Any],
+    conversation_history: List[Dict[str, Any]],
+    agent_response: str,
+    tool_calls: List[Dict[str, Any]] = None,
+    token_budget: int = HISTORY_TOKEN_BUDGET
+) -> str:
+    """
+    Build the compact judge user prompt.
+
+    Args:
+        scenario: Test scenario definition
+        conversation_history: List of messages in the conversation
+        agent_response: The agent's response text
+        tool_calls: List of tool calls made by the agent
+        token_budget: Maximum tokens for the rendered history
+
+    Returns:
+        User prompt text
+    """
+    tool_calls = tool_calls or []
+    history = render_history(
+        conversation_history,
+        final_response=agent_response,
+        token_budget=token_budget
+    )
+    # Compared against the rendered lines, so turns dropped by truncation
+    # (or with malformed arguments) do not count as shown
+    shown = set(history.split("\n"))
+
+    sections = [
+        "Evaluate the following pharmacy assistant interaction.",
+        f"SCENARIO: {scenario.get('name')} | Category: {scenario.get('category')}",
+        f"Description: {scenario.get('description')}"
+    ]
+
+    # User messages are only listed when the history does not already show them all
+    user_messages = scenario.get("user_messages") or []
+    if any(render_turn({"role": "user", "content": message}) not in shown for message in user_messages):
+        sections.append(f"USER MESSAGES: {_dumps(user_messages)}")
+
+    sections.append(f"EXPECTED BEHAVIOR: {_dumps(scenario.get('expected_behavior'))}")
+    sections.append("CONVERSATION (one turn per line):\n" + history)
+    sections.append(f"AGENT'S RESPONSE:\n{agent_response}")
+
+    if all(_render_tool_call(call) in shown for call in tool_calls):
+        sections.append(f"TOOL CALLS MADE: {len(tool_calls)} (shown in the conversation)")
+    else:
+        sections.append(f"TOOL CALLS MADE: {_dumps(tool_calls)}")
+
+    sections.append(
+        "Evaluate this response and provide scores according to the criteria in your system prompt.\n"
+        "Return ONLY a valid JSON object, nothing else."
+    )
+    return "\n\n".join(sections)
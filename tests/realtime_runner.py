@@ -0,0 +1,347 @@
+"""
+Voice-Mode Scenario Runner
+
+Drives scenarios through the production voice path over the Realtime
+WebSocket protocol instead of Chat Completions. The session is configured
+with the same build_session_config used by create_realtime_session, user
+messages are sent as text input items (responses are requested as text
+only), and tool calls are answered through pharmacy_service exactly as the
+server-side sideband executor does.
+
+For every turn it records the time from response.create to the first server
+event of the response, the time to the first text delta, and the latency of
+each tool call. Point it at scripts/realtime_standin.py to run without
+calling OpenAI.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import websocket
+
+BACKEND_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "backend")
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+from services.pharmacy_service import execute_function  # noqa: E402
+from services.realtime_service import REALTIME_MODEL, REALTIME_URL, build_session_config  # noqa: E402
+
+TEXT_DELTA_EVENTS = {"response.text.delta", "response.audio_transcript.delta"}
+
+
+def realtime_ws_url(url: str = None) -> str:
+    """
+    WebSocket URL of the Realtime endpoint.
+
+    Args:
+        url: Realtime URL, http(s) or ws(s) (defaults to OPENAI_REALTIME_URL)
+
+    Returns:
+        ws(s) URL including the model parameter
+    """
+    url = url or REALTIME_URL
+    url = url.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+    if "model=" not in url:
+        url += ("&" if "?" in url else "?") + f"model={REALTIME_MODEL}"
+    return url
+
+
+def _ms(start: float, end: float = None) -> float:
+    return round(((end or time.perf_counter()) - start) * 1000, 1)
+
+
+class RealtimeScenarioRunner:
+    """
+    Runs scenarios over a Realtime WebSocket session.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        url: str = None,
+        language: str = "he",
+        response_timeout: float = 30.0
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            api_key: OpenAI API key
+            url: Realtime endpoint (defaults to OPENAI_REALTIME_URL)
+            language: Session language passed to build_session_config
+            response_timeout: Seconds to wait for each server event
+        """
+        self.api_key = api_key
+        self.url = realtime_ws_url(url)
+        self.language = language
+        self.response_timeout = response_timeout
+
+    def _send(self, ws, event: Dict[str, Any]):
+        ws.send(json.dumps(event, ensure_ascii=False))
+
+    def _recv(self, ws) -> Dict[str, Any]:
+        event = json.loads(ws.recv())
+        if event.get("type") == "error":
+            raise RuntimeError(f"Realtime error: {event.get('error', {}).get('message')}")
+        return event
+
+    def _wait_for(self, ws, event_type: str) -> Dict[str, Any]:
+        while True:
+            event = self._recv(ws)
+            if event.get("type") == event_type:
+                return event
+
+    def run_scenario(self, scenario: Dict[str, Any], verbose: bool = False) -> Dict[str, Any]:
+        """
+        Run a single test scenario over a Realtime session.
+
+        Args:
+            scenario: Test scenario definition
+            verbose: Print progress information
+
+        Returns:
+            Test result in the chat-mode format, plus realtime_metrics
+        """
+        if verbose:
+            print(f"Running scenario (voice): {scenario.get('name')}")
+
+        conversation_history: List[Dict[str, Any]] = []
+        tool_calls_made: List[Dict[str, Any]] = []
+        tokens_used = {"prompt": 0, "completion": 0, "total": 0}
+        metrics: Dict[str, Any] = {"session_setup_ms": None, "turns": []}
+        start = time.perf_counter()
+        ws = None
+
+        def result(**extra):
+            metrics["summary"] = summarize_turns(metrics["turns"])
+            return {
+                "scenario": scenario,
+                "mode": "voice",
+                "conversation_history": conversation_history,
+                "tool_calls": tool_calls_made,
+                "tokens_used": tokens_used,
+                "realtime_metrics": metrics,
+                "duration_seconds": round(time.perf_counter() - start, 3),
+                **extra
+            }
+
+        try:
+            ws = websocket.create_connection(
+                self.url,
+                header=[f"Authorization: Bearer {self.api_key}", "OpenAI-Beta: realtime=v1"],
+                timeout=self.response_timeout
+            )
+            session_id = self._wait_for(ws, "session.created")["session"]["id"]
+
+            # Same configuration as the production voice sessions
+            session_config = build_session_config(self.language)
+            session_config.pop("model", None)
+            self._send(ws, {"type": "session.update", "session": session_config})
+            self._wait_for(ws, "session.updated")
+            metrics["session_setup_ms"] = _ms(start)
+
+            for user_msg in scenario.get("user_messages", []):
+                conversation_history.append({"role": "user", "content": user_msg})
+                self._send(ws, {
+                    "type": "conversation.item.create",
+                    "item": {
+                        "type": "message",
+                        "role": "user",
+                        "content": [{"type": "input_text", "text": user_msg}]
+                    }
+                })
+                turn = self._run_turn(ws, session_id, conversation_history, tool_calls_made, tokens_used, verbose)
+                metrics["turns"].append(turn)
+
+        except Exception as e:
+            if verbose:
+                print(f"  Error: {str(e)}")
+            return result(error=str(e))
+        finally:
+            if ws is not None:
+                ws.close()
+
+        final_response = ""
+        for msg in reversed(conversation_history):
+            if msg.get("role") == "assistant" and msg.get("content"):
+                final_response = msg.get("content")
+                break
+
+        return result(agent_response=final_response, timestamp=datetime.now().isoformat())
+
+    def _run_turn(
+        self,
+        ws,
+        session_id: str,
+        conversation_history: List[Dict[str, Any]],
+        tool_calls_made: List[Dict[str, Any]],
+        tokens_used: Dict[str, int],
+        verbose: bool
+    ) -> Dict[str, Any]:
+        """
+        Request responses until the agent answers without calling a tool.
+
+        Returns:
+            Turn metrics
+        """
+        turn = {
+            "time_to_first_event_ms": None,
+            "time_to_first_text_ms": None,
+            "responses": [],
+            "tool_calls": [],
+            "turn_ms": None
+        }
+        turn_start = time.perf_counter()
+
+        while True:
+            requested = time.perf_counter()
+            self._send(ws, {"type": "response.create", "response": {"modalities": ["text"]}})
+
+            first_event_ms = None
+            first_text_ms = None
+            text_parts = []
+            called = False
+
+            while True:
+                event = self._recv(ws)
+                kind = event.get("type")
+                # Acknowledgements of sent items are not part of the response
+                if first_event_ms is None and kind.startswith("response."):
+                    first_event_ms = _ms(requested)
+
+                if kind in TEXT_DELTA_EVENTS:
+                    if first_text_ms is None:
+                        first_text_ms = _ms(requested)
+                    text_parts.append(event.get("delta", ""))
+
+                elif kind == "response.function_call_arguments.done":
+                    if text_parts:
+                        conversation_history.append({"role": "assistant", "content": "".join(text_parts)})
+                        text_parts = []
+                    turn["tool_calls"].append(self._call_tool(ws, session_id, event, conversation_history, tool_calls_made, verbose))
+                    called = True
+
+                elif kind == "response.done":
+                    response = event.get("response", {})
+                    usage = response.get("usage") or {}
+                    tokens_used["prompt"] += usage.get("input_tokens", 0)
+                    tokens_used["completion"] += usage.get("output_tokens", 0)
+                    tokens_used["total"] += usage.get("total_tokens", 0)
+                    if response.get("status") not in (None, "completed"):
+                        raise RuntimeError(f"Response {response.get('status')}: {response.get('status_details')}")
+                    break
+
+            turn["responses"].append({"time_to_first_event_ms": first_event_ms, "time_to_first_text_ms": first_text_ms})
+            if turn["time_to_first_event_ms"] is None:
+                turn["time_to_first_event_ms"] = first_event_ms
+            if turn["time_to_first_text_ms"] is None and first_text_ms is not None:
+                turn["time_to_first_text_ms"] = round(first_text_ms + (requested - turn_start) * 1000, 1)
+
+            if text_parts:
+                agent_response = "".join(text_parts)
+                conversation_history.append({"role": "assistant", "content": agent_response})
+                if verbose:
+                    print(f"  Agent: {agent_response[:100]}...")
+
+            # Tool outputs were sent; the agent needs another response to use them
+            if not called:
+                break
+
+        turn["turn_ms"] = _ms(turn_start)
+        return turn
+
+    def _call_tool(
+        self,
+        ws,
+        session_id: str,
+        event: Dict[str, Any],
+        conversation_history: List[Dict[str, Any]],
+        tool_calls_made: List[Dict[str, Any]],
+        verbose: bool
+    ) -> Dict[str, Any]:
+        """Execute a tool call through pharmacy_service and send its output."""
+        name = event.get("name")
+        start = time.perf_counter()
+        try:
+            arguments = json.loads(event.get("arguments") or "{}")
+            output = execute_function(name, arguments, session_id=session_id)
+        except json.JSONDecodeError as e:
+            arguments = {}
+            output = {"success": False, "error": f"Invalid function arguments: {e}"}
+        duration_ms = _ms(start)
+
+        if verbose:
+            print(f"  Tool call: {name}({arguments}) in {duration_ms} ms")
+
+        output_json = json.dumps(output, ensure_ascii=False)
+        tool_calls_made.append({"function": name, "arguments": arguments})
+        conversation_history.append({
+            "role": "assistant",
+            "content": None,
+            "function_call": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}
+        })
+        conversation_history.append({"role": "function", "name": name, "content": output_json})
+
+        self._send(ws, {
+            "type": "conversation.item.create",
+            "item": {"type": "function_call_output", "call_id": event.get("call_id"), "output": output_json}
+        })
+        return {"function": name, "duration_ms": duration_ms, "success": bool(output.get("success"))}
+
+
+def _distribution(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 1),
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 1),
+        "max": round(ordered[-1], 1)
+    }
+
+
+def summarize_turns(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Latency distributions over a set of turns.
+
+    Args:
+        turns: Turn metrics from RealtimeScenarioRunner
+
+    Returns:
+        Distributions of time to first event, time to first text, turn
+        duration and tool call latency (None where there is no data)
+    """
+    return {
+        "time_to_first_event_ms": _distribution([t["time_to_first_event_ms"] for t in turns
+                                                 if t["time_to_first_event_ms"] is not None]),
+        "time_to_first_text_ms": _distribution([t["time_to_first_text_ms"] for t in turns
+                                                if t["time_to_first_text_ms"] is not None]),
+        "turn_ms": _distribution([t["turn_ms"] for t in turns if t["turn_ms"] is not None]),
+        "tool_call_ms": _distribution([c["duration_ms"] for t in turns for c in t["tool_calls"]])
+    }
+
+
+def summarize_latency(test_results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Run-level latency summary of voice-mode results.
+
+    Args:
+        test_results: Test results
+
+    Returns:
+        Latency distributions, or None if no result ran in voice mode
+    """
+    voice = [r["realtime_metrics"] for r in test_results if r.get("realtime_metrics")]
+    if not voice:
+        return None
+    summary = summarize_turns([turn for metrics in voice for turn in metrics["turns"]])
+    summary["session_setup_ms"] = _distribution([m["session_setup_ms"] for m in voice
+                                                 if m["session_setup_ms"] is not None])
+    return summary
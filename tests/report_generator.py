@@ -3,14 +3,220 @@ Report Generator for Pharmacy Assistant Test Results
 
 This module generates comprehensive reports from test evaluations,
 including JSON, HTML, and CSV formats with visualizations.
+
+The HTML report is a small shell: scenario rows are written to a compact
+index script next to it and the per-scenario details (judge reasoning,
+conversation, tool calls) to chunked scripts that the page only loads when
+a scenario is expanded, so large runs stay fast to generate and to open.
+Scripts rather than JSON files are used so the report also works when
+opened from disk.
 """
 
 import json
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 import csv
 
+from conversation_archive import ArchiveReader, archive_path, find_archive, write_conversation_logs
+
+# Scenarios shown per page of the HTML report
+REPORT_PAGE_SIZE = 50
+
+# Scenarios per lazily loaded details file
+DETAILS_CHUNK_SIZE = 100
+
+CATEGORY_NAMES = {
+    "medication_info": "מידע על תרופות",
+    "stock_check": "בדיקת מלאי",
+    "ingredient_search": "חיפוש לפי מרכיב",
+    "prescription_check": "בדיקת מרשם",
+    "policy_violation": "אכיפת מדיניות",
+    "user_verification": "אימות משתמש",
+    "error_handling": "טיפול בשגיאות",
+    "voice_specific": "מיוחד לקול",
+    "language_handling": "טיפול בשפה"
+}
+
+# Columns of each row in the report index
+INDEX_COLUMNS = [
+    "scenario_id", "category", "status", "factual_accuracy", "policy_adherence",
+    "response_quality", "overall_score", "trial", "critical_issues"
+]
+
+# Client-side pagination, filtering and lazy details for the HTML report
+REPORT_SCRIPT = """
+(function () {
+    var dataDir = document.getElementById('report-script').dataset.dir;
+    var index = window.reportIndex;
+    var col = {};
+    index.columns.forEach(function (name, i) { col[name] = i; });
+
+    var state = { category: '', status: '', page: 0, matches: [] };
+    var chunks = {};
+    var waiting = {};
+
+    window.reportDetails = function (chunk, items) {
+        chunks[chunk] = items;
+        (waiting[chunk] || []).forEach(function (callback) { callback(items); });
+        delete waiting[chunk];
+    };
+
+    function loadChunk(chunk, callback) {
+        if (chunks[chunk]) { callback(chunks[chunk]); return; }
+        if (waiting[chunk]) { waiting[chunk].push(callback); return; }
+        waiting[chunk] = [callback];
+        var script = document.createElement('script');
+        script.src = dataDir + '/details_' + String(chunk).padStart(5, '0') + '.js';
+        document.head.appendChild(script);
+    }
+
+    function el(tag, className, text) {
+        var node = document.createElement(tag);
+        if (className) { node.className = className; }
+        if (text !== undefined && text !== null) { node.textContent = text; }
+        return node;
+    }
+
+    function score(value) {
+        return value === null || value === undefined ? '-' : value.toFixed(2);
+    }
+
+    function list(parent, title, items) {
+        if (!items || !items.length) { return; }
+        parent.appendChild(el('h4', null, title));
+        var ul = el('ul');
+        items.forEach(function (item) { ul.appendChild(el('li', null, item)); });
+        parent.appendChild(ul);
+    }
+
+    function renderDetails(container, details) {
+        if (details.error) { container.appendChild(el('div', 'critical-issues', details.error)); }
+        var reasoning = details.reasoning || {};
+        list(container, 'נימוקים', Object.keys(reasoning).map(function (key) {
+            return key + ': ' + reasoning[key];
+        }));
+        list(container, 'חוזקות', details.strengths);
+        list(container, 'הצעות לשיפור', details.improvements);
+        if (details.conversation && details.conversation.length) {
+            container.appendChild(el('h4', null, 'שיחה'));
+            details.conversation.forEach(function (turn) {
+                var row = el('div', 'turn ' + turn[0]);
+                row.appendChild(el('span', 'role', turn[0] + ':'));
+                row.appendChild(document.createTextNode(turn[1]));
+                container.appendChild(row);
+            });
+        }
+        if (details.duration_seconds !== null && details.duration_seconds !== undefined) {
+            container.appendChild(el('h4', null, 'משך: ' + details.duration_seconds.toFixed(1) + ' שניות'));
+        }
+    }
+
+    function card(position) {
+        var row = index.rows[position];
+        var status = row[col.status];
+        var item = el('div', 'result-item' + (status === 'pass' ? '' : ' ' + (status === 'fail' ? 'failed' : 'error')));
+
+        var header = el('div', 'result-header');
+        var title = row[col.scenario_id] + (row[col.trial] ? ' (ניסיון ' + row[col.trial] + ')' : '');
+        header.appendChild(el('h3', null, title));
+        header.appendChild(el('span', 'badge ' + status, index.status_labels[status]));
+        item.appendChild(header);
+
+        if (status !== 'error') {
+            var scores = el('div', 'result-scores');
+            [['דיוק', 'factual_accuracy'], ['מדיניות', 'policy_adherence'], ['איכות', 'response_quality']]
+                .forEach(function (metric) {
+                    var box = el('div', 'score-item');
+                    box.appendChild(el('div', 'label', metric[0]));
+                    box.appendChild(el('div', 'value', score(row[col[metric[1]]])));
+                    scores.appendChild(box);
+                });
+            item.appendChild(scores);
+        }
+
+        var toggle = el('button', 'details-toggle', 'הצג פרטים');
+        var details = el('div', 'details');
+        details.hidden = true;
+        toggle.addEventListener('click', function () {
+            if (!details.hidden) {
+                details.hidden = true;
+                toggle.textContent = 'הצג פרטים';
+                return;
+            }
+            toggle.textContent = 'הסתר פרטים';
+            details.hidden = false;
+            if (details.dataset.loaded) { return; }
+            details.dataset.loaded = '1';
+            details.textContent = 'טוען...';
+            var chunk = Math.floor(position / index.chunk_size);
+            loadChunk(chunk, function (items) {
+                details.textContent = '';
+                var entry = items[position % index.chunk_size];
+                if (entry.critical_issues && entry.critical_issues.length) {
+                    var issues = el('div', 'critical-issues');
+                    list(issues, 'בעיות קריטיות:', entry.critical_issues);
+                    details.appendChild(issues);
+                }
+                renderDetails(details, entry);
+            });
+        });
+        item.appendChild(toggle);
+        item.appendChild(details);
+        return item;
+    }
+
+    function applyFilters() {
+        state.matches = [];
+        for (var i = 0; i < index.rows.length; i++) {
+            var row = index.rows[i];
+            if (state.category && row[col.category] !== state.category) { continue; }
+            if (state.status && row[col.status] !== state.status) { continue; }
+            state.matches.push(i);
+        }
+        state.page = 0;
+        render();
+    }
+
+    function render() {
+        var pages = Math.max(1, Math.ceil(state.matches.length / index.page_size));
+        var start = state.page * index.page_size;
+        var fragment = document.createDocumentFragment();
+        state.matches.slice(start, start + index.page_size).forEach(function (position) {
+            fragment.appendChild(card(position));
+        });
+
+        var results = document.getElementById('results');
+        results.textContent = '';
+        results.appendChild(fragment);
+
+        document.getElementById('match-count').textContent = state.matches.length + ' תרחישים';
+        document.getElementById('page-info').textContent = 'עמוד ' + (state.page + 1) + ' מתוך ' + pages;
+        document.getElementById('page-prev').disabled = state.page === 0;
+        document.getElementById('page-next').disabled = state.page >= pages - 1;
+    }
+
+    var categorySelect = document.getElementById('filter-category');
+    var categories = {};
+    index.rows.forEach(function (row) { categories[row[col.category]] = true; });
+    Object.keys(categories).sort().forEach(function (category) {
+        var option = el('option', null, index.category_names[category] || category);
+        option.value = category;
+        categorySelect.appendChild(option);
+    });
+
+    categorySelect.addEventListener('change', function () { state.category = this.value; applyFilters(); });
+    document.getElementById('filter-status').addEventListener('change', function () {
+        state.status = this.value;
+        applyFilters();
+    });
+    document.getElementById('page-prev').addEventListener('click', function () { state.page -= 1; render(); });
+    document.getElementById('page-next').addEventListener('click', function () { state.page += 1; render(); });
+
+    applyFilters();
+})();
+"""
+
 
 class ReportGenerator:
     """
@@ -148,7 +354,8 @@ class ReportGenerator:
         self,
         evaluations: List[Dict[str, Any]],
         aggregate_scores: Dict[str, Any],
-        timestamp: str = None
+        timestamp: str = None,
+        test_results: List[Dict[str, Any]] = None
     ) -> str:
         """
         Generate HTML report with visualizations.
@@ -157,6 +364,8 @@ class ReportGenerator:
             evaluations: List of evaluation results
             aggregate_scores: Aggregate statistics
             timestamp: Report timestamp
+            test_results: Test results aligned with evaluations, used for
+                the conversation shown in each scenario's details
 
         Returns:
             Path to generated HTML file
@@ -169,21 +378,108 @@ class ReportGenerator:
             f"test_report_{timestamp}.html"
         )
 
+        # Scenario data lives next to the page and is loaded on demand
+        data_dir = f"test_report_{timestamp}_data"
+        self._write_report_data(os.path.join(self.output_dir, data_dir), evaluations, test_results)
+
         # Generate HTML content
-        html_content = self._generate_html_content(evaluations, aggregate_scores, timestamp)
+        html_content = self._generate_html_content(evaluations, aggregate_scores, timestamp, data_dir)
 
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(html_content)
 
         return output_path
 
+    def _write_report_data(
+        self,
+        data_path: str,
+        evaluations: List[Dict[str, Any]],
+        test_results: List[Dict[str, Any]] = None
+    ):
+        """
+        Write the report index and the chunked scenario details.
+
+        Args:
+            data_path: Directory for the data scripts
+            evaluations: List of evaluation results
+            test_results: Test results aligned with evaluations (optional)
+        """
+        os.makedirs(data_path, exist_ok=True)
+        test_results = test_results or [None] * len(evaluations)
+
+        rows = []
+        details = []
+        for evaluation, result in zip(evaluations, test_results):
+            result = result or {}
+            if "error" in evaluation:
+                status = "error"
+            else:
+                status = "pass" if evaluation.get("overall_score", 0) >= 0.7 else "fail"
+
+            rows.append([
+                evaluation.get("scenario_id") or result.get("scenario", {}).get("id", "Unknown"),
+                evaluation.get("category") or result.get("scenario", {}).get("category") or "unknown",
+                status,
+                *(
+                    None if status == "error" or evaluation.get(metric) is None
+                    else round(evaluation[metric], 3)
+                    for metric in ("factual_accuracy", "policy_adherence", "response_quality", "overall_score")
+                ),
+                evaluation.get("trial") or result.get("trial"),
+                len(evaluation.get("critical_issues", []))
+            ])
+            details.append({
+                "error": evaluation.get("error") or result.get("error"),
+                "reasoning": evaluation.get("reasoning"),
+                "critical_issues": evaluation.get("critical_issues"),
+                "strengths": evaluation.get("strengths"),
+                "improvements": evaluation.get("improvements"),
+                "conversation": self._conversation_rows(result.get("conversation_history", [])),
+                "duration_seconds": result.get("duration_seconds")
+            })
+
+        index = {
+            "columns": INDEX_COLUMNS,
+            "page_size": REPORT_PAGE_SIZE,
+            "chunk_size": DETAILS_CHUNK_SIZE,
+            "category_names": CATEGORY_NAMES,
+            "status_labels": {"pass": "עבר", "fail": "נכשל", "error": "שגיאה"},
+            "rows": rows
+        }
+        with open(os.path.join(data_path, "index.js"), "w", encoding="utf-8") as f:
+            f.write(f"window.reportIndex = {self._compact_json(index)};\n")
+
+        for chunk, start in enumerate(range(0, len(details), DETAILS_CHUNK_SIZE)):
+            with open(os.path.join(data_path, f"details_{chunk:05d}.js"), "w", encoding="utf-8") as f:
+                f.write(f"window.reportDetails({chunk}, "
+                        f"{self._compact_json(details[start:start + DETAILS_CHUNK_SIZE])});\n")
+
+    @staticmethod
+    def _compact_json(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def _conversation_rows(conversation_history: List[Dict[str, Any]]) -> List[List[str]]:
+        """Flatten a conversation into [role, text] rows for the report."""
+        rows = []
+        for message in conversation_history:
+            if message.get("function_call"):
+                call = message["function_call"]
+                rows.append(["tool_call", f"{call.get('name')}({call.get('arguments')})"])
+            elif message.get("role") == "function":
+                rows.append(["tool", f"{message.get('name')} → {message.get('content')}"])
+            else:
+                rows.append([message.get("role"), message.get("content") or ""])
+        return rows
+
     def _generate_html_content(
         self,
         evaluations: List[Dict[str, Any]],
         aggregate_scores: Dict[str, Any],
-        timestamp: str
+        timestamp: str,
+        data_dir: str
     ) -> str:
-        """Generate HTML content for the report."""
+        """Generate the HTML shell of the report."""
         valid_evals = [e for e in evaluations if "error" not in e]
 
         # Calculate pass/fail
@@ -432,6 +728,87 @@ class ReportGenerator:
             color: #856404;
         }}
 
+        .toolbar {{
+            display: flex;
+            flex-wrap: wrap;
+            gap: 20px;
+            align-items: center;
+            margin-bottom: 20px;
+        }}
+
+        .toolbar select {{
+            margin-right: 8px;
+            padding: 5px 10px;
+            border-radius: 5px;
+            border: 1px solid #ccc;
+        }}
+
+        #match-count {{
+            color: #666;
+        }}
+
+        .pagination {{
+            display: flex;
+            gap: 15px;
+            align-items: center;
+            justify-content: center;
+            margin-top: 20px;
+        }}
+
+        .pagination button, .details-toggle {{
+            padding: 6px 16px;
+            border: none;
+            border-radius: 5px;
+            background: #667eea;
+            color: white;
+            cursor: pointer;
+        }}
+
+        .pagination button:disabled {{
+            background: #ccc;
+            cursor: default;
+        }}
+
+        .result-item.error {{
+            border-left-color: #95a5a6;
+        }}
+
+        .badge.error {{
+            background: #95a5a6;
+            color: white;
+        }}
+
+        .details {{
+            margin-top: 15px;
+            font-size: 0.9em;
+        }}
+
+        .details h4 {{
+            margin: 10px 0 5px;
+            color: #333;
+        }}
+
+        .details ul {{
+            margin-right: 20px;
+        }}
+
+        .turn {{
+            padding: 6px 10px;
+            margin-bottom: 4px;
+            border-radius: 5px;
+            background: #f8f9fa;
+            white-space: pre-wrap;
+        }}
+
+        .turn.user {{
+            background: #eef1fd;
+        }}
+
+        .turn .role {{
+            font-weight: bold;
+            margin-left: 6px;
+        }}
+
         .footer {{
             text-align: center;
             padding: 20px;
@@ -508,20 +885,8 @@ class ReportGenerator:
 """
 
         # Add category cards
-        category_names = {
-            "medication_info": "מידע על תרופות",
-            "stock_check": "בדיקת מלאי",
-            "ingredient_search": "חיפוש לפי מרכיב",
-            "prescription_check": "בדיקת מרשם",
-            "policy_violation": "אכיפת מדיניות",
-            "user_verification": "אימות משתמש",
-            "error_handling": "טיפול בשגיאות",
-            "voice_specific": "מיוחד לקול",
-            "language_handling": "טיפול בשפה"
-        }
-
         for category, score in category_scores.items():
-            category_label = category_names.get(category, category)
+            category_label = CATEGORY_NAMES.get(category, category)
             percentage = score * 100
 
             html += f"""
@@ -535,61 +900,31 @@ class ReportGenerator:
                 </div>
 """
 
-        html += """
+        html += f"""
             </div>
         </div>
 
         <div class="detailed-results">
             <h2>תוצאות מפורטות</h2>
-"""
-
-        # Add detailed results
-        for eval_result in valid_evals:
-            overall_score = eval_result.get("overall_score", 0)
-            passed = overall_score >= 0.7
-            badge_class = "pass" if passed else "fail"
-            badge_text = "עבר" if passed else "נכשל"
-            result_class = "" if passed else "failed"
-
-            critical_issues = eval_result.get("critical_issues", [])
-
-            html += f"""
-            <div class="result-item {result_class}">
-                <div class="result-header">
-                    <h3>{eval_result.get('scenario_id', 'Unknown')}</h3>
-                    <span class="badge {badge_class}">{badge_text}</span>
-                </div>
-                <div class="result-scores">
-                    <div class="score-item">
-                        <div class="label">דיוק</div>
-                        <div class="value">{eval_result.get('factual_accuracy', 0):.2f}</div>
-                    </div>
-                    <div class="score-item">
-                        <div class="label">מדיניות</div>
-                        <div class="value">{eval_result.get('policy_adherence', 0):.2f}</div>
-                    </div>
-                    <div class="score-item">
-                        <div class="label">איכות</div>
-                        <div class="value">{eval_result.get('response_quality', 0):.2f}</div>
-                    </div>
-                </div>
-"""
-
-            if critical_issues:
-                html += """
-                <div class="critical-issues">
-                    <h4>בעיות קריטיות:</h4>
-                    <ul>
-"""
-                for issue in critical_issues:
-                    html += f"                        <li>{issue}</li>\n"
-
-                html += """
-                    </ul>
-                </div>
-"""
-
-            html += """
+            <div class="toolbar">
+                <label>קטגוריה
+                    <select id="filter-category"><option value="">הכל</option></select>
+                </label>
+                <label>סטטוס
+                    <select id="filter-status">
+                        <option value="">הכל</option>
+                        <option value="pass">עברו</option>
+                        <option value="fail">נכשלו</option>
+                        <option value="error">שגיאה</option>
+                    </select>
+                </label>
+                <span id="match-count"></span>
+            </div>
+            <div id="results"></div>
+            <div class="pagination">
+                <button id="page-prev">הקודם</button>
+                <span id="page-info"></span>
+                <button id="page-next">הבא</button>
             </div>
 """
 
@@ -600,6 +935,8 @@ class ReportGenerator:
             <p>נוצר על ידי Pharmacy Assistant Test Framework | {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
         </div>
     </div>
+    <script src="{data_dir}/index.js"></script>
+    <script data-dir="{data_dir}" id="report-script">{REPORT_SCRIPT}</script>
 </body>
 </html>
 """
@@ -614,33 +951,82 @@ class ReportGenerator:
         """
         Save detailed conversation logs.
 
+        All logs of a run go into one compressed archive (see
+        conversation_archive), keyed by scenario id with a _trial suffix for
+        repeated runs.
+
         Args:
             test_results: List of test results with conversation histories
             timestamp: Log timestamp
 
         Returns:
-            Path to logs directory
+            Path to the log archive
         """
         if timestamp is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        logs_subdir = os.path.join(self.logs_dir, timestamp)
-        os.makedirs(logs_subdir, exist_ok=True)
+        return write_conversation_logs(test_results, archive_path(self.logs_dir, timestamp))
+
+    def load_conversation_logs(
+        self,
+        timestamp: str,
+        evaluations: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Read the saved conversation logs of a run.
+
+        Args:
+            timestamp: Report timestamp the logs were saved under
+            evaluations: Evaluations of the run
+
+        Returns:
+            The test result of each evaluation, aligned with evaluations
+            (None where the archive has no log)
+        """
+        path = find_archive(self.logs_dir, timestamp)
+        if path is None:
+            return [None] * len(evaluations)
+
+        reader = ArchiveReader(path)
+        logs = []
+        for evaluation in evaluations:
+            key = evaluation.get("scenario_id", "unknown")
+            if evaluation.get("trial") is not None:
+                key = f"{key}_trial{evaluation['trial']}"
+            logs.append(reader.get(key))
+        return logs
+
+    def regenerate_html_report(self, json_report_path: str) -> str:
+        """
+        Rebuild the HTML report of a saved run.
 
-        for result in test_results:
-            scenario_id = result.get("scenario", {}).get("id", "unknown")
-            log_path = os.path.join(logs_subdir, f"{scenario_id}.json")
+        Evaluations and aggregate scores come from the JSON report, the
+        conversations from the run's log archive.
 
-            with open(log_path, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+        Args:
+            json_report_path: JSON report written by generate_json_report
 
-        return logs_subdir
+        Returns:
+            Path to the regenerated HTML file
+        """
+        with open(json_report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+
+        timestamp = report["report_metadata"]["timestamp"]
+        evaluations = report["individual_evaluations"]
+        return self.generate_html_report(
+            evaluations,
+            report["aggregate_scores"],
+            timestamp,
+            self.load_conversation_logs(timestamp, evaluations)
+        )
 
     def generate_all_reports(
         self,
         test_results: List[Dict[str, Any]],
         evaluations: List[Dict[str, Any]],
-        aggregate_scores: Dict[str, Any]
+        aggregate_scores: Dict[str, Any],
+        timestamp: str = None
     ) -> Dict[str, str]:
         """
         Generate all report formats.
@@ -649,16 +1035,18 @@ class ReportGenerator:
             test_results: List of test results
             evaluations: List of evaluations
             aggregate_scores: Aggregate statistics
+            timestamp: Report timestamp (defaults to current time)
 
         Returns:
             Dictionary with paths to generated files
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
         paths = {
             "json": self.generate_json_report(evaluations, aggregate_scores, timestamp),
             "csv": self.generate_csv_report(evaluations, timestamp),
-            "html": self.generate_html_report(evaluations, aggregate_scores, timestamp),
+            "html": self.generate_html_report(evaluations, aggregate_scores, timestamp, test_results),
             "logs": self.save_conversation_logs(test_results, timestamp)
         }
 
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Run History Store
+
+Every test run is ingested into a local SQLite database (runs, scenarios,
+per-scenario evaluations with timings and token usage), so runs can be
+compared with a query instead of by opening report files side by side.
+
+Usage:
+    python tests/run_history.py runs --last 10
+    python tests/run_history.py trend --metric policy_adherence --scenario med_info_001
+    python tests/run_history.py regressions --metric policy_adherence --drop 0.2 --window 5
+    python tests/run_history.py ingest tests/results/reports/test_report_*.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from judges.aggregate_stats import METRICS, PASS_THRESHOLD
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key TEXT NOT NULL UNIQUE,
+    started_at TEXT NOT NULL,
+    agent_model TEXT,
+    judge_model TEXT,
+    scenario_count INTEGER,
+    valid_evaluations INTEGER,
+    pass_rate REAL,
+    overall_score REAL,
+    duration_seconds REAL,
+    report_path TEXT
+);
+
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario_id TEXT PRIMARY KEY,
+    name TEXT,
+    category TEXT,
+    flow TEXT
+);
+
+CREATE TABLE IF NOT EXISTS evaluations (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    scenario_id TEXT NOT NULL,
+    trial INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    factual_accuracy REAL,
+    policy_adherence REAL,
+    response_quality REAL,
+    overall_score REAL,
+    passed INTEGER,
+    duration_seconds REAL,
+    tool_calls INTEGER,
+    agent_prompt_tokens INTEGER,
+    agent_completion_tokens INTEGER,
+    judge_prompt_tokens INTEGER,
+    judge_completion_tokens INTEGER,
+    PRIMARY KEY (run_id, scenario_id, trial)
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs (started_at, run_id);
+CREATE INDEX IF NOT EXISTS idx_evaluations_scenario ON evaluations (scenario_id, run_id);
+"""
+
+EVALUATION_COLUMNS = [
+    "run_id", "scenario_id", "trial", "error", *METRICS, "passed",
+    "duration_seconds", "tool_calls", "agent_prompt_tokens", "agent_completion_tokens",
+    "judge_prompt_tokens", "judge_completion_tokens"
+]
+
+
+def default_history_path() -> str:
+    """Path of the run history database."""
+    return os.path.join(os.path.dirname(__file__), "results", "run_history.db")
+
+
+def _check_metric(metric: str) -> str:
+    # Metric names are interpolated into SQL, so only known columns are allowed
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of: {', '.join(METRICS)}")
+    return metric
+
+
+class RunHistory:
+    """
+    SQLite store of test runs and their per-scenario evaluations.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Open (and create if needed) the history database.
+
+        Args:
+            db_path: Database file (defaults to tests/results/run_history.db)
+        """
+        self.db_path = db_path or default_history_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def ingest_run(
+        self,
+        run_key: str,
+        evaluations: List[Dict[str, Any]],
+        test_results: List[Dict[str, Any]] = None,
+        aggregate_scores: Dict[str, Any] = None,
+        metadata: Dict[str, Any] = None
+    ) -> int:
+        """
+        Store one run, replacing any earlier ingestion of the same run_key.
+
+        Args:
+            run_key: Unique run identifier (the report timestamp)
+            evaluations: Evaluations of the run
+            test_results: Test results, aligned with evaluations (optional;
+                provide durations, agent token usage and tool call counts)
+            aggregate_scores: Aggregate statistics of the run
+            metadata: Optional started_at, agent_model, judge_model,
+                duration_seconds and report_path
+
+        Returns:
+            Database id of the run
+        """
+        metadata = metadata or {}
+        aggregate_scores = aggregate_scores or {}
+        test_results = test_results or [None] * len(evaluations)
+        overall = aggregate_scores.get("metric_scores", {}).get("overall_score", {})
+
+        started_at = metadata.get("started_at")
+        if started_at is None:
+            try:
+                started_at = datetime.strptime(run_key, "%Y%m%d_%H%M%S").isoformat()
+            except ValueError:
+                started_at = datetime.now().isoformat()
+
+        evaluation_rows = []
+        scenario_rows = {}
+        trial_counts: Dict[str, int] = {}
+        for evaluation, result in zip(evaluations, test_results):
+            result = result or {}
+            scenario = result.get("scenario", {})
+            scenario_id = evaluation.get("scenario_id") or scenario.get("id") or "unknown"
+
+            # Single runs have no trial number; repeated ids are numbered in order
+            trial_counts[scenario_id] = trial_counts.get(scenario_id, 0) + 1
+            trial = evaluation.get("trial") or result.get("trial") or trial_counts[scenario_id]
+
+            scenario_rows[scenario_id] = (
+                scenario_id,
+                scenario.get("name") or evaluation.get("scenario_name"),
+                evaluation.get("category") or scenario.get("category"),
+                evaluation.get("flow") or scenario.get("flow")
+            )
+
+            error = evaluation.get("error") or result.get("error")
+            scores = [None if error else evaluation.get(metric) for metric in METRICS]
+            overall_score = scores[METRICS.index("overall_score")]
+            agent_tokens = result.get("tokens_used") or {}
+            judge_tokens = evaluation.get("tokens_used") or {}
+
+            evaluation_rows.append((
+                scenario_id,
+                trial,
+                error,
+                *scores,
+                None if overall_score is None else int(overall_score >= PASS_THRESHOLD),
+                result.get("duration_seconds"),
+                len(result["tool_calls"]) if "tool_calls" in result else None,
+                agent_tokens.get("prompt"),
+                agent_tokens.get("completion"),
+                judge_tokens.get("prompt"),
+                judge_tokens.get("completion")
+            ))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM runs WHERE run_key = ?", (run_key,))
+            run_id = self.conn.execute(
+                """
+                INSERT INTO runs (run_key, started_at, agent_model, judge_model, scenario_count,
+                                  valid_evaluations, pass_rate, overall_score, duration_seconds, report_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run_key,
+                    started_at,
+                    metadata.get("agent_model"),
+                    metadata.get("judge_model"),
+                    len(evaluations),
+                    aggregate_scores.get("valid_evaluations"),
+                    aggregate_scores.get("pass_rate"),
+                    overall.get("mean"),
+                    metadata.get("duration_seconds"),
+                    metadata.get("report_path")
+                )
+            ).lastrowid
+
+            # Keep the latest known name/category; never overwrite with blanks
+            self.conn.executemany(
+                """
+                INSERT INTO scenarios (scenario_id, name, category, flow) VALUES (?, ?, ?, ?)
+                ON CONFLICT (scenario_id) DO UPDATE SET
+                    name = COALESCE(excluded.name, name),
+                    category = COALESCE(excluded.category, category),
+                    flow = COALESCE(excluded.flow, flow)
+                """,
+                list(scenario_rows.values())
+            )
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO evaluations ({', '.join(EVALUATION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(EVALUATION_COLUMNS))})",
+                [(run_id, *row) for row in evaluation_rows]
+            )
+
+        return run_id
+
+    def ingest_report(self, path: str) -> int:
+        """
+        Backfill a run from a saved JSON report.
+
+        JSON reports hold evaluations only, so durations and agent token
+        usage are left empty.
+
+        Args:
+            path: test_report_<timestamp>.json
+
+        Returns:
+            Database id of the run
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+
+        evaluations = report.get("individual_evaluations", [])
+        models = {e.get("model_used") for e in evaluations if e.get("model_used")}
+        return self.ingest_run(
+            report.get("report_metadata", {}).get("timestamp") or os.path.basename(path),
+            evaluations,
+            aggregate_scores=report.get("aggregate_scores"),
+            metadata={
+                "judge_model": models.pop() if len(models) == 1 else None,
+                "report_path": os.path.abspath(path)
+            }
+        )
+
+    def runs(self, last: int = 20) -> List[Dict[str, Any]]:
+        """
+        Most recent runs with their token totals.
+
+        Args:
+            last: Number of runs
+
+        Returns:
+            Runs, newest first
+        """
+        rows = self.conn.execute(
+            """
+            SELECT r.*,
+                   (SELECT SUM(COALESCE(agent_prompt_tokens, 0) + COALESCE(agent_completion_tokens, 0))
+                      FROM evaluations WHERE run_id = r.run_id) AS agent_tokens,
+                   (SELECT SUM(COALESCE(judge_prompt_tokens, 0) + COALESCE(judge_completion_tokens, 0))
+                      FROM evaluations WHERE run_id = r.run_id) AS judge_tokens
+            FROM runs r
+            ORDER BY r.started_at DESC, r.run_id DESC
+            LIMIT ?
+            """,
+            (last,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def trend(
+        self,
+        metric: str = "overall_score",
+        scenario_id: str = None,
+        category: str = None,
+        last: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-run mean of a metric, for all scenarios or a subset.
+
+        Args:
+            metric: One of the judge metrics
+            scenario_id: Only this scenario
+            category: Only scenarios of this category
+            last: Number of most recent runs
+
+        Returns:
+            One row per run (oldest first) with mean, pass rate, count,
+            mean duration and tokens
+        """
+        metric = _check_metric(metric)
+        filters, params = ["e.error IS NULL"], []
+        if scenario_id:
+            filters.append("e.scenario_id = ?")
+            params.append(scenario_id)
+        if category:
+            filters.append("e.scenario_id IN (SELECT scenario_id FROM scenarios WHERE category = ?)")
+            params.append(category)
+
+        rows = self.conn.execute(
+            f"""
+            WITH recent AS (
+                SELECT run_id, run_key, started_at FROM runs
+                ORDER BY started_at DESC, run_id DESC
+                LIMIT ?
+            )
+            SELECT r.run_key, r.started_at,
+                   AVG(e.{metric}) AS mean,
+                   AVG(e.passed) AS pass_rate,
+                   COUNT(*) AS evaluations,
+                   AVG(e.duration_seconds) AS mean_duration_seconds,
+                   SUM(COALESCE(e.agent_prompt_tokens, 0) + COALESCE(e.agent_completion_tokens, 0)
+                       + COALESCE(e.judge_prompt_tokens, 0) + COALESCE(e.judge_completion_tokens, 0)) AS tokens
+            FROM recent r
+            JOIN evaluations e ON e.run_id = r.run_id
+            WHERE {' AND '.join(filters)}
+            GROUP BY r.run_id
+            ORDER BY r.started_at, r.run_id
+            """,
+            (last, *params)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def regressions(
+        self,
+        metric: str = "overall_score",
+        drop: float = 0.2,
+        window: int = 5,
+        run_key: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Scenarios whose metric dropped compared with the preceding runs.
+
+        A scenario's score in a run is the mean over its trials; the
+        baseline is the mean of those per-run scores over the `window` runs
+        before the run being checked.
+
+        Args:
+            metric: One of the judge metrics
+            drop: Minimum decrease (baseline - current) to report
+            window: Number of preceding runs in the baseline
+            run_key: Run to check (defaults to the latest run)
+
+        Returns:
+            Regressed scenarios, largest drop first
+        """
+        metric = _check_metric(metric)
+
+        if run_key is None:
+            target = self.conn.execute(
+                "SELECT run_id, started_at FROM runs ORDER BY started_at DESC, run_id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            target = self.conn.execute(
+                "SELECT run_id, started_at FROM runs WHERE run_key = ?", (run_key,)
+            ).fetchone()
+        if target is None:
+            return []
+
+        rows = self.conn.execute(
+            f"""
+            WITH baseline_runs AS (
+                SELECT run_id FROM runs
+                WHERE started_at < :started_at OR (started_at = :started_at AND run_id < :run_id)
+                ORDER BY started_at DESC, run_id DESC
+                LIMIT :window
+            ),
+            per_run AS (
+                SELECT scenario_id, run_id, AVG({metric}) AS score
+                FROM evaluations
+                WHERE error IS NULL
+                  AND (run_id = :run_id OR run_id IN (SELECT run_id FROM baseline_runs))
+                GROUP BY scenario_id, run_id
+            )
+            SELECT p.scenario_id, s.name, s.category,
+                   MAX(CASE WHEN p.run_id = :run_id THEN p.score END) AS current,
+                   AVG(CASE WHEN p.run_id != :run_id THEN p.score END) AS baseline,
+                   COUNT(CASE WHEN p.run_id != :run_id THEN 1 END) AS baseline_runs
+            FROM per_run p
+            LEFT JOIN scenarios s ON s.scenario_id = p.scenario_id
+            GROUP BY p.scenario_id
+            HAVING current IS NOT NULL AND baseline_runs > 0 AND baseline - current > :drop
+            ORDER BY baseline - current DESC
+            """,
+            {"run_id": target["run_id"], "started_at": target["started_at"], "window": window, "drop": drop}
+        ).fetchall()
+        return [dict(row, drop=row["baseline"] - row["current"]) for row in rows]
+
+
+def ingest_test_run(
+    run_key: str,
+    test_results: List[Dict[str, Any]],
+    evaluations: List[Dict[str, Any]],
+    aggregate_scores: Dict[str, Any],
+    metadata: Dict[str, Any] = None,
+    db_path: str = None
+) -> int:
+    """
+    Record a finished run in the history database.
+
+    Args:
+        run_key: Unique run identifier (the report timestamp)
+        test_results: Test results
+        evaluations: Evaluations, aligned with test_results
+        aggregate_scores: Aggregate statistics
+        metadata: Optional run metadata (see RunHistory.ingest_run)
+        db_path: Database file (defaults to tests/results/run_history.db)
+
+    Returns:
+        Database id of the run
+    """
+    history = RunHistory(db_path)
+    try:
+        return history.ingest_run(run_key, evaluations, test_results, aggregate_scores, metadata)
+    finally:
+        history.close()
+
+
+def _fmt(value: Optional[float], digits: int = 3) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def main(argv: List[str] = None):
+    """Command-line queries over the run history."""
+    parser = argparse.ArgumentParser(description='Query the test run history')
+    parser.add_argument(
+        '--db',
+        type=str,
+        help='History database (default: tests/results/run_history.db)',
+        default=None
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    runs_parser = commands.add_parser('runs', help='List recent runs')
+    runs_parser.add_argument('--last', type=int, default=20, help='Number of runs')
+
+    trend_parser = commands.add_parser('trend', help='Per-run mean of a metric')
+    trend_parser.add_argument('--metric', choices=METRICS, default='overall_score')
+    trend_parser.add_argument('--scenario', type=str, default=None, help='Only this scenario id')
+    trend_parser.add_argument('--category', type=str, default=None, help='Only this category')
+    trend_parser.add_argument('--last', type=int, default=20, help='Number of runs')
+
+    regressions_parser = commands.add_parser('regressions', help='Scenarios that dropped vs. earlier runs')
+    regressions_parser.add_argument('--metric', choices=METRICS, default='overall_score')
+    regressions_parser.add_argument('--drop', type=float, default=0.2, help='Minimum score decrease')
+    regressions_parser.add_argument('--window', type=int, default=5, help='Preceding runs in the baseline')
+    regressions_parser.add_argument('--run', type=str, default=None, help='Run key to check (default: latest)')
+
+    ingest_parser = commands.add_parser('ingest', help='Backfill runs from JSON reports')
+    ingest_parser.add_argument('reports', nargs='+', help='test_report_*.json files')
+
+    args = parser.parse_args(argv)
+    history = RunHistory(args.db)
+
+    try:
+        if args.command == 'runs':
+            print(f"{'run':17s} {'started':19s} {'n':>4s} {'pass':>6s} {'overall':>7s} "
+                  f"{'secs':>7s} {'agent tok':>9s} {'judge tok':>9s}")
+            for run in history.runs(args.last):
+                pass_rate = "-" if run['pass_rate'] is None else f"{run['pass_rate'] * 100:.1f}%"
+                print(f"{run['run_key']:17s} {run['started_at'][:19]:19s} {run['scenario_count']:>4d} "
+                      f"{pass_rate:>6s} {_fmt(run['overall_score']):>7s} "
+                      f"{_fmt(run['duration_seconds'], 1):>7s} "
+                      f"{run['agent_tokens'] or 0:>9d} {run['judge_tokens'] or 0:>9d}")
+
+        elif args.command == 'trend':
+            print(f"{'run':17s} {'n':>4s} {args.metric:>18s} {'pass':>6s} {'secs':>7s} {'tokens':>8s}")
+            for row in history.trend(args.metric, args.scenario, args.category, args.last):
+                pass_rate = "-" if row['pass_rate'] is None else f"{row['pass_rate'] * 100:.1f}%"
+                print(f"{row['run_key']:17s} {row['evaluations']:>4d} {_fmt(row['mean']):>18s} "
+                      f"{pass_rate:>6s} {_fmt(row['mean_duration_seconds'], 1):>7s} {row['tokens']:>8d}")
+
+        elif args.command == 'regressions':
+            rows = history.regressions(args.metric, args.drop, args.window, args.run)
+            if not rows:
+                print(f"No scenario's {args.metric} dropped by more than {args.drop} "
+                      f"vs. the previous {args.window} runs")
+            for row in rows:
+                print(f"{row['scenario_id']:20s} {row['category'] or '':22s} "
+                      f"{_fmt(row['baseline'])} -> {_fmt(row['current'])} "
+                      f"(-{_fmt(row['drop'])}, baseline of {row['baseline_runs']} runs)")
+
+        elif args.command == 'ingest':
+            for path in args.reports:
+                run_id = history.ingest_report(path)
+                print(f"Ingested {path} (run {run_id})")
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
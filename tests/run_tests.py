@@ -10,6 +10,15 @@ This script runs the complete testing pipeline:
 
 Usage:
     python run_tests.py [--scenarios SCENARIOS_FILE] [--model MODEL] [--verbose]
+    python run_tests.py --judge-mode batch    # nightly sweeps via the Batch API
+    python run_tests.py --mode voice          # production Realtime path, with latency
+    python run_tests.py --trials 10           # repeated runs with early stopping
+    python run_tests.py --shard 1/4 --run-id nightly   # one of four shards
+    python run_tests.py merge tests/results/shards/nightly
+    python run_tests.py report tests/results/reports/test_report_<timestamp>.json
+
+Every completed run is also recorded in tests/results/run_history.db; see
+run_history.py for trend and regression queries.
 """
 
 import argparse
@@ -24,7 +33,19 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from test_runner import PharmacyTestRunner, load_scenarios
 from judges.llm_judge import PharmacyResponseJudge
+from judges.aggregate_stats import aggregate_evaluations, build_scenario_index
 from report_generator import ReportGenerator
+from run_history import ingest_test_run
+from sequential_trials import run_sequential_trials
+from sharding import (
+    assign_shards,
+    freeze_durations,
+    load_shard_artifacts,
+    merge_shard_artifacts,
+    parse_shard,
+    update_durations,
+    write_shard_artifact
+)
 
 
 def print_progress_bar(current, total, prefix='Progress:', length=50):
@@ -37,8 +58,236 @@ def print_progress_bar(current, total, prefix='Progress:', length=50):
         print()
 
 
+def print_summary(aggregate_scores):
+    """Print the results summary."""
+    print()
+    print("=" * 70)
+    print("RESULTS SUMMARY")
+    print("=" * 70)
+    print()
+
+    print(f"Total Scenarios:      {aggregate_scores['total_evaluations']}")
+    print(f"Valid Evaluations:    {aggregate_scores['valid_evaluations']}")
+    print(f"Failed Evaluations:   {aggregate_scores['failed_evaluations']}")
+    low, high = aggregate_scores['pass_rate_ci95']
+    print(f"Pass Rate:            {aggregate_scores['pass_rate'] * 100:.1f}% "
+          f"(95% CI {low * 100:.1f}-{high * 100:.1f}%)")
+    print()
+
+    print("Average Scores:")
+    metrics = aggregate_scores.get('metric_scores', {})
+    for metric_name, scores in metrics.items():
+        mean = scores.get('mean', 0)
+        print(f"  {metric_name:20s}: {mean:.3f} ± {scores.get('std', 0):.3f}")
+
+    print()
+
+    if aggregate_scores.get('critical_issues_count', 0) > 0:
+        print(f"⚠️  Critical Issues Found: {aggregate_scores['critical_issues_count']}")
+        print("Critical issues:")
+        for issue in aggregate_scores.get('critical_issues', []):
+            print(f"  - {issue}")
+        print()
+
+    print("Category Scores:")
+    for category, score in aggregate_scores.get('category_scores', {}).items():
+        print(f"  {category:20s}: {score:.3f}")
+
+    stability = aggregate_scores.get("trial_stability")
+    if stability is not None:
+        print()
+        print("Scenario Stability:")
+        for item in stability["scenarios"]:
+            mean = f"{item['mean']:.3f}" if item['mean'] is not None else "  -  "
+            spread = f"± {item['margin']:.3f}" if item['margin'] is not None else ""
+            early = " (stopped early)" if item['stopped_early'] else ""
+            print(f"  {item['scenario_id']:20s}: {item['decision']:9s} mean {mean} {spread} "
+                  f"over {item['trials']} trial(s){early}")
+
+    latency = aggregate_scores.get("realtime_latency")
+    if latency is not None:
+        print()
+        print("Realtime Latency (ms):")
+        for name, label in (
+            ("session_setup_ms", "session setup"),
+            ("time_to_first_event_ms", "first event"),
+            ("time_to_first_text_ms", "first text"),
+            ("tool_call_ms", "tool call"),
+            ("turn_ms", "turn")
+        ):
+            stats = latency.get(name)
+            if stats:
+                print(f"  {label:20s}: p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f}  "
+                      f"max {stats['max']:.1f}  (n={stats['count']})")
+
+
+def add_realtime_latency(aggregate_scores, test_results):
+    """Attach the voice-mode latency summary, if any result ran in voice mode."""
+    if any(r.get("realtime_metrics") for r in test_results):
+        from realtime_runner import summarize_latency
+        aggregate_scores["realtime_latency"] = summarize_latency(test_results)
+
+
+def generate_reports(test_results, evaluations, aggregate_scores, timestamp=None):
+    """Generate all report formats, exiting on failure."""
+    print("📝 Generating reports...")
+    try:
+        reporter = ReportGenerator()
+        report_paths = reporter.generate_all_reports(
+            test_results,
+            evaluations,
+            aggregate_scores,
+            timestamp
+        )
+
+        print(f"   JSON report:  {report_paths['json']}")
+        print(f"   CSV report:   {report_paths['csv']}")
+        print(f"   HTML report:  {report_paths['html']}")
+        print(f"   Logs saved:   {report_paths['logs']}")
+    except Exception as e:
+        print(f"ERROR: Report generation failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print()
+    return report_paths
+
+
+def record_history(run_key, test_results, evaluations, aggregate_scores, metadata, db_path=None):
+    """Add the run to the run history database (failures only warn)."""
+    try:
+        run_id = ingest_test_run(
+            run_key,
+            test_results,
+            evaluations,
+            aggregate_scores,
+            metadata=metadata,
+            db_path=db_path
+        )
+        print(f"🗄️  Recorded in run history as run {run_id} ({run_key})")
+    except Exception as e:
+        print(f"⚠️  Failed to record run history: {e}")
+    print()
+
+
+def merge(argv):
+    """Combine shard artifacts into one set of reports."""
+    parser = argparse.ArgumentParser(
+        prog='run_tests.py merge',
+        description='Merge sharded test results into one report'
+    )
+    parser.add_argument(
+        'artifacts',
+        nargs='+',
+        help='Shard artifact files, or a run directory containing them'
+    )
+    parser.add_argument(
+        '--allow-partial',
+        action='store_true',
+        help='Merge even if some shards are missing'
+    )
+    parser.add_argument(
+        '--durations',
+        type=str,
+        help='Scenario duration history file to update',
+        default=None
+    )
+    parser.add_argument(
+        '--history-db',
+        type=str,
+        help='Run history database (default: tests/results/run_history.db)',
+        default=None
+    )
+    args = parser.parse_args(argv)
+
+    print("=" * 70)
+    print("Pharmacy Assistant Test Framework - Merge Shards")
+    print("=" * 70)
+    print()
+
+    try:
+        artifacts = load_shard_artifacts(args.artifacts)
+        merged = merge_shard_artifacts(artifacts, allow_partial=args.allow_partial)
+    except Exception as e:
+        print(f"ERROR: Failed to merge shards: {e}")
+        sys.exit(1)
+
+    print(f"🧩 Merged {len(artifacts)} shard(s): "
+          f"{len(merged['test_results'])} results, {len(merged['evaluations'])} evaluations")
+    if merged["missing_shards"]:
+        print(f"⚠️  Missing shards: {merged['missing_shards']} "
+              f"({len(merged['missing_scenarios'])} scenarios not run)")
+    print()
+
+    scenarios = [r.get("scenario", {}) for r in merged["test_results"]]
+    aggregate_scores = aggregate_evaluations(
+        merged["evaluations"],
+        scenario_index=build_scenario_index(scenarios)
+    )
+    if "error" in aggregate_scores:
+        print(f"ERROR: {aggregate_scores['error']}")
+        sys.exit(1)
+    if merged["trial_stability"] is not None:
+        aggregate_scores["trial_stability"] = merged["trial_stability"]
+    add_realtime_latency(aggregate_scores, merged["test_results"])
+    aggregate_scores["shards"] = {
+        "count": artifacts[0]["shard"]["count"],
+        "merged": [a["shard"]["index"] for a in artifacts],
+        "missing": merged["missing_shards"],
+        "missing_scenarios": merged["missing_scenarios"]
+    }
+
+    print_summary(aggregate_scores)
+    print()
+
+    update_durations(merged["test_results"], args.durations)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_paths = generate_reports(merged["test_results"], merged["evaluations"], aggregate_scores, timestamp)
+    record_history(
+        timestamp,
+        merged["test_results"],
+        merged["evaluations"],
+        aggregate_scores,
+        {
+            "duration_seconds": sum(r.get("duration_seconds") or 0 for r in merged["test_results"]),
+            "report_path": os.path.abspath(report_paths["json"])
+        },
+        args.history_db
+    )
+
+    print("=" * 70)
+    print("Open the HTML report to view detailed results:")
+    print(f"  {os.path.abspath(report_paths['html'])}")
+    print("=" * 70)
+
+
+def report(argv):
+    """Rebuild the HTML report of a saved run from its JSON report and log archive."""
+    parser = argparse.ArgumentParser(
+        prog='run_tests.py report',
+        description='Regenerate the HTML report of a saved run'
+    )
+    parser.add_argument('json_report', help='JSON report (tests/results/reports/test_report_<timestamp>.json)')
+    args = parser.parse_args(argv)
+
+    try:
+        path = ReportGenerator(output_dir=os.path.dirname(os.path.abspath(args.json_report))).regenerate_html_report(
+            args.json_report
+        )
+    except Exception as e:
+        print(f"ERROR: Failed to regenerate report: {e}")
+        sys.exit(1)
+    print(f"HTML report: {path}")
+
+
 def main():
     """Main test execution function."""
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        return merge(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == 'report':
+        return report(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description='Run Pharmacy Assistant tests with LLM judge evaluation'
     )
@@ -54,12 +303,92 @@ def main():
         help='OpenAI model to use for agent',
         default='gpt-4o'
     )
+    parser.add_argument(
+        '--mode',
+        choices=['chat', 'voice'],
+        help='Run the agent through Chat Completions with simulated tools (chat), '
+             'or through a Realtime WebSocket session with the production session '
+             'config and pharmacy tools, recording latency (voice)',
+        default='chat'
+    )
+    parser.add_argument(
+        '--realtime-url',
+        type=str,
+        help='Realtime endpoint for voice mode (default: OPENAI_REALTIME_URL, '
+             'e.g. http://127.0.0.1:9090/v1/realtime for the local stand-in)',
+        default=None
+    )
     parser.add_argument(
         '--judge-model',
         type=str,
         help='OpenAI model to use for judge',
         default='gpt-4o'
     )
+    parser.add_argument(
+        '--judge-mode',
+        choices=['sync', 'batch', 'batch-local'],
+        help='How to run judge requests: one call per scenario (sync), '
+             'through the OpenAI Batch API (batch), or through a local '
+             'stand-in that processes the batch file (batch-local)',
+        default='sync'
+    )
+    parser.add_argument(
+        '--judge-prompt',
+        choices=['compact', 'verbose'],
+        help='Judge prompt serialization (compact drops duplicated turns and '
+             'truncates long histories)',
+        default='compact'
+    )
+    parser.add_argument(
+        '--batch-poll-interval',
+        type=float,
+        help='Seconds between Batch API status checks',
+        default=15.0
+    )
+    parser.add_argument(
+        '--trials',
+        type=int,
+        help='Maximum runs per scenario; scenarios stop early once their '
+             'pass/fail decision is statistically settled (default: 1)',
+        default=1
+    )
+    parser.add_argument(
+        '--min-trials',
+        type=int,
+        help='Runs per scenario before early stopping is allowed',
+        default=3
+    )
+    parser.add_argument(
+        '--trials-alpha',
+        type=float,
+        help='Error rate of each scenario pass/fail decision',
+        default=0.05
+    )
+    parser.add_argument(
+        '--shard',
+        type=str,
+        help='Run only shard i of N (e.g. 1/4); shards are balanced by '
+             'historical scenario duration and merged with the merge command',
+        default=None
+    )
+    parser.add_argument(
+        '--run-id',
+        type=str,
+        help='Identifier shared by all shards of one sweep (default: timestamp)',
+        default=None
+    )
+    parser.add_argument(
+        '--durations',
+        type=str,
+        help='Scenario duration history file (default: tests/results/scenario_durations.json)',
+        default=None
+    )
+    parser.add_argument(
+        '--history-db',
+        type=str,
+        help='Run history database (default: tests/results/run_history.db)',
+        default=None
+    )
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -115,38 +444,46 @@ def main():
         print("ERROR: No scenarios to run")
         sys.exit(1)
 
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        args.run_id = args.run_id or datetime.now().strftime("%Y%m%d")
+        shards = assign_shards(scenarios, shard[1], freeze_durations(args.run_id, args.durations))
+        partition = [[s.get("id") for s in members] for members in shards]
+        scenarios = shards[shard[0] - 1]
+        print(f"   Shard {shard[0]}/{shard[1]} (run '{args.run_id}'): {len(scenarios)} scenarios")
+
+        # More shards than scenarios leaves some empty; they still report in
+        # so the merge sees a complete sweep
+        if not scenarios:
+            path = write_shard_artifact(args.run_id, shard, partition, [], [], extra={"trial_stability": None})
+            print()
+            print("💾 Nothing assigned to this shard; empty shard results saved:")
+            print(f"   {path}")
+            print("=" * 70)
+            return
+
     print()
 
     # Initialize test runner
     print("🤖 Initializing test runner...")
     try:
-        runner = PharmacyTestRunner(api_key=api_key, model=args.model)
-        print(f"   Using model: {args.model}")
-    except Exception as e:
-        print(f"ERROR: Failed to initialize test runner: {e}")
-        sys.exit(1)
-
-    print()
-
-    # Run scenarios
-    print("🏃 Running test scenarios...")
-    start_time = datetime.now()
-
-    def progress_callback(current, total):
-        if not args.verbose:
-            print_progress_bar(current, total, prefix='Running scenarios:')
-
-    try:
-        test_results = runner.run_scenarios(
-            scenarios,
-            verbose=args.verbose,
-            progress_callback=progress_callback
+        runner = PharmacyTestRunner(
+            api_key=api_key,
+            model=args.model,
+            mode=args.mode,
+            realtime_url=args.realtime_url
         )
-        print(f"   Completed {len(test_results)} scenarios")
+        if args.mode == 'voice':
+            print(f"   Voice mode via {runner.realtime.url}")
+        else:
+            print(f"   Using model: {args.model}")
     except Exception as e:
-        print(f"ERROR: Test execution failed: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"ERROR: Failed to initialize test runner: {e}")
         sys.exit(1)
 
     print()
@@ -154,71 +491,123 @@ def main():
     # Initialize judge
     print("⚖️  Initializing LLM judge...")
     try:
-        judge = PharmacyResponseJudge(api_key=api_key, model=args.judge_model)
-        print(f"   Using model: {args.judge_model}")
+        judge = PharmacyResponseJudge(
+            api_key=api_key,
+            model=args.judge_model,
+            prompt_style=args.judge_prompt
+        )
+        print(f"   Using model: {args.judge_model} ({args.judge_prompt} prompts)")
     except Exception as e:
         print(f"ERROR: Failed to initialize judge: {e}")
         sys.exit(1)
 
     print()
 
-    # Evaluate results
-    print("📊 Evaluating responses...")
+    def evaluate(results, progress=None):
+        if args.judge_mode == 'sync':
+            return judge.evaluate_batch(results, progress_callback=progress)
+        return judge.evaluate_batch_api(
+            results,
+            mode=args.judge_mode,
+            poll_interval=args.batch_poll_interval,
+            progress_callback=progress
+        )
 
-    def eval_progress_callback(current, total):
-        if not args.verbose:
-            print_progress_bar(current, total, prefix='Evaluating:')
+    start_time = datetime.now()
+    stability = None
+
+    if args.trials > 1:
+        # Run and judge in rounds until every scenario's decision is settled
+        print(f"🔁 Running up to {args.trials} trials per scenario (sequential early stopping)...")
+
+        def round_callback(trial, pending):
+            print(f"   Trial {trial}: {pending} scenario(s) still undecided")
+
+        try:
+            test_results, evaluations, stability = run_sequential_trials(
+                runner,
+                scenarios,
+                evaluate,
+                max_trials=args.trials,
+                min_trials=args.min_trials,
+                alpha=args.trials_alpha,
+                verbose=args.verbose,
+                progress_callback=round_callback
+            )
+            print(f"   Ran {stability['trials_run']} of {stability['trials_budget']} trials "
+                  f"({stability['trials_saved']} saved by early stopping)")
+        except Exception as e:
+            print(f"ERROR: Trial execution failed: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+    else:
+        # Run scenarios
+        print("🏃 Running test scenarios...")
+
+        def progress_callback(current, total):
+            if not args.verbose:
+                print_progress_bar(current, total, prefix='Running scenarios:')
+
+        try:
+            test_results = runner.run_scenarios(
+                scenarios,
+                verbose=args.verbose,
+                progress_callback=progress_callback
+            )
+            print(f"   Completed {len(test_results)} scenarios")
+        except Exception as e:
+            print(f"ERROR: Test execution failed: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
 
-    try:
-        evaluations = judge.evaluate_batch(
-            test_results,
-            progress_callback=eval_progress_callback
-        )
-        print(f"   Completed {len(evaluations)} evaluations")
-    except Exception as e:
-        print(f"ERROR: Evaluation failed: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+        print()
+
+        # Evaluate results
+        print("📊 Evaluating responses...")
+        if args.judge_mode != 'sync':
+            print(f"   Judge mode: {args.judge_mode}")
+
+        def eval_progress_callback(current, total):
+            if not args.verbose:
+                print_progress_bar(current, total, prefix='Evaluating:')
+
+        try:
+            evaluations = evaluate(test_results, eval_progress_callback)
+            print(f"   Completed {len(evaluations)} evaluations")
+        except Exception as e:
+            print(f"ERROR: Evaluation failed: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+    # Shards leave the history alone so the other shards of the run partition
+    # with the same durations; merge updates it once for the whole run
+    if shard is None:
+        update_durations(test_results, args.durations)
+
+    prompt_stats = [e["judge_prompt_tokens"] for e in evaluations if "judge_prompt_tokens" in e]
+    if prompt_stats:
+        verbose_tokens = sum(p["verbose"] for p in prompt_stats)
+        sent_tokens = sum(p["sent"] for p in prompt_stats)
+        print(f"   Judge prompt tokens: {sent_tokens} sent "
+              f"(verbose: {verbose_tokens}, {100 * (1 - sent_tokens / max(verbose_tokens, 1)):.0f}% saved)")
 
     print()
 
     # Calculate aggregate scores
     print("📈 Calculating aggregate scores...")
     try:
-        aggregate_scores = judge.calculate_aggregate_scores(evaluations)
-
-        # Print summary
-        print()
-        print("=" * 70)
-        print("RESULTS SUMMARY")
-        print("=" * 70)
-        print()
-
-        print(f"Total Scenarios:      {aggregate_scores['total_evaluations']}")
-        print(f"Valid Evaluations:    {aggregate_scores['valid_evaluations']}")
-        print(f"Failed Evaluations:   {aggregate_scores['failed_evaluations']}")
-        print(f"Pass Rate:            {aggregate_scores['pass_rate'] * 100:.1f}%")
-        print()
-
-        print("Average Scores:")
-        metrics = aggregate_scores.get('metric_scores', {})
-        for metric_name, scores in metrics.items():
-            mean = scores.get('mean', 0)
-            print(f"  {metric_name:20s}: {mean:.3f}")
-
-        print()
-
-        if aggregate_scores.get('critical_issues_count', 0) > 0:
-            print(f"⚠️  Critical Issues Found: {aggregate_scores['critical_issues_count']}")
-            print("Critical issues:")
-            for issue in aggregate_scores.get('critical_issues', []):
-                print(f"  - {issue}")
-            print()
+        aggregate_scores = judge.calculate_aggregate_scores(
+            evaluations,
+            scenario_index=build_scenario_index(scenarios)
+        )
+        if stability is not None:
+            aggregate_scores["trial_stability"] = stability
+        add_realtime_latency(aggregate_scores, test_results)
 
-        print("Category Scores:")
-        for category, score in aggregate_scores.get('category_scores', {}).items():
-            print(f"  {category:20s}: {score:.3f}")
+        print_summary(aggregate_scores)
 
     except Exception as e:
         print(f"ERROR: Failed to calculate aggregate scores: {e}")
@@ -228,32 +617,46 @@ def main():
 
     print()
 
-    # Generate reports
-    print("📝 Generating reports...")
-    try:
-        reporter = ReportGenerator()
-        report_paths = reporter.generate_all_reports(
+    # Sharded runs save an artifact; `merge` produces the combined report
+    if shard is not None:
+        path = write_shard_artifact(
+            args.run_id,
+            shard,
+            partition,
             test_results,
             evaluations,
-            aggregate_scores
+            extra={"trial_stability": stability}
         )
+        print("💾 Shard results saved:")
+        print(f"   {path}")
+        print()
+        print("After all shards finish, combine them with:")
+        print(f"   python tests/run_tests.py merge {os.path.dirname(path)}")
+        print("=" * 70)
+        return
 
-        print(f"   JSON report:  {report_paths['json']}")
-        print(f"   CSV report:   {report_paths['csv']}")
-        print(f"   HTML report:  {report_paths['html']}")
-        print(f"   Logs saved:   {report_paths['logs']}")
-    except Exception as e:
-        print(f"ERROR: Report generation failed: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
-
-    print()
+    timestamp = start_time.strftime("%Y%m%d_%H%M%S")
+    report_paths = generate_reports(test_results, evaluations, aggregate_scores, timestamp)
 
     # Final summary
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
 
+    record_history(
+        timestamp,
+        test_results,
+        evaluations,
+        aggregate_scores,
+        {
+            "started_at": start_time.isoformat(),
+            "agent_model": args.model if args.mode == 'chat' else "realtime",
+            "judge_model": args.judge_model,
+            "duration_seconds": duration,
+            "report_path": os.path.abspath(report_paths["json"])
+        },
+        args.history_db
+    )
+
     print("=" * 70)
     print(f"✅ Testing completed in {duration:.1f} seconds")
     print()
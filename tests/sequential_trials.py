@@ -0,0 +1,211 @@
+"""
+Repeated-Trial Evaluation with Sequential Early Stopping
+
+The agent samples at temperature 0.7, so one run per scenario is noisy, but
+running every scenario a fixed number of times multiplies cost. This module
+reruns scenarios in rounds and stops each scenario as soon as its pass/fail
+decision is statistically settled.
+
+After each trial the mean overall_score of a scenario is compared with the
+pass threshold. The decision is settled once the threshold lies outside
+
+    mean ± z * max(std, MIN_STD) / sqrt(trials)
+
+where z is the two-sided normal critical value for `alpha`, Bonferroni-
+corrected for the number of looks (one per trial from `min_trials` to
+`max_trials`), so peeking after every trial does not inflate the error rate.
+The MIN_STD floor keeps a few identical judge scores from settling a
+scenario on zero observed variance.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from judges.aggregate_stats import PASS_THRESHOLD
+
+# Lower bound on the per-trial standard deviation used by the test
+MIN_STD = 0.05
+
+
+def critical_value(alpha: float, looks: int) -> float:
+    """
+    Two-sided normal critical value, Bonferroni-corrected for repeated looks.
+
+    Args:
+        alpha: Overall error rate per scenario
+        looks: Number of times the decision is checked
+
+    Returns:
+        Critical z value
+    """
+    return NormalDist().inv_cdf(1 - alpha / (2 * max(looks, 1)))
+
+
+class SequentialScenarioTest:
+    """
+    Sequential pass/fail test for one scenario.
+    """
+
+    def __init__(
+        self,
+        scenario_id: str,
+        z: float,
+        min_trials: int,
+        threshold: float = PASS_THRESHOLD
+    ):
+        """
+        Initialize the test.
+
+        Args:
+            scenario_id: Scenario being tested
+            z: Critical value (see critical_value)
+            min_trials: Trials required before a decision can be made
+            threshold: Pass threshold on the mean overall_score
+        """
+        self.scenario_id = scenario_id
+        self.z = z
+        self.min_trials = min_trials
+        self.threshold = threshold
+        self.scores: List[float] = []
+        self.trials = 0
+
+    def add(self, score: Optional[float]):
+        """
+        Record one trial.
+
+        Args:
+            score: overall_score of the trial, or None if it could not be judged
+        """
+        self.trials += 1
+        if score is not None:
+            self.scores.append(float(score))
+
+    def margin(self) -> float:
+        """Half-width of the current decision interval."""
+        n = len(self.scores)
+        if n < 2:
+            return math.inf
+        std = max(float(np.std(self.scores, ddof=1)), MIN_STD)
+        return self.z * std / math.sqrt(n)
+
+    def decision(self) -> Optional[str]:
+        """
+        Current decision.
+
+        Returns:
+            "pass" or "fail" once settled, otherwise None
+        """
+        if len(self.scores) < self.min_trials:
+            return None
+
+        mean = float(np.mean(self.scores))
+        margin = self.margin()
+        if mean - margin >= self.threshold:
+            return "pass"
+        if mean + margin < self.threshold:
+            return "fail"
+        return None
+
+    def summary(self, max_trials: int) -> Dict[str, Any]:
+        """Per-scenario stability report."""
+        scores = np.array(self.scores) if self.scores else np.array([np.nan])
+        decision = self.decision()
+        margin = self.margin()
+        return {
+            "scenario_id": self.scenario_id,
+            "trials": self.trials,
+            "judged_trials": len(self.scores),
+            "scores": self.scores,
+            "mean": float(np.nanmean(scores)) if self.scores else None,
+            "std": float(np.std(self.scores, ddof=1)) if len(self.scores) > 1 else 0.0,
+            "min": float(np.nanmin(scores)) if self.scores else None,
+            "max": float(np.nanmax(scores)) if self.scores else None,
+            "pass_fraction": float(np.mean([s >= self.threshold for s in self.scores])) if self.scores else None,
+            "margin": None if math.isinf(margin) else margin,
+            "decision": decision or "undecided",
+            "stopped_early": decision is not None and self.trials < max_trials
+        }
+
+
+def run_sequential_trials(
+    runner,
+    scenarios: List[Dict[str, Any]],
+    evaluate: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+    max_trials: int,
+    min_trials: int = 3,
+    alpha: float = 0.05,
+    threshold: float = PASS_THRESHOLD,
+    verbose: bool = False,
+    progress_callback=None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run scenarios repeatedly, stopping each once its decision is settled.
+
+    Trials run in rounds: every unsettled scenario runs once, the round is
+    judged together (so batch judge modes still apply), and the sequential
+    test decides which scenarios need another round.
+
+    Args:
+        runner: PharmacyTestRunner
+        scenarios: List of test scenarios
+        evaluate: Function judging a list of test results
+        max_trials: Maximum trials per scenario
+        min_trials: Trials before a scenario can stop
+        alpha: Error rate per scenario decision
+        threshold: Pass threshold on the mean overall_score
+        verbose: Print progress information
+        progress_callback: Optional callback function(round, trials_in_round)
+
+    Returns:
+        Tuple of (all test results, all evaluations, stability report)
+    """
+    min_trials = max(1, min(min_trials, max_trials))
+    z = critical_value(alpha, max_trials - min_trials + 1)
+
+    tests = {s.get("id"): SequentialScenarioTest(s.get("id"), z, min_trials, threshold) for s in scenarios}
+    pending = list(scenarios)
+    test_results: List[Dict[str, Any]] = []
+    evaluations: List[Dict[str, Any]] = []
+
+    for trial in range(1, max_trials + 1):
+        if not pending:
+            break
+        if progress_callback:
+            progress_callback(trial, len(pending))
+
+        round_results = runner.run_scenarios(pending, verbose=verbose)
+        for result in round_results:
+            result["trial"] = trial
+
+        round_evaluations = evaluate(round_results)
+        for result, evaluation in zip(round_results, round_evaluations):
+            evaluation["trial"] = trial
+            score = evaluation.get("overall_score") if "error" not in evaluation else None
+            tests[result["scenario"].get("id")].add(score)
+
+        test_results.extend(round_results)
+        evaluations.extend(round_evaluations)
+
+        pending = [s for s in pending if tests[s.get("id")].decision() is None]
+
+    per_scenario = [test.summary(max_trials) for test in tests.values()]
+    trials_run = sum(item["trials"] for item in per_scenario)
+    stability = {
+        "max_trials": max_trials,
+        "min_trials": min_trials,
+        "alpha": alpha,
+        "critical_value": z,
+        "trials_run": trials_run,
+        "trials_budget": max_trials * len(scenarios),
+        "trials_saved": max_trials * len(scenarios) - trials_run,
+        "decisions": {
+            decision: sum(1 for item in per_scenario if item["decision"] == decision)
+            for decision in ("pass", "fail", "undecided")
+        },
+        "scenarios": per_scenario
+    }
+
+    return test_results, evaluations, stability
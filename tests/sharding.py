@@ -0,0 +1,332 @@
+"""
+Sharded Test Execution
+
+Splits a scenario sweep into N shards that can run in separate processes
+or on separate machines, and merges the per-shard artifacts back into one
+result set.
+
+Scenarios are assigned with the longest-processing-time-first rule using
+each scenario's historical duration, so shards finish at about the same
+time. The assignment depends only on the scenario list and the durations,
+so the durations are frozen per run: the first shard of a run saves the
+history it partitioned with next to the artifacts, later shards of that run
+reuse it, and the history itself is only updated by the merge. Every
+artifact records the full partition, and the merge refuses artifacts that
+disagree on it, overlap, or leave an assigned scenario without a result.
+"""
+
+import glob
+import json
+import os
+import statistics
+from typing import Any, Dict, List, Tuple
+
+# Duration assumed for scenarios that have never run
+DEFAULT_DURATION_SECONDS = 10.0
+
+# Weight of the newest run in the duration history (exponential average)
+DURATION_SMOOTHING = 0.5
+
+
+def default_durations_path() -> str:
+    """Path of the scenario duration history file."""
+    return os.path.join(os.path.dirname(__file__), "results", "scenario_durations.json")
+
+
+def default_shards_dir() -> str:
+    """Directory where shard artifacts are written."""
+    return os.path.join(os.path.dirname(__file__), "results", "shards")
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard spec.
+
+    Args:
+        value: "i/N", with 1 <= i <= N
+
+    Returns:
+        Tuple of (shard index, shard count)
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected i/N (e.g. 1/4)")
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}', index must be between 1 and {count}")
+    return index, count
+
+
+def load_durations(path: str = None) -> Dict[str, float]:
+    """
+    Load historical scenario durations.
+
+    Args:
+        path: Durations file (defaults to tests/results/scenario_durations.json)
+
+    Returns:
+        Dictionary mapping scenario id to seconds (empty if no history)
+    """
+    path = path or default_durations_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def freeze_durations(run_id: str, path: str = None, shards_dir: str = None) -> Dict[str, float]:
+    """
+    Durations used to partition one run, identical for all of its shards.
+
+    The first shard copies the history to <shards_dir>/<run_id>/durations.json;
+    later shards read that copy, so a history update in between cannot change
+    the partition. Shards on separate machines should all be given the same
+    --durations file.
+
+    Args:
+        run_id: Identifier shared by all shards of a sweep
+        path: Durations file (defaults to tests/results/scenario_durations.json)
+        shards_dir: Base directory (defaults to tests/results/shards)
+
+    Returns:
+        Dictionary mapping scenario id to seconds
+    """
+    run_dir = os.path.join(shards_dir or default_shards_dir(), run_id)
+    snapshot = os.path.join(run_dir, "durations.json")
+    if os.path.exists(snapshot):
+        return load_durations(snapshot)
+
+    durations = load_durations(path)
+    os.makedirs(run_dir, exist_ok=True)
+    try:
+        # Exclusive create: of two shards starting together, one snapshot wins
+        with open(snapshot, "x", encoding="utf-8") as f:
+            json.dump(durations, f, ensure_ascii=False, indent=2, sort_keys=True)
+    except FileExistsError:
+        return load_durations(snapshot)
+    return durations
+
+
+def update_durations(test_results: List[Dict[str, Any]], path: str = None) -> Dict[str, float]:
+    """
+    Fold the durations of a run into the history file.
+
+    Args:
+        test_results: Test results carrying duration_seconds
+        path: Durations file (defaults to tests/results/scenario_durations.json)
+
+    Returns:
+        Updated duration history
+    """
+    path = path or default_durations_path()
+    durations = load_durations(path)
+
+    for result in test_results:
+        scenario_id = result.get("scenario", {}).get("id")
+        seconds = result.get("duration_seconds")
+        if scenario_id is None or seconds is None:
+            continue
+        previous = durations.get(scenario_id)
+        durations[scenario_id] = round(
+            seconds if previous is None
+            else DURATION_SMOOTHING * seconds + (1 - DURATION_SMOOTHING) * previous,
+            3
+        )
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(durations, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return durations
+
+
+def assign_shards(
+    scenarios: List[Dict[str, Any]],
+    shard_count: int,
+    durations: Dict[str, float]
+) -> List[List[Dict[str, Any]]]:
+    """
+    Partition scenarios into balanced shards (longest processing time first).
+
+    Args:
+        scenarios: List of test scenarios
+        shard_count: Number of shards
+        durations: Historical duration per scenario id
+
+    Returns:
+        List of shard_count scenario lists, each in the original order
+    """
+    known = [durations[s.get("id")] for s in scenarios if s.get("id") in durations]
+    fallback = statistics.median(known) if known else DEFAULT_DURATION_SECONDS
+
+    def cost(position: int) -> float:
+        return durations.get(scenarios[position].get("id"), fallback)
+
+    # Longest first; ties broken by id so every machine agrees
+    order = sorted(
+        range(len(scenarios)),
+        key=lambda position: (-cost(position), str(scenarios[position].get("id")))
+    )
+
+    loads = [0.0] * shard_count
+    members: List[List[int]] = [[] for _ in range(shard_count)]
+    for position in order:
+        target = min(range(shard_count), key=lambda shard: (loads[shard], shard))
+        loads[target] += cost(position)
+        members[target].append(position)
+
+    return [[scenarios[position] for position in sorted(shard)] for shard in members]
+
+
+def write_shard_artifact(
+    run_id: str,
+    shard: Tuple[int, int],
+    partition: List[List[str]],
+    test_results: List[Dict[str, Any]],
+    evaluations: List[Dict[str, Any]],
+    extra: Dict[str, Any] = None,
+    shards_dir: str = None
+) -> str:
+    """
+    Save one shard's results and evaluations for merging.
+
+    Args:
+        run_id: Identifier shared by all shards of a sweep
+        shard: (shard index, shard count)
+        partition: Scenario ids of every shard of the run, in shard order
+        test_results: Test results of this shard
+        evaluations: Evaluations of this shard
+        extra: Optional additional data (e.g. trial stability)
+        shards_dir: Base directory (defaults to tests/results/shards)
+
+    Returns:
+        Path to the artifact
+    """
+    index, count = shard
+    run_dir = os.path.join(shards_dir or default_shards_dir(), run_id)
+    os.makedirs(run_dir, exist_ok=True)
+
+    path = os.path.join(run_dir, f"shard_{index}_of_{count}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "run_id": run_id,
+            "shard": {"index": index, "count": count},
+            "scenario_ids": partition[index - 1],
+            "partition": partition,
+            "test_results": test_results,
+            "evaluations": evaluations,
+            **(extra or {})
+        }, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_shard_artifacts(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load shard artifacts from files and/or directories.
+
+    Args:
+        paths: Artifact files, or directories containing shard_*.json
+
+    Returns:
+        Artifacts sorted by shard index
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "shard_*_of_*.json"))))
+        else:
+            files.append(path)
+
+    artifacts = []
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            artifacts.append(json.load(f))
+    return sorted(artifacts, key=lambda a: a["shard"]["index"])
+
+
+def merge_shard_artifacts(
+    artifacts: List[Dict[str, Any]],
+    allow_partial: bool = False
+) -> Dict[str, Any]:
+    """
+    Combine shard artifacts into one result set.
+
+    Args:
+        artifacts: Loaded shard artifacts
+        allow_partial: Merge even if some shards are missing
+
+    Returns:
+        Dictionary with test_results, evaluations, missing_shards, the
+        scenarios of missing shards and the merged trial_stability (if the
+        shards ran with --trials)
+
+    Raises:
+        ValueError: If the artifacts do not form one consistent run, e.g.
+            they were partitioned differently, ran the same scenario twice
+            or left an assigned scenario without a result
+    """
+    if not artifacts:
+        raise ValueError("No shard artifacts to merge")
+
+    counts = {a["shard"]["count"] for a in artifacts}
+    if len(counts) != 1:
+        raise ValueError(f"Shard artifacts come from different shard counts: {sorted(counts)}")
+    count = counts.pop()
+
+    indexes = [a["shard"]["index"] for a in artifacts]
+    duplicates = sorted({i for i in indexes if indexes.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate shard artifacts: {duplicates}")
+
+    missing = sorted(set(range(1, count + 1)) - set(indexes))
+    if missing and not allow_partial:
+        raise ValueError(f"Missing shards {missing} of {count}")
+
+    partitions = {json.dumps(a.get("partition")) for a in artifacts}
+    if len(partitions) != 1 or artifacts[0].get("partition") is None:
+        raise ValueError(
+            "Shard artifacts were partitioned differently; rerun all shards "
+            "of the run with the same --run-id and --durations"
+        )
+    partition = artifacts[0]["partition"]
+
+    # Each scenario must have run in exactly the shard it was assigned to
+    ran_in: Dict[str, int] = {}
+    for a in artifacts:
+        index = a["shard"]["index"]
+        ran = {r.get("scenario", {}).get("id") for r in a["test_results"]}
+        overlap = sorted(str(i) for i in ran if i in ran_in)
+        if overlap:
+            raise ValueError(f"Scenarios ran in more than one shard: {overlap}")
+        unassigned = sorted(str(i) for i in ran - set(partition[index - 1]))
+        if unassigned:
+            raise ValueError(f"Shard {index} ran scenarios not assigned to it: {unassigned}")
+        absent = sorted(str(i) for i in set(partition[index - 1]) - ran)
+        if absent:
+            raise ValueError(f"Shard {index} has no results for assigned scenarios: {absent}")
+        ran_in.update((i, index) for i in ran)
+
+    test_results = [r for a in artifacts for r in a["test_results"]]
+    evaluations = [e for a in artifacts for e in a["evaluations"]]
+
+    merged = {
+        "test_results": test_results,
+        "evaluations": evaluations,
+        "missing_shards": missing,
+        "missing_scenarios": [i for shard in missing for i in partition[shard - 1]],
+        "trial_stability": None
+    }
+
+    stabilities = [a["trial_stability"] for a in artifacts if a.get("trial_stability")]
+    if stabilities:
+        stability = dict(stabilities[0])
+        for key in ("trials_run", "trials_budget", "trials_saved"):
+            stability[key] = sum(s[key] for s in stabilities)
+        stability["scenarios"] = [item for s in stabilities for item in s["scenarios"]]
+        stability["decisions"] = {
+            decision: sum(s["decisions"].get(decision, 0) for s in stabilities)
+            for decision in ("pass", "fail", "undecided")
+        }
+        merged["trial_stability"] = stability
+
+    return merged
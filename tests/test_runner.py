@@ -7,6 +7,7 @@ and collects responses for evaluation by the LLM judge.
 
 import json
 import os
+import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from openai import OpenAI
@@ -21,15 +22,19 @@ class PharmacyTestRunner:
         self,
         api_key: str = None,
         model: str = "gpt-4o",
-        mode: str = "chat"
+        mode: str = "chat",
+        realtime_url: str = None
     ):
         """
         Initialize the test runner.
 
         Args:
             api_key: OpenAI API key (defaults to OPENAI_API_KEY env var)
-            model: Model to use for the agent
-            mode: "chat" or "voice" mode (currently only chat is supported)
+            model: Model to use for the agent (chat mode)
+            mode: "chat" (Chat Completions with simulated tools) or "voice"
+                (Realtime session with the production config and tools)
+            realtime_url: Realtime endpoint for voice mode (defaults to
+                OPENAI_REALTIME_URL, e.g. a local stand-in)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -39,6 +44,14 @@ class PharmacyTestRunner:
         self.model = model
         self.mode = mode
 
+        if mode not in ("chat", "voice"):
+            raise ValueError(f"Unknown mode '{mode}', expected 'chat' or 'voice'")
+        self.realtime = None
+        if mode == "voice":
+            # Imports the backend services, so only loaded when needed
+            from realtime_runner import RealtimeScenarioRunner
+            self.realtime = RealtimeScenarioRunner(api_key=self.api_key, url=realtime_url)
+
         # Load system prompt
         self.system_prompt = self._load_system_prompt()
 
@@ -74,9 +87,11 @@ class PharmacyTestRunner:
 - search_medications_by_ingredient: לחיפוש תרופות לפי מרכיב פעיל
 - check_prescription_requirement: לבדיקת דרישת מרשם
 - get_alternative_medications: למציאת תרופות חלופיות
+- find_branches_with_stock: למציאת סניפים שבהם התרופה במלאי
 - verify_user_id: לאימות זהות משתמש
 - get_user_prescriptions: לקבלת מרשמים של משתמש
 - get_user_allergies: לקבלת אלרגיות של משתמש
+- check_allergy_conflict: לבדיקת התנגשות בין תרופה לאלרגיות המשתמש
 
 השב בעברית באופן ברור וקצר."""
 
@@ -159,6 +174,24 @@ class PharmacyTestRunner:
                     "required": ["medication_name"]
                 }
             },
+            {
+                "name": "find_branches_with_stock",
+                "description": "Find branches that have a medication in stock",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "name": {
+                            "type": "string",
+                            "description": "Medication name"
+                        },
+                        "region": {
+                            "type": "string",
+                            "description": "Optional region (מרכז, ירושלים, צפון, דרום)"
+                        }
+                    },
+                    "required": ["name"]
+                }
+            },
             {
                 "name": "verify_user_id",
                 "description": "Verify user identity",
@@ -200,6 +233,24 @@ class PharmacyTestRunner:
                     },
                     "required": ["user_id"]
                 }
+            },
+            {
+                "name": "check_allergy_conflict",
+                "description": "Check a medication against the user's allergies",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "user_id": {
+                            "type": "string",
+                            "description": "User ID number"
+                        },
+                        "medication_name": {
+                            "type": "string",
+                            "description": "Medication name"
+                        }
+                    },
+                    "required": ["user_id", "medication_name"]
+                }
             }
         ]
 
@@ -288,6 +339,19 @@ class PharmacyTestRunner:
                 ]
             }
 
+        elif tool_name == "find_branches_with_stock":
+            region = tool_args.get("region")
+            branches = [
+                {"branch_id": "TLV-02", "name": "בית מרקחת רמת אביב", "city": "תל אביב", "region": "מרכז"},
+                {"branch_id": "JLM-01", "name": "בית מרקחת מלחה", "city": "ירושלים", "region": "ירושלים"},
+                {"branch_id": "HFA-01", "name": "בית מרקחת חורב", "city": "חיפה", "region": "צפון"}
+            ]
+            matches = [b for b in branches if not region or b["region"] == region]
+            result = {"branches": matches, "count": len(matches)}
+            if region and not matches:
+                result["other_regions"] = [b["region"] for b in branches]
+            return result
+
         elif tool_name == "verify_user_id":
             user_id = tool_args.get("user_id")
             # Simple validation: 9 digits
@@ -308,6 +372,14 @@ class PharmacyTestRunner:
                 "allergies": ["פניצילין", "אגוזים"]
             }
 
+        elif tool_name == "check_allergy_conflict":
+            return {
+                "medication_name": tool_args.get("medication_name"),
+                "conflict": False,
+                "matching_allergies": [],
+                "unclassified_allergies": ["אגוזים"]
+            }
+
         return {"error": "Unknown tool"}
 
     def run_scenario(
@@ -325,11 +397,22 @@ class PharmacyTestRunner:
         Returns:
             Dictionary with test results
         """
+        if self.realtime is not None:
+            return self.realtime.run_scenario(scenario, verbose=verbose)
+
         if verbose:
             print(f"Running scenario: {scenario.get('name')}")
 
         conversation_history = []
         tool_calls_made = []
+        tokens_used = {"prompt": 0, "completion": 0, "total": 0}
+        start = time.perf_counter()
+
+        def record_usage(response):
+            if response.usage is not None:
+                tokens_used["prompt"] += response.usage.prompt_tokens
+                tokens_used["completion"] += response.usage.completion_tokens
+                tokens_used["total"] += response.usage.total_tokens
 
         # Build conversation from user messages
         for user_msg in scenario.get("user_messages", []):
@@ -351,6 +434,7 @@ class PharmacyTestRunner:
                     function_call="auto",
                     temperature=0.7
                 )
+                record_usage(response)
 
                 message = response.choices[0].message
 
@@ -399,6 +483,7 @@ class PharmacyTestRunner:
                         messages=messages,
                         temperature=0.7
                     )
+                    record_usage(response)
 
                     message = response.choices[0].message
 
@@ -419,7 +504,9 @@ class PharmacyTestRunner:
                     "scenario": scenario,
                     "error": str(e),
                     "conversation_history": conversation_history,
-                    "tool_calls": tool_calls_made
+                    "tool_calls": tool_calls_made,
+                    "tokens_used": tokens_used,
+                    "duration_seconds": round(time.perf_counter() - start, 3)
                 }
 
         # Get final agent response (last assistant message)
@@ -434,7 +521,9 @@ class PharmacyTestRunner:
             "conversation_history": conversation_history,
             "agent_response": final_response,
             "tool_calls": tool_calls_made,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now().isoformat(),
+            "tokens_used": tokens_used,
+            "duration_seconds": round(time.perf_counter() - start, 3)
         }
 
     def run_scenarios(